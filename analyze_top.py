@@ -1,21 +1,27 @@
 # -*- coding: utf-8 -*-
 """分析表现优秀的基金"""
+import asyncio
 import os, sys
 if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'ignore')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'ignore')
+    sys.stdout.reconfigure(encoding='utf-8', errors='ignore')
+    sys.stderr.reconfigure(encoding='utf-8', errors='ignore')
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# 采集/存储模块通过 loguru 输出日志，这里只保留一个精简的 INFO 级输出，
+# 关闭异常时的变量回溯以减少格式化开销
 from loguru import logger
 logger.remove()
-logger.add(sys.stderr, level="INFO", format="<green>{time:HH:mm:ss}</green> | <level>{message}</level>")
+logger.add(
+    sys.stderr, level="INFO", backtrace=False, diagnose=False,
+    format="<green>{time:HH:mm:ss}</green> | <level>{message}</level>",
+)
 
 from src.collector.akshare_collector import AKShareCollector
 from src.processor.fund_processor import FundDataProcessor
-from src.model.factors import FactorCalculator
+from src.model.factors import FactorCalculator, KeyFactors
 from src.model.scoring_model import ScoringModel
+from src.storage.fund_storage import fund_storage
 
 # 分析近期表现好的基金
 test_funds = [
@@ -29,47 +35,80 @@ processor = FundDataProcessor()
 factor_calc = FactorCalculator(processor)
 scoring = ScoringModel()
 
-print("\n" + "="*60)
-print("[优质基金分析]")
-print("="*60)
 
-for fund_code, fund_name in test_funds:
-    print(f"\n正在分析: {fund_name} ({fund_code})...")
+def get_nav_batch(fund_codes):
+    """批量获取净值数据，当日已下载过的直接读取本地缓存"""
+    nav_dict = {}
+    missing = []
+    for fund_code in fund_codes:
+        nav_data = fund_storage.load_nav_data(fund_code, max_age_hours=24)
+        if nav_data is not None:
+            nav_dict[fund_code] = nav_data
+        else:
+            missing.append(fund_code)
+    
+    fetched = asyncio.run(collector.get_fund_nav_batch_async(missing)) if missing else {}
+    for fund_code, nav_data in fetched.items():
+        fund_storage.save_nav_data(fund_code, nav_data)
+    nav_dict.update(fetched)
+    
+    return nav_dict
+
+
+def analyze_one(fund_code, fund_name, nav_data, factors):
+    """对单只基金评分，返回该基金完整的输出文本块"""
+    lines = [f"\n正在分析: {fund_name} ({fund_code})..."]
     
     try:
-        nav_data = collector.get_fund_nav_history(fund_code)
-        if nav_data is None or nav_data.empty:
-            print(f"  [X] 无法获取净值数据")
-            continue
+        if nav_data is None or nav_data.empty or factors is None:
+            lines.append(f"  [X] 无法获取净值数据")
+            return "\n".join(lines) + "\n"
         
-        print(f"  获取到 {len(nav_data)} 条净值记录")
+        lines.append(f"  获取到 {len(nav_data)} 条净值记录")
         
-        factors = factor_calc.calculate_all_factors(nav_data=nav_data)
         score_result = scoring.calculate_total_score(factors)
         total_score = score_result['total_score']
         grade = scoring.get_score_grade(total_score)
         
         rec = scoring.get_recommendation(total_score, factors)
         
-        print(f"\n  综合评分: {total_score:.1f} 分  等级: {grade}")
-        print(f"  投资建议: {rec['action']}")
-        print(f"\n  关键指标:")
-        print(f"    近1年收益: {factors.get('return_1y', 0):.2f}%")
-        print(f"    最大回撤: {factors.get('max_drawdown', 0):.2f}%")
-        print(f"    夏普比率: {factors.get('sharpe_ratio', 0):.2f}")
-        print(f"    波动率: {factors.get('volatility', 0):.2f}%")
+        lines.append(f"\n  综合评分: {total_score:.1f} 分  等级: {grade}")
+        lines.append(f"  投资建议: {rec['action']}")
+        key = KeyFactors.from_factors(factors)
+        lines.append(f"\n  关键指标:")
+        lines.append(f"    近1年收益: {key.return_1y:.2f}%")
+        lines.append(f"    最大回撤: {key.max_drawdown:.2f}%")
+        lines.append(f"    夏普比率: {key.sharpe_ratio:.2f}")
+        lines.append(f"    波动率: {key.volatility:.2f}%")
         
         if rec['reasons']:
-            print(f"\n  优势:")
+            lines.append(f"\n  优势:")
             for r in rec['reasons'][:3]:
-                print(f"    + {r}")
+                lines.append(f"    + {r}")
         
         if rec['risks']:
-            print(f"\n  风险:")
+            lines.append(f"\n  风险:")
             for r in rec['risks'][:3]:
-                print(f"    - {r}")
+                lines.append(f"    - {r}")
                 
     except Exception as e:
-        print(f"  [X] 分析失败: {e}")
+        lines.append(f"  [X] 分析失败: {e}")
+    
+    return "\n".join(lines) + "\n"
+
+
+print("\n" + "="*60)
+print("[优质基金分析]")
+print("="*60)
+
+# 一次性批量获取净值并向量化计算因子
+nav_dict = get_nav_batch([fund_code for fund_code, _ in test_funds])
+factors_dict = factor_calc.calculate_all_factors_batch(nav_dict)
+
+# 每只基金的结果整块写出，避免逐行 print
+sys.stdout.write("".join(
+    analyze_one(fund_code, fund_name, nav_dict.get(fund_code), factors_dict.get(fund_code))
+    for fund_code, fund_name in test_funds
+))
 
 print("\n" + "="*60)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+全市场批量评分脚本
+
+读取本地已缓存的净值数据，按 CPU 核数多进程并行计算因子与评分
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8', errors='ignore')
+    sys.stderr.reconfigure(encoding='utf-8', errors='ignore')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from loguru import logger
+
+from src.model.factors import FactorCalculator, KeyFactors
+from src.model.scoring_model import ScoringModel
+from src.storage.fund_storage import fund_storage
+
+# 每个工作进程导入本模块时各自创建
+factor_calc = FactorCalculator()
+scoring = ScoringModel()
+
+
+def score_fund(fund_code: str, max_age_hours: int = 24) -> Optional[Dict]:
+    """
+    对单只基金计算因子并评分（在工作进程中执行）
+
+    Args:
+        fund_code: 基金代码
+        max_age_hours: 净值缓存的最大有效时间
+
+    Returns:
+        评分结果，无缓存数据或计算失败时返回 None
+    """
+    nav_data = fund_storage.load_nav_data(fund_code, max_age_hours=max_age_hours)
+    if nav_data is None or nav_data.empty:
+        return None
+
+    try:
+        factors = factor_calc.calculate_all_factors(nav_data=nav_data)
+        if not factors:
+            return None
+
+        total_score = scoring.calculate_total_score(factors)['total_score']
+        key = KeyFactors.from_factors(factors)
+        return {
+            'fund_code': fund_code,
+            'total_score': total_score,
+            'grade': scoring.get_score_grade(total_score),
+            'return_1y': key.return_1y,
+            'max_drawdown': key.max_drawdown,
+            'sharpe_ratio': key.sharpe_ratio,
+            'volatility': key.volatility,
+        }
+    except Exception as e:
+        logger.error(f"基金 {fund_code} 评分失败: {e}")
+        return None
+
+
+def cached_fund_codes() -> List[str]:
+    """列出本地已缓存净值的基金代码"""
+    return sorted(p.stem for p in (fund_storage.base_path / 'nav').glob('*.csv'))
+
+
+def batch_score(
+    fund_codes: List[str],
+    max_workers: Optional[int] = None,
+    max_age_hours: int = 24,
+    chunksize: int = 32
+) -> pd.DataFrame:
+    """
+    多进程批量评分
+
+    Args:
+        fund_codes: 基金代码列表
+        max_workers: 进程数，默认 CPU 核数
+        max_age_hours: 净值缓存的最大有效时间
+        chunksize: 每次分发给工作进程的基金数，摊薄进程间通信开销
+
+    Returns:
+        按综合得分降序排列的评分结果
+    """
+    if not fund_codes:
+        return pd.DataFrame()
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        results = list(executor.map(
+            score_fund,
+            fund_codes,
+            [max_age_hours] * len(fund_codes),
+            chunksize=chunksize,
+        ))
+
+    rows = [r for r in results if r is not None]
+    if not rows:
+        return pd.DataFrame()
+
+    return pd.DataFrame(rows).sort_values('total_score', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='全市场批量评分')
+    parser.add_argument(
+        'fund_codes',
+        nargs='*',
+        help='基金代码，不指定时评分全部已缓存的基金'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='进程数，默认 CPU 核数'
+    )
+    parser.add_argument(
+        '--max-age-hours',
+        type=int,
+        default=24,
+        help='净值缓存的最大有效时间（小时）'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=20,
+        help='输出前 N 名'
+    )
+    parser.add_argument(
+        '--save',
+        action='store_true',
+        help='保存评分结果'
+    )
+
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="<green>{time:HH:mm:ss}</green> | <level>{message}</level>")
+
+    fund_codes = args.fund_codes or cached_fund_codes()
+    logger.info(f"开始批量评分，共 {len(fund_codes)} 只基金")
+
+    df = batch_score(fund_codes, max_workers=args.workers, max_age_hours=args.max_age_hours)
+    if df.empty:
+        logger.warning("没有可评分的基金，请先缓存净值数据")
+        sys.exit(0)
+
+    logger.info(f"评分完成，有效 {len(df)} 只")
+    sys.stdout.write(df.head(args.top).to_string(float_format=lambda x: f"{x:.2f}") + "\n")
+
+    if args.save:
+        fund_storage.save_scores(df)
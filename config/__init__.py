@@ -1,3 +1,3 @@
-from .settings import settings
+from .settings import settings, get_settings, json_load, json_dump, json_iter_items
 
-__all__ = ["settings"]
+__all__ = ["settings", "get_settings", "json_load", "json_dump", "json_iter_items"]
@@ -1,21 +1,30 @@
 """
 系统配置文件
 """
+import json
 import os
+from bisect import bisect_right
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
-# 加载环境变量
-load_dotenv()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 
 class Settings:
-    """系统配置类"""
+    """系统配置类
     
-    # ==================== API配置 ====================
-    # OpenAI API配置（用于大模型分析）
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+    常量配置定义在类上；依赖环境变量和文件路径的配置在实例化时解析，
+    通过 get_settings() 获取单例
+    """
     
     # ==================== 数据源配置 ====================
     # 天天基金API
@@ -26,6 +35,9 @@ class Settings:
     # 指数估值数据
     INDEX_VALUATION_API = "https://danjuanfunds.com/djapi/index_eva/dj"
     
+    # 采集并发上限（同时在途的请求数，过高易触发数据源限流）
+    MAX_COLLECTOR_CONCURRENCY = 5
+    
     # ==================== 风控配置 ====================
     class RiskControl:
         # 单只基金最大仓位（占总资产比例）
@@ -110,30 +122,142 @@ class Settings:
     
     # ==================== 通知配置 ====================
     class Notification:
-        # 邮件配置
-        SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.qq.com")
-        SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
-        SMTP_USER = os.getenv("SMTP_USER", "")
-        SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
-        EMAIL_RECEIVER = os.getenv("EMAIL_RECEIVER", "")
-        
-        # 企业微信配置
-        WECOM_WEBHOOK = os.getenv("WECOM_WEBHOOK", "")
-        
-        # 钉钉配置
-        DINGTALK_WEBHOOK = os.getenv("DINGTALK_WEBHOOK", "")
+        """通知配置（实例化时读取环境变量）"""
+        
+        def __init__(self):
+            # 邮件配置
+            self.SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.qq.com")
+            self.SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+            self.SMTP_USER = os.getenv("SMTP_USER", "")
+            self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+            self.EMAIL_RECEIVER = os.getenv("EMAIL_RECEIVER", "")
+            
+            # 企业微信配置
+            self.WECOM_WEBHOOK = os.getenv("WECOM_WEBHOOK", "")
+            
+            # 钉钉配置
+            self.DINGTALK_WEBHOOK = os.getenv("DINGTALK_WEBHOOK", "")
     
-    # ==================== 数据存储路径 ====================
-    DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    PORTFOLIO_FILE = os.path.join(DATA_DIR, "portfolio.json")
-    TRADE_HISTORY_FILE = os.path.join(DATA_DIR, "trade_history.json")
-    DAILY_REPORTS_DIR = os.path.join(DATA_DIR, "daily_reports")
-    CACHE_DIR = os.path.join(DATA_DIR, "cache")
+    def __init__(self):
+        # ==================== API配置 ====================
+        # OpenAI API配置（用于大模型分析）
+        self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+        self.OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        self.OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+        # 批量分析时同时在途的大模型请求数（受服务商并发/限流约束）
+        self.LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+        # 当日大模型响应缓存（相同提示词当天只请求一次），默认开启
+        self.LLM_RESPONSE_CACHE = os.getenv("LLM_RESPONSE_CACHE", "true").lower() in ("1", "true", "yes")
+        
+        # 通知配置
+        self.Notification = self.Notification()
+        
+        # ==================== 数据存储路径 ====================
+        base_dir = os.path.dirname(os.path.dirname(__file__))
+        self.DATA_DIR = os.path.join(base_dir, "data")
+        self.PORTFOLIO_FILE = os.path.join(self.DATA_DIR, "portfolio.json")
+        self.TRADE_HISTORY_FILE = os.path.join(self.DATA_DIR, "trade_history.json")
+        self.DAILY_REPORTS_DIR = os.path.join(self.DATA_DIR, "daily_reports")
+        self.CACHE_DIR = os.path.join(self.DATA_DIR, "cache")
+        
+        # ==================== Redis缓存配置 ====================
+        # 多进程批量评分时共享净值缓存，默认关闭
+        self.USE_REDIS_CACHE = os.getenv("USE_REDIS_CACHE", "").lower() in ("1", "true", "yes")
+        self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        
+        # ==================== 日志配置 ====================
+        self.LOG_DIR = os.path.join(base_dir, "logs")
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+
+# ==================== 阈值查找表 ====================
+# 由配置字典预先生成的升序 (阈值, 值) 表，查找时二分定位
+
+_VALUATION_THRESHOLDS = tuple(sorted(Settings.RiskControl.VALUATION_POSITION_MAP))
+_VALUATION_POSITIONS = tuple(
+    Settings.RiskControl.VALUATION_POSITION_MAP[t] for t in _VALUATION_THRESHOLDS
+)
+
+
+def position_cap(pe_percentile: float) -> float:
+    """根据估值百分位获取最大仓位（PE分位 < 阈值 时取对应仓位）"""
+    idx = bisect_right(_VALUATION_THRESHOLDS, pe_percentile)
+    if idx < len(_VALUATION_POSITIONS):
+        return _VALUATION_POSITIONS[idx]
+    return _VALUATION_POSITIONS[-1]  # 超出最高阈值，取最保守仓位
+
+
+# ==================== JSON 持久化 ====================
+
+def json_loads(data):
+    """解析 JSON 字符串或字节串（安装 orjson 时使用 orjson 解析）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_load(path: str):
+    """读取 JSON 文件（安装 orjson 时使用 orjson 解析）"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def json_dump(path: str, obj) -> None:
+    """写入 JSON 文件（UTF-8、2空格缩进，无法序列化的对象转为字符串）"""
+    if orjson is not None:
+        data = orjson.dumps(
+            obj,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    else:
+        data = json.dumps(obj, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# 超过该大小的 JSON 文件改为流式解析（字节）
+JSON_STREAM_THRESHOLD = 1024 * 1024
+
+
+def json_iter_items(path: str, prefix: str = 'item'):
+    """
+    逐条读取 JSON 文件中的数组元素
+    
+    文件较大且安装了 ijson 时流式解析，避免一次性载入整个文档；
+    否则整体读取后按路径取出数组
+    
+    Args:
+        path: 文件路径
+        prefix: ijson 风格的数组路径，如 'item'（顶层数组）、'scores.item'
+    """
+    if ijson is not None and os.path.getsize(path) > JSON_STREAM_THRESHOLD:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+    
+    data = json_load(path)
+    for key in prefix.split('.')[:-1]:
+        data = data[key]
+    yield from data
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """获取配置单例（首次调用时加载 .env）"""
+    load_dotenv()
+    return Settings()
+
+
+class _LazySettings:
+    """配置代理，首次访问属性时才初始化配置"""
     
-    # ==================== 日志配置 ====================
-    LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
 
 
 # 创建配置实例
-settings = Settings()
+settings = _LazySettings()
@@ -1,10 +1,19 @@
+import os
 import re
+import sys
 
-with open('/Users/wuyang.zhang/.cursor/projects/Users-wuyang-zhang-demo-3-other-fund/agent-tools/38d7e17b-159d-499e-b331-0681ad5ea7de.txt', 'r') as f:
-    content = f.read()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-match = re.search(r'var Data_currentFundManager\s*=\s*(\[.*?\]);', content, re.DOTALL)
+from src.collector.js_vars import stream_match
+
+MARKER = b'var Data_currentFundManager'
+PATTERN = re.compile(rb'var Data_currentFundManager\s*=\s*(\[.*?\]);', re.DOTALL)
+
+match = stream_match(
+    '/Users/wuyang.zhang/.cursor/projects/Users-wuyang-zhang-demo-3-other-fund/agent-tools/38d7e17b-159d-499e-b331-0681ad5ea7de.txt',
+    MARKER, PATTERN
+)
 if match:
-    print(match.group(1)[:500]) # Print first 500 chars
+    print(match.group(1)[:500].decode('utf-8', errors='ignore')) # Print first 500 chars
 else:
     print("Not found")
@@ -1,12 +1,21 @@
+import os
 import re
+import sys
 
-with open('/Users/wuyang.zhang/.cursor/projects/Users-wuyang-zhang-demo-3-other-fund/agent-tools/38d7e17b-159d-499e-b331-0681ad5ea7de.txt', 'r') as f:
-    content = f.read()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.collector.js_vars import stream_match
+
+MARKER = b'var Data_fundManagerRanges'
+PATTERN = re.compile(rb'var Data_fundManagerRanges\s*=\s*(\{.*?\});', re.DOTALL)
 
 # Look for manager ranges
-match = re.search(r'var Data_fundManagerRanges\s*=\s*(\{.*?\});', content, re.DOTALL)
+match = stream_match(
+    '/Users/wuyang.zhang/.cursor/projects/Users-wuyang-zhang-demo-3-other-fund/agent-tools/38d7e17b-159d-499e-b331-0681ad5ea7de.txt',
+    MARKER, PATTERN
+)
 if match:
     print("Found Data_fundManagerRanges")
-    print(match.group(1)[:500])
+    print(match.group(1)[:500].decode('utf-8', errors='ignore'))
 else:
     print("Data_fundManagerRanges not found")
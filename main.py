@@ -1,28 +1,40 @@
 """
 智能理财助手 - 主程序入口
 """
+import atexit
+import cmd
 import os
+import shlex
 import sys
-import json
 from datetime import date
+from functools import cached_property
 from typing import List, Dict, Optional
 from loguru import logger
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config.settings import settings
-from src.models import FundType
+from config.settings import settings, json_dump, json_iter_items
 from src.portfolio import PortfolioManager
-from src.collector import fund_collector, valuation_collector, news_collector
-from src.analyzer import ai_advisor
-from src.decision import DecisionEngine
-from src.report import report_generator
-from src.notify import notifier, wecom_bot
 
-# 量化选基模块
-from src.workflow.fund_analysis import FundAnalysisWorkflow, fund_analysis_workflow
-from src.storage.fund_storage import fund_storage
+# 数据采集、分析、通知、量化选基等模块导入较重（pandas/akshare 等），
+# 在首次用到的方法中再导入，help/quit 等命令无需等待
+
+# 评级图标
+_GRADE_ICON = {'A': '🌟', 'B': '⭐', 'C': '✨', 'D': '💫', 'E': '✦'}
+
+# 分类得分名称
+_SCORE_NAMES = {
+    'return': '收益能力',
+    'risk': '风险控制',
+    'risk_adjusted': '风险调整收益',
+    'scale': '规模因子',
+    'manager': '基金经理',
+    'style': '风格稳定性'
+}
+
+# 得分条（下标为得分的十位数，0-10）
+_BARS = tuple(('█' * k).ljust(10, '░') for k in range(11))
 
 
 class InvestmentAdvisor:
@@ -31,29 +43,70 @@ class InvestmentAdvisor:
     def __init__(self):
         # 初始化各模块
         self.portfolio_manager = PortfolioManager()
-        self.decision_engine = DecisionEngine(self.portfolio_manager.portfolio)
         
         # 关注列表（可自定义）
         self.watch_list: List[Dict] = []
         
         # 加载关注列表
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
         self._load_watch_list()
         
+        # 关注列表的修改先记在内存中，退出时统一写盘
+        self._watch_dirty = False
+        atexit.register(self._flush_watch_list)
+        
+        # 当日分析结果缓存: (日期, (报告文本, 分析结果, 组合摘要, 持仓明细))
+        # 持仓或关注列表变化时清空
+        self._today_cache: Optional[tuple] = None
+        
         logger.info("智能理财助手初始化完成")
     
+    @cached_property
+    def decision_engine(self):
+        """决策引擎（首次使用时创建）"""
+        from src.decision import DecisionEngine
+        return DecisionEngine(self.portfolio_manager.portfolio)
+    
+    @cached_property
+    def fund_workflow(self):
+        """量化选基工作流（首次使用时加载，各命令共用）"""
+        from src.workflow.fund_analysis import fund_analysis_workflow
+        return fund_analysis_workflow
+    
+    def refresh(self):
+        """重新加载持仓、交易历史和关注列表（长期运行的进程在每次任务前调用）"""
+        self.portfolio_manager.reload()
+        if not self._watch_dirty:
+            self._load_watch_list()
+        
+        # 决策引擎持有旧的持仓对象，下次使用时重建
+        self.__dict__.pop('decision_engine', None)
+        self._today_cache = None
+    
     def _load_watch_list(self):
         """加载关注列表"""
         watch_list_file = os.path.join(settings.DATA_DIR, "watch_list.json")
         if os.path.exists(watch_list_file):
-            with open(watch_list_file, 'r', encoding='utf-8') as f:
-                self.watch_list = json.load(f)
+            self.watch_list = list(json_iter_items(watch_list_file))
     
-    def _save_watch_list(self):
-        """保存关注列表"""
-        os.makedirs(settings.DATA_DIR, exist_ok=True)
+    def _mark_watch_list_changed(self):
+        """标记关注列表已修改（延迟到退出时写盘）"""
+        self._watch_dirty = True
+        self._today_cache = None
+    
+    def _flush_watch_list(self):
+        """保存关注列表（仅在有修改时写盘）
+        
+        先写临时文件再原子替换，避免写入中断时损坏原文件
+        """
+        if not self._watch_dirty:
+            return
+        
         watch_list_file = os.path.join(settings.DATA_DIR, "watch_list.json")
-        with open(watch_list_file, 'w', encoding='utf-8') as f:
-            json.dump(self.watch_list, f, ensure_ascii=False, indent=2)
+        tmp_file = watch_list_file + ".tmp"
+        json_dump(tmp_file, self.watch_list)
+        os.replace(tmp_file, watch_list_file)
+        self._watch_dirty = False
     
     def initialize(self, initial_cash: float):
         """初始化投资组合
@@ -62,10 +115,13 @@ class InvestmentAdvisor:
             initial_cash: 初始资金
         """
         self.portfolio_manager.initialize_portfolio(initial_cash)
-        logger.info(f"投资组合已初始化，初始资金: ¥{initial_cash:,.2f}")
+        self._today_cache = None
+        logger.info("投资组合已初始化，初始资金: ¥{:,.2f}", initial_cash)
     
     def add_to_watch_list(self, fund_code: str, fund_name: str = ""):
         """添加基金到关注列表"""
+        from src.collector import fund_collector
+        
         # 获取基金名称
         if not fund_name:
             nav = fund_collector.get_fund_estimate(fund_code)
@@ -75,15 +131,15 @@ class InvestmentAdvisor:
         # 检查是否已存在
         for item in self.watch_list:
             if item["code"] == fund_code:
-                logger.info(f"基金 {fund_code} 已在关注列表中")
+                logger.info("基金 {} 已在关注列表中", fund_code)
                 return
         
         self.watch_list.append({
             "code": fund_code,
             "name": fund_name or fund_code
         })
-        self._save_watch_list()
-        logger.info(f"已添加 {fund_name or fund_code} 到关注列表")
+        self._mark_watch_list_changed()
+        logger.info("已添加 {} 到关注列表", fund_name or fund_code)
     
     def remove_from_watch_list(self, fund_code: str):
         """从关注列表移除基金"""
@@ -91,19 +147,30 @@ class InvestmentAdvisor:
             item for item in self.watch_list 
             if item["code"] != fund_code
         ]
-        self._save_watch_list()
-        logger.info(f"已从关注列表移除 {fund_code}")
+        self._mark_watch_list_changed()
+        logger.info("已从关注列表移除 {}", fund_code)
     
-    def run_daily_analysis(self) -> str:
-        """运行每日分析并生成报告
+    def _run_analysis_cached(self) -> tuple:
+        """运行每日分析（同一天内复用结果）
         
         Returns:
-            生成的报告文本
+            (报告文本, 分析结果, 组合摘要, 持仓明细)
         """
+        today = date.today()
+        if self._today_cache is not None and self._today_cache[0] == today:
+            logger.info("复用今日分析结果")
+            return self._today_cache[1]
+        
+        from src.collector import fund_collector
+        from src.report import report_generator
+        
         logger.info("="*60)
         logger.info("开始每日分析...")
         logger.info("="*60)
         
+        # 每次分析重新获取估值，分析过程中同一基金的重复查询复用缓存
+        fund_collector.clear_estimate_cache()
+        
         # 1. 更新持仓净值
         self._update_portfolio_prices()
         
@@ -121,7 +188,18 @@ class InvestmentAdvisor:
         )
         
         logger.info("每日分析完成")
-        return report_text
+        
+        result = (report_text, analysis_result, portfolio_summary, position_details)
+        self._today_cache = (today, result)
+        return result
+    
+    def run_daily_analysis(self) -> str:
+        """运行每日分析并生成报告
+        
+        Returns:
+            生成的报告文本
+        """
+        return self._run_analysis_cached()[0]
     
     def run_and_notify(self, use_wecom: bool = True):
         """运行分析并发送通知
@@ -129,27 +207,9 @@ class InvestmentAdvisor:
         Args:
             use_wecom: 是否使用企业微信发送（默认True）
         """
-        # 运行分析
-        logger.info("="*60)
-        logger.info("开始每日分析...")
-        logger.info("="*60)
+        from src.notify import notifier, wecom_bot
         
-        # 更新持仓净值
-        self._update_portfolio_prices()
-        
-        # 运行分析
-        analysis_result = self.decision_engine.run_daily_analysis(self.watch_list)
-        
-        # 获取摘要数据
-        portfolio_summary = self.portfolio_manager.get_portfolio_summary()
-        position_details = self.portfolio_manager.get_position_details()
-        
-        # 生成文本报告
-        report_text = report_generator.generate_daily_report(
-            analysis_result,
-            portfolio_summary,
-            position_details
-        )
+        report_text, analysis_result, portfolio_summary, _ = self._run_analysis_cached()
         
         # 发送通知
         results = {}
@@ -166,36 +226,29 @@ class InvestmentAdvisor:
             )
             results["wecom"] = wecom_result
             
-            # 如果有卖出建议（止盈止损），单独发送提醒
-            for sell_suggestion in suggestions.get("sell", []):
-                wecom_bot.send_trade_alert(
-                    trade_type="sell",
-                    fund_name=sell_suggestion.get("fund_name", ""),
-                    fund_code=sell_suggestion.get("fund_code", ""),
-                    reason=", ".join(sell_suggestion.get("reasons", [])),
-                    amount=sell_suggestion.get("suggested_amount"),
-                    confidence=sell_suggestion.get("confidence", 3)
-                )
+            # 如果有卖出建议（止盈止损），合并为一条提醒发送
+            if suggestions.get("sell"):
+                wecom_bot.send_batched_trade_alerts(suggestions["sell"])
         
         # 其他通知渠道
         other_results = notifier.send_daily_report(report_text)
         results.update(other_results)
         
-        logger.info(f"通知发送结果: {results}")
+        logger.info("通知发送结果: {}", results)
         return report_text
     
     def _update_portfolio_prices(self):
         """更新持仓净值"""
+        from src.collector import fund_collector
+        
         if not self.portfolio_manager.portfolio.positions:
             return
         
         fund_codes = [p.fund_code for p in self.portfolio_manager.portfolio.positions]
-        nav_dict = {}
-        
-        for code in fund_codes:
-            nav = fund_collector.get_fund_estimate(code)
-            if nav:
-                nav_dict[code] = nav.nav
+        nav_dict = {
+            code: nav.nav
+            for code, nav in fund_collector.get_fund_estimates_bulk(fund_codes).items()
+        }
         
         if nav_dict:
             self.portfolio_manager.update_prices(nav_dict)
@@ -216,10 +269,12 @@ class InvestmentAdvisor:
         Returns:
             是否成功
         """
+        from src.collector import fund_collector
+        
         # 获取基金信息
         nav = fund_collector.get_fund_estimate(fund_code)
         if not nav:
-            logger.error(f"无法获取基金 {fund_code} 的净值")
+            logger.error("无法获取基金 {} 的净值", fund_code)
             return False
         
         # 计算份额
@@ -234,14 +289,15 @@ class InvestmentAdvisor:
         )
         
         if not check_result["allowed"]:
-            logger.warning(f"风控检查未通过: {check_result['warnings']}")
+            logger.warning("风控检查未通过: {}", check_result['warnings'])
             return False
         
         if check_result["warnings"]:
             for warning in check_result["warnings"]:
-                logger.warning(f"风险提示: {warning}")
+                logger.warning("风险提示: {}", warning)
         
         # 执行买入
+        self._today_cache = None
         return self.portfolio_manager.add_position(
             fund_code=fund_code,
             fund_name=nav.name,
@@ -269,9 +325,11 @@ class InvestmentAdvisor:
         Returns:
             是否成功
         """
+        from src.collector import fund_collector
+        
         position = self.portfolio_manager.portfolio.get_position(fund_code)
         if not position:
-            logger.error(f"未持有基金 {fund_code}")
+            logger.error("未持有基金 {}", fund_code)
             return False
         
         # 确定卖出份额
@@ -284,6 +342,7 @@ class InvestmentAdvisor:
         nav = fund_collector.get_fund_estimate(fund_code)
         price = nav.nav if nav else position.current_price
         
+        self._today_cache = None
         return self.portfolio_manager.reduce_position(
             fund_code=fund_code,
             shares=shares,
@@ -310,50 +369,55 @@ class InvestmentAdvisor:
         summary = self.portfolio_manager.get_portfolio_summary()
         details = self.portfolio_manager.get_position_details()
         
-        print("\n" + "="*60)
-        print("📊 当前持仓")
-        print("="*60)
-        print(f"总资产: ¥{summary['total_value']:,.2f}")
-        print(f"现金: ¥{summary['cash']:,.2f}")
-        print(f"仓位: {summary['position_ratio']*100:.1f}%")
-        print(f"总收益: ¥{summary['total_profit']:,.2f} ({summary['total_profit_rate']*100:.2f}%)")
-        print("-"*60)
+        # 先拼接全部文本再一次写出，减少控制台写入次数
+        out = ["\n" + "="*60]
+        out.append("📊 当前持仓")
+        out.append("="*60)
+        out.append(f"总资产: ¥{summary['total_value']:,.2f}")
+        out.append(f"现金: ¥{summary['cash']:,.2f}")
+        out.append(f"仓位: {summary['position_ratio']*100:.1f}%")
+        out.append(f"总收益: ¥{summary['total_profit']:,.2f} ({summary['total_profit_rate']*100:.2f}%)")
+        out.append("-"*60)
         
         if details:
             for pos in details:
                 profit_sign = "+" if pos['profit_rate'] >= 0 else ""
-                print(f"\n{pos['fund_name']} ({pos['fund_code']})")
-                print(f"  类型: {pos['fund_type']}")
-                print(f"  份额: {pos['shares']:,.2f}")
-                print(f"  市值: ¥{pos['market_value']:,.2f}")
-                print(f"  收益: {profit_sign}{pos['profit_rate']*100:.2f}%")
+                out.append(f"\n{pos['fund_name']} ({pos['fund_code']})")
+                out.append(f"  类型: {pos['fund_type']}")
+                out.append(f"  份额: {pos['shares']:,.2f}")
+                out.append(f"  市值: ¥{pos['market_value']:,.2f}")
+                out.append(f"  收益: {profit_sign}{pos['profit_rate']*100:.2f}%")
         else:
-            print("\n暂无持仓")
+            out.append("\n暂无持仓")
         
-        print("="*60 + "\n")
+        out.append("="*60 + "\n")
+        sys.stdout.write("\n".join(out) + "\n")
     
     def show_market_overview(self):
         """显示市场概览"""
-        print("\n" + "="*60)
-        print("📈 市场概览")
-        print("="*60)
+        from src.collector import news_collector, valuation_collector
+        
+        out = ["\n" + "="*60]
+        out.append("📈 市场概览")
+        out.append("="*60)
         
         # 获取市场数据
         market = news_collector.get_market_summary()
-        print(f"上证指数: {market.sh_index:.2f} ({market.sh_change*100:+.2f}%)")
-        print(f"深证成指: {market.sz_index:.2f} ({market.sz_change*100:+.2f}%)")
-        print(f"沪深300: {market.hs300_index:.2f} ({market.hs300_change*100:+.2f}%)")
-        print(f"市场情绪: {market.market_sentiment}")
+        out.append(f"上证指数: {market.sh_index:.2f} ({market.sh_change*100:+.2f}%)")
+        out.append(f"深证成指: {market.sz_index:.2f} ({market.sz_change*100:+.2f}%)")
+        out.append(f"沪深300: {market.hs300_index:.2f} ({market.hs300_change*100:+.2f}%)")
+        out.append(f"市场情绪: {market.market_sentiment}")
         
-        print("-"*60)
+        out.append("-"*60)
         
         # 获取估值数据
         valuation = valuation_collector.get_market_overall_valuation()
-        print(f"估值水平: {valuation['level']}")
-        print(f"PE百分位: {valuation['pe_percentile']:.1f}%")
-        print(f"建议: {valuation['suggestion']}")
+        out.append(f"估值水平: {valuation['level']}")
+        out.append(f"PE百分位: {valuation['pe_percentile']:.1f}%")
+        out.append(f"建议: {valuation['suggestion']}")
         
-        print("="*60 + "\n")
+        out.append("="*60 + "\n")
+        sys.stdout.write("\n".join(out) + "\n")
     
     # ============ 量化选基功能 ============
     
@@ -373,8 +437,7 @@ class InvestmentAdvisor:
         """
         logger.info("开始量化选基分析...")
         
-        workflow = FundAnalysisWorkflow()
-        result = workflow.run_full_analysis(
+        result = self.fund_workflow.run_full_analysis(
             fund_types=fund_types,
             top_n=top_n,
             use_cache=True,
@@ -392,8 +455,7 @@ class InvestmentAdvisor:
         Returns:
             分析结果
         """
-        workflow = FundAnalysisWorkflow()
-        return workflow.analyze_single_fund(fund_code)
+        return self.fund_workflow.analyze_single_fund(fund_code)
     
     def show_top_funds(
         self, 
@@ -406,31 +468,39 @@ class InvestmentAdvisor:
             fund_type: 基金类型
             top_n: 显示数量
         """
-        print("\n" + "="*60)
-        print(f"📊 {fund_type} 基金推荐 TOP {top_n}")
-        print("="*60)
+        import pandas as pd
+        
+        out = ["\n" + "="*60]
+        out.append(f"📊 {fund_type} 基金推荐 TOP {top_n}")
+        out.append("="*60)
         
-        workflow = FundAnalysisWorkflow()
-        recommendations = workflow.get_top_recommendations(fund_type, top_n)
+        recommendations = self.fund_workflow.get_top_recommendations(fund_type, top_n)
         
         if not recommendations:
-            print("暂无推荐数据，请先运行 screen 命令进行分析")
+            out.append("暂无推荐数据，请先运行 screen 命令进行分析")
+            sys.stdout.write("\n".join(out) + "\n")
             return
         
-        for i, rec in enumerate(recommendations, 1):
-            grade = rec.get('grade', '-')
-            score = rec.get('total_score', 0)
-            name = rec.get('fund_name', '')[:12]  # 截断过长的名字
-            code = rec.get('fund_code', '')
-            
-            # 根据评级显示不同颜色
-            grade_icon = {'A': '🌟', 'B': '⭐', 'C': '✨', 'D': '💫', 'E': '✦'}.get(grade, '·')
-            
-            print(f"  {i:2d}. {grade_icon} [{grade}] {score:.1f}分  {name}({code})")
-        
-        print("="*60)
-        print("评分等级: A(≥80) B(≥70) C(≥60) D(≥50) E(<50)")
-        print("="*60 + "\n")
+        # 按列整体拼接每行文本
+        df = pd.DataFrame(recommendations).reindex(
+            columns=['grade', 'total_score', 'fund_name', 'fund_code']
+        )
+        grade = df['grade'].fillna('-')
+        score = df['total_score'].fillna(0).map('{:.1f}'.format)
+        name = df['fund_name'].fillna('').astype(str).str[:12]  # 截断过长的名字
+        code = df['fund_code'].fillna('').astype(str)
+        rank = pd.Series(range(1, len(df) + 1), index=df.index).map('{:2d}'.format)
+        
+        # 根据评级显示不同颜色
+        grade_icon = grade.map(_GRADE_ICON).fillna('·')
+        
+        lines = "  " + rank + ". " + grade_icon + " [" + grade + "] " + score + "分  " + name + "(" + code + ")"
+        out.extend(lines)
+        
+        out.append("="*60)
+        out.append("评分等级: A(≥80) B(≥70) C(≥60) D(≥50) E(<50)")
+        out.append("="*60 + "\n")
+        sys.stdout.write("\n".join(out) + "\n")
     
     def show_fund_analysis(self, fund_code: str):
         """显示单只基金的详细分析
@@ -446,9 +516,9 @@ class InvestmentAdvisor:
             print(f"❌ 分析失败: {result.get('error', '未知错误')}")
             return
         
-        print("\n" + "="*60)
-        print(f"📊 基金分析报告: {fund_code}")
-        print("="*60)
+        out = ["\n" + "="*60]
+        out.append(f"📊 基金分析报告: {fund_code}")
+        out.append("="*60)
         
         # 评分信息
         score = result.get('score', {})
@@ -458,52 +528,48 @@ class InvestmentAdvisor:
         grade = rec.get('grade', '-')
         action = rec.get('action', '-')
         
-        print(f"\n综合评分: {total_score:.1f} / 100  等级: {grade}")
-        print(f"投资建议: {action}")
+        out.append(f"\n综合评分: {total_score:.1f} / 100  等级: {grade}")
+        out.append(f"投资建议: {action}")
         
         # 分类得分
         cat_scores = score.get('category_scores', {})
         if cat_scores:
-            print("\n分类得分:")
-            score_names = {
-                'return': '收益能力',
-                'risk': '风险控制',
-                'risk_adjusted': '风险调整收益',
-                'scale': '规模因子',
-                'manager': '基金经理',
-                'style': '风格稳定性'
-            }
+            out.append("\n分类得分:")
             for cat, cat_score in cat_scores.items():
-                name = score_names.get(cat, cat)
-                bar = '█' * int(cat_score / 10) + '░' * (10 - int(cat_score / 10))
-                print(f"  {name}: {bar} {cat_score:.1f}")
+                name = _SCORE_NAMES.get(cat, cat)
+                bar = _BARS[min(max(int(cat_score / 10), 0), 10)]
+                out.append(f"  {name}: {bar} {cat_score:.1f}")
         
         # 预筛选结果
         prefilter = result.get('prefilter_passed', False)
-        print(f"\n4433筛选: {'✅ 通过' if prefilter else '❌ 未通过'}")
+        out.append(f"\n4433筛选: {'✅ 通过' if prefilter else '❌ 未通过'}")
         
         # 投资建议
         reasons = rec.get('reasons', [])
         risks = rec.get('risks', [])
         
         if reasons:
-            print("\n✅ 优势:")
+            out.append("\n✅ 优势:")
             for r in reasons:
-                print(f"  · {r}")
+                out.append(f"  · {r}")
         
         if risks:
-            print("\n⚠️ 风险提示:")
+            out.append("\n⚠️ 风险提示:")
             for r in risks:
-                print(f"  · {r}")
+                out.append(f"  · {r}")
         
-        print("\n" + "="*60 + "\n")
+        out.append("\n" + "="*60 + "\n")
+        sys.stdout.write("\n".join(out) + "\n")
 
 
-def main():
-    """主函数 - 交互式命令行界面"""
-    advisor = InvestmentAdvisor()
+class AdvisorShell(cmd.Cmd):
+    """交互式命令行
     
-    print("""
+    每个命令对应一个 do_<命令> 方法；支持从标准输入读取脚本批量执行，
+    如 python main.py < commands.txt
+    """
+    
+    intro = """
 ╔══════════════════════════════════════════════════════════════╗
 ║                    智能理财助手 v1.1                          ║
 ║                                                              ║
@@ -532,149 +598,10 @@ def main():
 ║    help            - 显示帮助                                 ║
 ║    quit            - 退出                                     ║
 ╚══════════════════════════════════════════════════════════════╝
-    """)
+    """
+    prompt = "\n> "
     
-    while True:
-        try:
-            cmd = input("\n> ").strip().split()
-            if not cmd:
-                continue
-            
-            action = cmd[0].lower()
-            
-            if action == "quit" or action == "exit":
-                print("再见！祝投资顺利！")
-                break
-            
-            elif action == "init":
-                if len(cmd) < 2:
-                    print("用法: init <金额>")
-                    continue
-                amount = float(cmd[1])
-                advisor.initialize(amount)
-            
-            elif action == "buy":
-                if len(cmd) < 3:
-                    print("用法: buy <基金代码> <金额>")
-                    continue
-                fund_code = cmd[1]
-                amount = float(cmd[2])
-                reason = " ".join(cmd[3:]) if len(cmd) > 3 else ""
-                success = advisor.buy_fund(fund_code, amount, reason)
-                if success:
-                    print(f"✅ 买入成功")
-                else:
-                    print(f"❌ 买入失败")
-            
-            elif action == "sell":
-                if len(cmd) < 2:
-                    print("用法: sell <基金代码> [卖出比例0-1]")
-                    continue
-                fund_code = cmd[1]
-                ratio = float(cmd[2]) if len(cmd) > 2 else 1.0
-                reason = " ".join(cmd[3:]) if len(cmd) > 3 else ""
-                success = advisor.sell_fund(fund_code, ratio=ratio, reason=reason)
-                if success:
-                    print(f"✅ 卖出成功")
-                else:
-                    print(f"❌ 卖出失败")
-            
-            elif action == "watch":
-                if len(cmd) < 2:
-                    print("用法: watch <基金代码>")
-                    continue
-                advisor.add_to_watch_list(cmd[1])
-            
-            elif action == "unwatch":
-                if len(cmd) < 2:
-                    print("用法: unwatch <基金代码>")
-                    continue
-                advisor.remove_from_watch_list(cmd[1])
-            
-            elif action == "analyze":
-                print("正在分析，请稍候...")
-                report = advisor.run_daily_analysis()
-                print(report)
-            
-            elif action == "notify":
-                print("正在分析并发送企业微信通知...")
-                if not wecom_bot.enabled:
-                    print("❌ 企业微信未配置，请先配置 WECOM_WEBHOOK")
-                    print("   参考文档: docs/企业微信配置指南.md")
-                    continue
-                report = advisor.run_and_notify(use_wecom=True)
-                print("✅ 分析完成，通知已发送")
-                print(report)
-            
-            elif action == "test_wecom":
-                print("正在测试企业微信连接...")
-                if not wecom_bot.enabled:
-                    print("❌ 企业微信未配置")
-                    print("   请在 .env 文件中设置 WECOM_WEBHOOK")
-                    print("   参考文档: docs/企业微信配置指南.md")
-                else:
-                    success = wecom_bot.send_test_message()
-                    if success:
-                        print("✅ 企业微信测试消息发送成功！请检查您的企业微信群")
-                    else:
-                        print("❌ 企业微信测试消息发送失败，请检查Webhook配置")
-            
-            elif action == "suggest":
-                if len(cmd) < 2:
-                    print("用法: suggest <基金代码>")
-                    continue
-                suggestion = advisor.get_fund_suggestion(cmd[1])
-                if suggestion:
-                    print(f"\n基金: {suggestion['fund_name']} ({suggestion['fund_code']})")
-                    print(f"建议: {suggestion['signal']}")
-                    print(f"置信度: {'★' * suggestion['confidence'] + '☆' * (5 - suggestion['confidence'])}")
-                    print(f"理由: {', '.join(suggestion['reasons'])}")
-                else:
-                    print("无法获取建议")
-            
-            elif action == "portfolio":
-                advisor.show_portfolio()
-            
-            elif action == "market":
-                advisor.show_market_overview()
-            
-            # ===== 量化选基命令 =====
-            elif action == "screen":
-                # 运行量化选基分析
-                fund_types = None
-                if len(cmd) > 1:
-                    # 支持指定类型，如 screen 股票型 混合型
-                    fund_types = cmd[1:]
-                
-                print("正在运行量化选基分析，这可能需要几分钟时间...")
-                result = advisor.run_fund_screening(fund_types=fund_types)
-                
-                print(f"\n✅ 分析完成!")
-                print(f"耗时: {result.get('elapsed_seconds', 0):.1f} 秒")
-                
-                stats = result.get('statistics', {})
-                for fund_type, type_stats in stats.items():
-                    print(f"\n{fund_type}:")
-                    print(f"  分析: {type_stats.get('analyzed', 0)} 只")
-                    print(f"  通过筛选: {type_stats.get('passed_prefilter', 0)} 只")
-                
-                print("\n使用 'top [类型]' 命令查看推荐基金列表")
-            
-            elif action == "top":
-                # 查看推荐基金
-                fund_type = cmd[1] if len(cmd) > 1 else 'all'
-                top_n = int(cmd[2]) if len(cmd) > 2 else 10
-                advisor.show_top_funds(fund_type, top_n)
-            
-            elif action == "detail":
-                # 查看基金详细分析
-                if len(cmd) < 2:
-                    print("用法: detail <基金代码>")
-                    continue
-                advisor.show_fund_analysis(cmd[1])
-            
-            elif action == "help":
-                print("""
+    HELP_TEXT = """
 命令列表:
 
 【基础命令】
@@ -706,17 +633,200 @@ def main():
 【其他】
   help             - 显示帮助
   quit             - 退出程序
-                """)
-            
-            else:
-                print(f"未知命令: {action}，输入 help 查看帮助")
-        
-        except KeyboardInterrupt:
-            print("\n再见！")
-            break
+                """
+    
+    def __init__(self, advisor: InvestmentAdvisor):
+        super().__init__()
+        self.advisor = advisor
+    
+    # ============ 命令分发 ============
+    
+    def precmd(self, line: str) -> str:
+        """命令名不区分大小写（输入结束标记 EOF 除外）"""
+        parts = line.strip().split(maxsplit=1)
+        if not parts or line == "EOF":
+            return line
+        return " ".join([parts[0].lower(), *parts[1:]])
+    
+    def onecmd(self, line: str) -> bool:
+        """执行单条命令，出错时提示并继续"""
+        try:
+            return super().onecmd(line)
         except Exception as e:
-            logger.error(f"执行命令时出错: {e}")
+            logger.error("执行命令时出错: {}", e)
             print(f"❌ 错误: {e}")
+            return False
+    
+    def emptyline(self) -> bool:
+        """空行不重复上一条命令"""
+        return False
+    
+    def default(self, line: str):
+        print(f"未知命令: {line.split()[0]}，输入 help 查看帮助")
+    
+    # ============ 基础命令 ============
+    
+    def do_quit(self, arg: str) -> bool:
+        print("再见！祝投资顺利！")
+        return True
+    
+    do_exit = do_quit
+    
+    def do_EOF(self, arg: str) -> bool:
+        print()
+        return self.do_quit(arg)
+    
+    def do_init(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: init <金额>")
+            return
+        amount = float(args[0])
+        self.advisor.initialize(amount)
+    
+    def do_buy(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 2:
+            print("用法: buy <基金代码> <金额>")
+            return
+        fund_code = args[0]
+        amount = float(args[1])
+        reason = " ".join(args[2:])
+        success = self.advisor.buy_fund(fund_code, amount, reason)
+        if success:
+            print(f"✅ 买入成功")
+        else:
+            print(f"❌ 买入失败")
+    
+    def do_sell(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: sell <基金代码> [卖出比例0-1]")
+            return
+        fund_code = args[0]
+        ratio = float(args[1]) if len(args) > 1 else 1.0
+        reason = " ".join(args[2:])
+        success = self.advisor.sell_fund(fund_code, ratio=ratio, reason=reason)
+        if success:
+            print(f"✅ 卖出成功")
+        else:
+            print(f"❌ 卖出失败")
+    
+    def do_watch(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: watch <基金代码>")
+            return
+        self.advisor.add_to_watch_list(args[0])
+    
+    def do_unwatch(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: unwatch <基金代码>")
+            return
+        self.advisor.remove_from_watch_list(args[0])
+    
+    def do_portfolio(self, arg: str):
+        self.advisor.show_portfolio()
+    
+    # ============ 分析命令 ============
+    
+    def do_analyze(self, arg: str):
+        print("正在分析，请稍候...")
+        report = self.advisor.run_daily_analysis()
+        print(report)
+    
+    def do_suggest(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: suggest <基金代码>")
+            return
+        suggestion = self.advisor.get_fund_suggestion(args[0])
+        if suggestion:
+            print(f"\n基金: {suggestion['fund_name']} ({suggestion['fund_code']})")
+            print(f"建议: {suggestion['signal']}")
+            print(f"置信度: {'★' * suggestion['confidence'] + '☆' * (5 - suggestion['confidence'])}")
+            print(f"理由: {', '.join(suggestion['reasons'])}")
+        else:
+            print("无法获取建议")
+    
+    def do_market(self, arg: str):
+        self.advisor.show_market_overview()
+    
+    # ============ 通知命令 ============
+    
+    def do_notify(self, arg: str):
+        print("正在分析并发送企业微信通知...")
+        from src.notify import wecom_bot
+        if not wecom_bot.enabled:
+            print("❌ 企业微信未配置，请先配置 WECOM_WEBHOOK")
+            print("   参考文档: docs/企业微信配置指南.md")
+            return
+        report = self.advisor.run_and_notify(use_wecom=True)
+        print("✅ 分析完成，通知已发送")
+        print(report)
+    
+    def do_test_wecom(self, arg: str):
+        print("正在测试企业微信连接...")
+        from src.notify import wecom_bot
+        if not wecom_bot.enabled:
+            print("❌ 企业微信未配置")
+            print("   请在 .env 文件中设置 WECOM_WEBHOOK")
+            print("   参考文档: docs/企业微信配置指南.md")
+        else:
+            success = wecom_bot.send_test_message()
+            if success:
+                print("✅ 企业微信测试消息发送成功！请检查您的企业微信群")
+            else:
+                print("❌ 企业微信测试消息发送失败，请检查Webhook配置")
+    
+    # ============ 量化选基命令 ============
+    
+    def do_screen(self, arg: str):
+        # 支持指定类型，如 screen 股票型 混合型
+        fund_types = shlex.split(arg) or None
+        
+        print("正在运行量化选基分析，这可能需要几分钟时间...")
+        result = self.advisor.run_fund_screening(fund_types=fund_types)
+        
+        print(f"\n✅ 分析完成!")
+        print(f"耗时: {result.get('elapsed_seconds', 0):.1f} 秒")
+        
+        stats = result.get('statistics', {})
+        for fund_type, type_stats in stats.items():
+            print(f"\n{fund_type}:")
+            print(f"  分析: {type_stats.get('analyzed', 0)} 只")
+            print(f"  通过筛选: {type_stats.get('passed_prefilter', 0)} 只")
+        
+        print("\n使用 'top [类型]' 命令查看推荐基金列表")
+    
+    def do_top(self, arg: str):
+        args = shlex.split(arg)
+        fund_type = args[0] if len(args) > 0 else 'all'
+        top_n = int(args[1]) if len(args) > 1 else 10
+        self.advisor.show_top_funds(fund_type, top_n)
+    
+    def do_detail(self, arg: str):
+        args = shlex.split(arg)
+        if len(args) < 1:
+            print("用法: detail <基金代码>")
+            return
+        self.advisor.show_fund_analysis(args[0])
+    
+    # ============ 其他 ============
+    
+    def do_help(self, arg: str):
+        print(self.HELP_TEXT)
+
+
+def main():
+    """主函数 - 交互式命令行界面"""
+    advisor = InvestmentAdvisor()
+    
+    try:
+        AdvisorShell(advisor).cmdloop()
+    except KeyboardInterrupt:
+        print("\n再见！")
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # 设置控制台编码
 if sys.platform == 'win32':
@@ -15,7 +16,6 @@ if sys.platform == 'win32':
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from loguru import logger
-import pandas as pd
 
 # 配置日志输出到控制台
 logger.remove()
@@ -47,20 +47,20 @@ def demo_single_fund_analysis():
     scoring = ScoringModel()
     pre_filter = PreFilter()
     
-    results = []
-    
-    for fund_code, fund_name in test_funds:
-        print(f"\n正在分析: {fund_name} ({fund_code})...")
+    def analyze(fund):
+        """分析单只基金，返回 (输出文本, 结果)，各基金互不依赖可并发执行"""
+        fund_code, fund_name = fund
+        lines = [f"\n正在分析: {fund_name} ({fund_code})..."]
         
         try:
             # 获取净值数据
             nav_data = collector.get_fund_nav_history(fund_code)
             
             if nav_data is None or nav_data.empty:
-                print(f"  [X] 无法获取净值数据")
-                continue
+                lines.append(f"  [X] 无法获取净值数据")
+                return lines, None
             
-            print(f"  获取到 {len(nav_data)} 条净值记录")
+            lines.append(f"  获取到 {len(nav_data)} 条净值记录")
             
             # 计算因子
             factors = factor_calc.calculate_all_factors(nav_data=nav_data)
@@ -74,7 +74,9 @@ def demo_single_fund_analysis():
             prefilter_data = {**factors}
             passed, _ = pre_filter.filter_single(prefilter_data)
             
-            results.append({
+            lines.append(f"  [OK] 评分: {total_score:.1f} 等级: {grade}")
+            
+            return lines, {
                 'fund_code': fund_code,
                 'fund_name': fund_name,
                 'total_score': total_score,
@@ -83,12 +85,20 @@ def demo_single_fund_analysis():
                 'return_1y': factors.get('return_1y', 0),
                 'max_drawdown': factors.get('max_drawdown', 0),
                 'sharpe_ratio': factors.get('sharpe_ratio', 0),
-            })
-            
-            print(f"  [OK] 评分: {total_score:.1f} 等级: {grade}")
+            }
             
         except Exception as e:
-            print(f"  [X] 分析失败: {e}")
+            lines.append(f"  [X] 分析失败: {e}")
+            return lines, None
+    
+    results = []
+    
+    # 并发分析，按原顺序输出
+    with ThreadPoolExecutor(max_workers=len(test_funds)) as executor:
+        for lines, result in executor.map(analyze, test_funds):
+            print("\n".join(lines))
+            if result:
+                results.append(result)
     
     # 显示结果
     if results:
@@ -111,6 +121,7 @@ def demo_fund_list():
     print("[基金列表获取演示]")
     print("="*60)
     
+    import pandas as pd
     from src.collector.eastmoney_collector import EastMoneyCollector
     from src.collector.alipay_filter import AlipayFundFilter
     
@@ -147,6 +158,7 @@ def demo_top_funds():
     print("[基金业绩排名演示]")
     print("="*60)
     
+    import pandas as pd
     from src.collector.eastmoney_collector import EastMoneyCollector
     
     collector = EastMoneyCollector()
@@ -164,11 +176,15 @@ def demo_top_funds():
         else:
             top10 = rank_df.head(10)
         
-        for i, row in enumerate(top10.itertuples(), 1):
-            code = getattr(row, 'fund_code', '')
-            name = getattr(row, 'fund_name', '')[:12]
-            ret_1y = getattr(row, 'return_1y', 0)
-            
+        # 列缺失时补默认值，名称截断一次性向量化完成
+        top10 = top10.assign(**{
+            col: top10[col] if col in top10.columns else default
+            for col, default in (('fund_code', ''), ('fund_name', ''), ('return_1y', 0))
+        })
+        top10['fund_name'] = top10['fund_name'].fillna('').astype(str).str.slice(0, 12)
+        
+        rows = top10[['fund_code', 'fund_name', 'return_1y']].itertuples(index=False, name=None)
+        for i, (code, name, ret_1y) in enumerate(rows, 1):
             if pd.notna(ret_1y):
                 print(f"  {i:2d}. {name:12s} ({code})  {ret_1y:+.2f}%")
     else:
@@ -2,29 +2,53 @@
 定时任务调度器
 用于自动化每日分析和通知
 """
+import asyncio
 import os
+import re
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from functools import lru_cache
+import pandas as pd
 from loguru import logger
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
     from apscheduler.triggers.cron import CronTrigger
     HAS_SCHEDULER = True
 except ImportError:
     HAS_SCHEDULER = False
     logger.warning("APScheduler未安装，定时任务功能不可用")
 
+try:
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+except ImportError:
+    SQLAlchemyJobStore = None
+
 from config.settings import settings
 from main import InvestmentAdvisor
+from src.collector import news_collector
+from src.notify import notifier, wecom_bot
 
 # 量化选基模块
 from src.workflow.fund_analysis import FundAnalysisWorkflow
 from src.storage.fund_storage import fund_storage
 
+# 每日数据更新的并发线程数（任务以网络请求为主）
+FUND_UPDATE_WORKERS = 16
+
+# 从异常类型（如"沪深300大跌"）中去掉涨跌后缀，得到指数名称
+_ALERT_SUFFIX_PAT = re.compile(r'大跌|大涨')
+
+
+@lru_cache(maxsize=1)
+def get_advisor() -> InvestmentAdvisor:
+    """获取理财助手单例，各定时任务共用，避免每次任务重复初始化"""
+    return InvestmentAdvisor()
+
 
 def setup_logging():
     """配置日志"""
@@ -44,7 +68,8 @@ def morning_collection():
     """早间数据采集（09:00）"""
     logger.info("执行早间数据采集...")
     try:
-        advisor = InvestmentAdvisor()
+        advisor = get_advisor()
+        advisor.refresh()
         # 这里可以添加特定的早间采集逻辑
         logger.info("早间数据采集完成")
     except Exception as e:
@@ -55,13 +80,13 @@ def daily_analysis():
     """每日分析（10:00）- 通过邮件发送"""
     logger.info("执行每日分析...")
     try:
-        advisor = InvestmentAdvisor()
+        advisor = get_advisor()
+        advisor.refresh()
         report = advisor.run_daily_analysis()
         
         # 通过邮件发送报告
-        from src.notify import notifier
         result = notifier.send_email(
-            subject=f"【理财日报】{__import__('datetime').date.today().strftime('%Y-%m-%d')}",
+            subject=f"【理财日报】{date.today().isoformat()}",
             content=report
         )
         
@@ -77,20 +102,18 @@ def market_check():
     """盘中检查（11:30, 14:30）"""
     logger.info("执行盘中检查...")
     try:
-        from src.collector import news_collector
-        from src.notify import notifier, wecom_bot
-        
         # 检查市场异常
         anomaly = news_collector.check_market_anomaly()
         if anomaly["has_anomaly"]:
-            # 通过企业微信发送预警
-            for a in anomaly["anomalies"]:
-                wecom_bot.send_market_alert(
-                    alert_type="crash" if a["value"] < 0 else "surge",
-                    index_name=a["type"].replace("大跌", "").replace("大涨", ""),
-                    change_pct=a["value"],
-                    message=anomaly.get("recommendation", "")
-                )
+            # 通过企业微信发送预警（未配置时跳过消息构建）
+            if wecom_bot.enabled:
+                for a in anomaly["anomalies"]:
+                    wecom_bot.send_market_alert(
+                        alert_type="crash" if a["value"] < 0 else "surge",
+                        index_name=_ALERT_SUFFIX_PAT.sub("", a["type"]),
+                        change_pct=a["value"],
+                        message=anomaly.get("recommendation", "")
+                    )
             
             # 其他渠道
             message = "\n".join([
@@ -123,20 +146,28 @@ def fund_screening():
         
         # 发送通知
         try:
-            from src.notify import wecom_bot
-            
             if wecom_bot.enabled:
-                # 构建推荐摘要
+                # 构建推荐摘要，各类型 TOP 5 合并为一张表后按列拼接文本
+                top_funds = result.get('top_funds', {})
+                rows = [
+                    dict(fund, fund_type=fund_type)
+                    for fund_type, funds in top_funds.items()
+                    for fund in funds[:5]
+                ]
                 summary_lines = ["📊 本周基金筛选结果\n"]
                 
-                for fund_type, top_funds in result.get('top_funds', {}).items():
-                    if top_funds:
+                if rows:
+                    df = pd.DataFrame(rows).reindex(
+                        columns=['fund_type', 'fund_name', 'fund_code', 'total_score']
+                    )
+                    df['line'] = (
+                        "  " + df['fund_name'].fillna('').astype(str).str[:10]
+                        + "(" + df['fund_code'].fillna('').astype(str) + ") "
+                        + df['total_score'].fillna(0).map('{:.1f}'.format) + "分"
+                    )
+                    for fund_type, group in df.groupby('fund_type', sort=False):
                         summary_lines.append(f"\n【{fund_type}】TOP 5:")
-                        for fund in top_funds[:5]:
-                            name = fund.get('fund_name', '')[:10]
-                            code = fund.get('fund_code', '')
-                            score = fund.get('total_score', 0)
-                            summary_lines.append(f"  {name}({code}) {score:.1f}分")
+                        summary_lines.extend(group['line'])
                 
                 summary = "\n".join(summary_lines)
                 wecom_bot.send_text(summary)
@@ -158,105 +189,138 @@ def daily_fund_update():
         # 更新推荐基金的最新数据
         workflow = FundAnalysisWorkflow()
         
-        # 只更新评分 TOP 基金的数据
-        for fund_type in ['股票型', '混合型', '指数型', '债券型']:
-            top_funds = fund_storage.get_top_funds(fund_type, top_n=20)
-            if top_funds.empty:
-                continue
-            
-            logger.info(f"更新 {fund_type} TOP 20 基金数据...")
-            for fund_code in top_funds['fund_code'].tolist():
+        # 只更新评分 TOP 基金的数据，先汇总各类型的基金代码
+        fund_codes = []
+        top_by_type = fund_storage.get_top_funds_multi(
+            ['股票型', '混合型', '指数型', '债券型'], top_n=20
+        )
+        for fund_type, top_funds in top_by_type.items():
+            logger.info("更新 {} TOP 20 基金数据...", fund_type)
+            fund_codes.extend(top_funds['fund_code'].tolist())
+        
+        # 并发获取，网络请求相互重叠
+        with ThreadPoolExecutor(max_workers=FUND_UPDATE_WORKERS) as executor:
+            futures = {
+                executor.submit(workflow._get_fund_factors, fund_code, use_cache=False): fund_code
+                for fund_code in fund_codes
+            }
+            for future in as_completed(futures):
                 try:
-                    workflow._get_fund_factors(fund_code, use_cache=False)
+                    future.result()
                 except Exception as e:
-                    logger.debug(f"更新基金 {fund_code} 失败: {e}")
+                    logger.debug("更新基金 {} 失败: {}", futures[future], e)
         
         logger.info("每日基金数据更新完成")
     except Exception as e:
-        logger.error(f"每日基金数据更新失败: {e}")
+        logger.error("每日基金数据更新失败: {}", e)
 
 
-def run_scheduler():
-    """运行定时调度器"""
-    if not HAS_SCHEDULER:
-        logger.error("APScheduler未安装，无法运行定时任务")
-        logger.info("请运行: pip install apscheduler")
-        return
+async def run_in_thread(func):
+    """在线程中执行同步任务
     
-    setup_logging()
+    任务中的网络请求、SMTP 和因子计算都是阻塞调用，放到线程中执行，
+    事件循环本身只负责调度。定义在模块级，任务可序列化到持久化任务存储
+    """
+    await asyncio.to_thread(func)
+
+
+def weekday_at(hour: int, minute: int) -> "CronTrigger":
+    """每个交易日（周一至周五）指定时间触发"""
+    return CronTrigger(day_of_week='mon-fri', hour=hour, minute=minute)
+
+
+def _create_scheduler() -> "AsyncIOScheduler":
+    """创建调度器
     
-    scheduler = BlockingScheduler(timezone=settings.Scheduler.TIMEZONE)
+    安装 SQLAlchemy 时任务持久化到 data/jobs.sqlite，重启后保留错过执行的
+    记录；错过的任务合并为一次补跑，同一任务不并发执行
+    """
+    jobstores = {}
+    if SQLAlchemyJobStore is not None:
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        jobstores['default'] = SQLAlchemyJobStore(
+            url=f"sqlite:///{os.path.join(settings.DATA_DIR, 'jobs.sqlite')}"
+        )
+    else:
+        logger.warning("SQLAlchemy未安装，定时任务仅保存在内存中")
+    
+    return AsyncIOScheduler(
+        jobstores=jobstores,
+        job_defaults={
+            'coalesce': True,
+            'misfire_grace_time': 600,
+            'max_instances': 1,
+        },
+        timezone=settings.Scheduler.TIMEZONE
+    )
+
+
+async def _run_scheduler_async():
+    """在事件循环中启动调度器并保持运行"""
+    scheduler = _create_scheduler()
     
     # 早间数据采集 - 每个交易日09:00
     scheduler.add_job(
-        morning_collection,
-        CronTrigger(
-            day_of_week='mon-fri',
-            hour=9,
-            minute=0
-        ),
+        run_in_thread,
+        weekday_at(9, 0),
+        args=[morning_collection],
         id='morning_collection',
-        name='早间数据采集'
+        name='早间数据采集',
+        replace_existing=True
     )
     
     # 盘中检查 - 每个交易日11:30
     scheduler.add_job(
-        market_check,
-        CronTrigger(
-            day_of_week='mon-fri',
-            hour=11,
-            minute=30
-        ),
+        run_in_thread,
+        weekday_at(11, 30),
+        args=[market_check],
         id='midday_check',
-        name='午间检查'
+        name='午间检查',
+        replace_existing=True
     )
     
     # 盘中检查 - 每个交易日14:30
     scheduler.add_job(
-        market_check,
-        CronTrigger(
-            day_of_week='mon-fri',
-            hour=14,
-            minute=30
-        ),
+        run_in_thread,
+        weekday_at(14, 30),
+        args=[market_check],
         id='afternoon_check',
-        name='午后检查'
+        name='午后检查',
+        replace_existing=True
     )
     
     # 每日分析 - 每个交易日10:00 通过邮件发送
     scheduler.add_job(
-        daily_analysis,
-        CronTrigger(
-            day_of_week='mon-fri',
-            hour=10,
-            minute=0
-        ),
+        run_in_thread,
+        weekday_at(10, 0),
+        args=[daily_analysis],
         id='daily_analysis',
-        name='每日邮件报告'
+        name='每日邮件报告',
+        replace_existing=True
     )
     
     # 每日基金数据更新 - 每个交易日16:00
     scheduler.add_job(
-        daily_fund_update,
-        CronTrigger(
-            day_of_week='mon-fri',
-            hour=16,
-            minute=0
-        ),
+        run_in_thread,
+        weekday_at(16, 0),
+        args=[daily_fund_update],
         id='daily_fund_update',
-        name='每日基金数据更新'
+        name='每日基金数据更新',
+        replace_existing=True
     )
     
     # 量化选基分析 - 每周日20:00
     scheduler.add_job(
-        fund_screening,
+        run_in_thread,
         CronTrigger(
             day_of_week='sun',
             hour=20,
             minute=0
         ),
+        args=[fund_screening],
         id='fund_screening',
-        name='量化选基分析'
+        name='量化选基分析',
+        replace_existing=True
     )
     
     logger.info("="*60)
@@ -267,8 +331,24 @@ def run_scheduler():
         logger.info(f"  - {job.name}: {job.trigger}")
     logger.info("="*60)
     
+    scheduler.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        scheduler.shutdown(wait=False)
+
+
+def run_scheduler():
+    """运行定时调度器"""
+    if not HAS_SCHEDULER:
+        logger.error("APScheduler未安装，无法运行定时任务")
+        logger.info("请运行: pip install apscheduler")
+        return
+    
+    setup_logging()
+    
     try:
-        scheduler.start()
+        asyncio.run(_run_scheduler_async())
     except KeyboardInterrupt:
         logger.info("调度器已停止")
 
@@ -286,9 +366,6 @@ def send_test_email():
     logger.info("发送测试邮件...")
     
     try:
-        from src.notify import notifier
-        from config.settings import settings
-        
         # 检查配置
         email_config = settings.Notification
         logger.info(f"SMTP服务器: {email_config.SMTP_SERVER}")
@@ -296,12 +373,13 @@ def send_test_email():
         logger.info(f"收件人: {email_config.EMAIL_RECEIVER}")
         
         # 生成测试报告
-        advisor = InvestmentAdvisor()
+        advisor = get_advisor()
+        advisor.refresh()
         report = advisor.run_daily_analysis()
         
         # 发送邮件
         result = notifier.send_email(
-            subject=f"【理财日报-测试】{__import__('datetime').date.today().strftime('%Y-%m-%d')}",
+            subject=f"【理财日报-测试】{date.today().isoformat()}",
             content=report
         )
         
@@ -1 +1,3 @@
-from .portfolio_advisor import PortfolioAdvisor, portfolio_advisor
+from .portfolio_advisor import (
+    Allocation, MarketStatus, PortfolioAdvisor, PortfolioEntry, portfolio_advisor
+)
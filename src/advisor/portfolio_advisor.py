@@ -3,6 +3,9 @@
 
 基于核心-卫星策略和市场估值生成投资组合建议
 """
+import time
+from dataclasses import asdict, dataclass
+
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
@@ -11,6 +14,44 @@ from loguru import logger
 from ..collector.index_valuation import IndexValuationCollector
 from ..model.scoring_model import ScoringModel
 
+
+@dataclass(slots=True)
+class MarketStatus:
+    """市场估值状态"""
+    pe_percentile: float
+    pe_value: float
+    status: str
+    signal: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class Allocation:
+    """大类资产配置比例"""
+    equity_ratio: float
+    bond_ratio: float
+    core_ratio: float
+    satellite_ratio: float
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class PortfolioEntry:
+    """组合中的一只基金"""
+    role: str
+    fund_code: Optional[str]
+    fund_name: Optional[str]
+    weight: float
+    reason: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
 class PortfolioAdvisor:
     """
     投资组合顾问
@@ -21,8 +62,45 @@ class PortfolioAdvisor:
     3. 基金组合构建
     """
     
+    # 估值分位区间（PE分位 < 阈值）对应的市场状态与操作信号
+    _BINS = np.array([20, 40, 60, 80])
+    _STATUSES = np.array(['低估', '偏低', '正常', '偏高', '高估'])
+    _SIGNALS = np.array(['积极买入', '分批买入', '定投持有', '谨慎持有', '分批止盈'])
+    
+    # 沪深300估值缓存有效期（秒），估值每日更新一次
+    VALUATION_CACHE_TTL = 3600
+    
     def __init__(self, valuation_collector: IndexValuationCollector = None):
         self.valuation = valuation_collector or IndexValuationCollector()
+        # 沪深300估值缓存: (获取时间, 估值)
+        self._hs300_cache: Optional[tuple] = None
+    
+    def _get_hs300_valuation(self):
+        """获取沪深300估值，有效期内复用（多次生成不同风险偏好的组合时不重复请求）"""
+        cached = self._hs300_cache
+        if cached and time.monotonic() - cached[0] < self.VALUATION_CACHE_TTL:
+            return cached[1]
+        
+        hs300 = self.valuation.get_hs300_valuation()
+        if hs300:
+            self._hs300_cache = (time.monotonic(), hs300)
+        return hs300
+    
+    @classmethod
+    def classify(cls, pe_pct):
+        """
+        根据 PE 分位划分市场状态
+        
+        Args:
+            pe_pct: PE 分位，标量或数组（批量回测多个指数/日期时传数组）
+            
+        Returns:
+            (状态, 信号)，输入为数组时返回同形状的数组
+        """
+        idx = np.searchsorted(cls._BINS, pe_pct, side='right')
+        if np.ndim(idx) == 0:
+            return str(cls._STATUSES[idx]), str(cls._SIGNALS[idx])
+        return cls._STATUSES[idx], cls._SIGNALS[idx]
         
     def suggest_portfolio(
         self, 
@@ -48,21 +126,21 @@ class PortfolioAdvisor:
         # 3. 筛选具体基金
         portfolio_funds = self._select_funds(top_funds, allocation)
         
-        # 4. 构建返回结果
+        # 4. 构建返回结果（对外仍返回字典）
         result = {
-            'market_status': market_status,
-            'allocation_plan': allocation,
-            'portfolio': portfolio_funds,
+            'market_status': market_status.to_dict(),
+            'allocation_plan': allocation.to_dict(),
+            'portfolio': [entry.to_dict() for entry in portfolio_funds],
             'strategy_description': self._generate_strategy_description(market_status, allocation)
         }
         
         return result
     
-    def _analyze_market_status(self) -> Dict:
+    def _analyze_market_status(self) -> MarketStatus:
         """分析市场估值状态"""
         try:
             # 获取沪深300估值
-            hs300 = self.valuation.get_hs300_valuation()
+            hs300 = self._get_hs300_valuation()
             
             if hs300:
                 pe_pct = hs300.pe_percentile
@@ -72,127 +150,155 @@ class PortfolioAdvisor:
                 pe_pct = 50
                 pe_val = 12.5
                 
-            if pe_pct < 20:
-                status = "低估"
-                signal = "积极买入"
-            elif pe_pct < 40:
-                status = "偏低"
-                signal = "分批买入"
-            elif pe_pct < 60:
-                status = "正常"
-                signal = "定投持有"
-            elif pe_pct < 80:
-                status = "偏高"
-                signal = "谨慎持有"
-            else:
-                status = "高估"
-                signal = "分批止盈"
+            status, signal = self.classify(pe_pct)
                 
-            return {
-                'pe_percentile': pe_pct,
-                'pe_value': pe_val,
-                'status': status,
-                'signal': signal
-            }
+            return MarketStatus(pe_pct, pe_val, status, signal)
         except Exception as e:
             logger.error(f"市场分析失败: {e}")
-            return {
-                'pe_percentile': 50,
-                'pe_value': 0,
-                'status': "未知",
-                'signal': "稳健操作"
-            }
+            return MarketStatus(50, 0, "未知", "稳健操作")
             
-    def _get_asset_allocation(self, market_status: Dict, risk_level: str) -> Dict:
-        """根据市场状态和风险偏好确定配置"""
-        pe_pct = market_status.get('pe_percentile', 50)
-        
-        # 基础权益仓位（根据风险偏好）
-        base_equity = {
-            'conservative': 0.2,
-            'balanced': 0.5,
-            'aggressive': 0.8
-        }.get(risk_level, 0.5)
+    # 风险偏好对应的基础权益仓位
+    _BASE_EQUITY = {
+        'conservative': 0.2,
+        'balanced': 0.5,
+        'aggressive': 0.8
+    }
+    
+    @staticmethod
+    def allocate_batch(
+        pe_pct: np.ndarray,
+        base_equity: np.ndarray,
+        core_ratio: float = 0.7,
+        decimals: Optional[int] = 2
+    ) -> Dict[str, np.ndarray]:
+        """
+        批量计算资产配置（用于多市场状态 × 多风险偏好的情景分析）
         
+        Args:
+            pe_pct: PE 分位数组，缺失值（NaN）按中性的 50 处理
+            base_equity: 基础权益仓位数组（与 pe_pct 可广播）
+            core_ratio: 权益仓位中核心资产的占比
+            decimals: 保留小数位数，None 表示不取整
+            
+        Returns:
+            {'equity_ratio', 'bond_ratio', 'core_ratio', 'satellite_ratio'} 数组
+        """
         # 根据市场估值调整权益仓位
-        # 估值越低，仓位越高
-        valuation_adj = (50 - pe_pct) / 100 * 0.4  # 最大调整 +/- 20%
-        
-        target_equity = max(0.1, min(0.95, base_equity + valuation_adj))
-        target_bond = 1.0 - target_equity
+        # 估值越低，仓位越高，最大调整 +/- 20%
+        # np.clip 会原样保留 NaN，先把缺失的分位替换为中性值，避免算出 NaN 仓位
+        pe_pct = np.asarray(pe_pct, dtype=float)
+        pe_pct = np.where(np.isnan(pe_pct), 50.0, pe_pct)
+        equity = np.clip(np.asarray(base_equity, dtype=float) + (50 - pe_pct) / 100 * 0.4, 0.1, 0.95)
         
         # 细分权益仓位：核心 vs 卫星
         # 核心（宽基指数/稳健混合）：60-70%
         # 卫星（行业主题/积极股票）：30-40%
-        core_satellite_ratio = 0.7
-        
-        return {
-            'equity_ratio': round(target_equity, 2),
-            'bond_ratio': round(target_bond, 2),
-            'core_ratio': round(target_equity * core_satellite_ratio, 2),
-            'satellite_ratio': round(target_equity * (1 - core_satellite_ratio), 2)
+        result = {
+            'equity_ratio': equity,
+            'bond_ratio': 1.0 - equity,
+            'core_ratio': equity * core_ratio,
+            'satellite_ratio': equity * (1 - core_ratio),
         }
+        if decimals is not None:
+            result = {k: np.round(v, decimals) for k, v in result.items()}
+        return result
+    
+    def _get_asset_allocation(self, market_status: MarketStatus, risk_level: str) -> Allocation:
+        """根据市场状态和风险偏好确定配置"""
+        base_equity = self._BASE_EQUITY.get(risk_level, 0.5)
+        ratios = self.allocate_batch(
+            np.array([market_status.pe_percentile]),
+            np.array([base_equity]),
+            decimals=None
+        )
+        
+        # 单个情景用内置 round 取整，与逐项计算的结果保持一致
+        return Allocation(**{k: round(float(v[0]), 2) for k, v in ratios.items()})
         
-    def _select_funds(self, top_funds: Dict[str, List[Dict]], allocation: Dict) -> List[Dict]:
+    # 选基用到的字段
+    _FUND_COLUMNS = ['fund_code', 'fund_name', 'total_score']
+    
+    @classmethod
+    def _funds_frame(cls, funds: List[Dict]) -> pd.DataFrame:
+        """将基金列表转为 DataFrame（缺少分数按 0 分处理，缺少的代码/名称为 None）"""
+        df = pd.DataFrame.from_records(funds, columns=cls._FUND_COLUMNS)
+        df['total_score'] = df['total_score'].fillna(0)
+        return df.astype(object).where(df.notna(), None)
+    
+    def _select_funds(
+        self,
+        top_funds: Dict[str, List[Dict]],
+        allocation: Allocation
+    ) -> List[PortfolioEntry]:
         """选择具体基金构建组合"""
         portfolio = []
+        core_ratio = allocation.core_ratio
+        satellite_ratio = allocation.satellite_ratio
+        bond_ratio = allocation.bond_ratio
         
         # 1. 选择核心资产（指数型）
         # 优先选择沪深300、中证500等宽基
-        index_funds = top_funds.get('指数型', [])
-        if index_funds:
+        index_funds = self._funds_frame(top_funds.get('指数型', []))
+        if not index_funds.empty:
             # 简单策略：选得分最高的1只
-            core_fund = index_funds[0]
-            portfolio.append({
-                'role': '核心',
-                'fund_code': core_fund.get('fund_code'),
-                'fund_name': core_fund.get('fund_name'),
-                'weight': allocation['core_ratio'],
-                'reason': '宽基指数，作为组合压舱石'
-            })
+            core_fund = next(index_funds.itertuples(index=False))
+            portfolio.append(PortfolioEntry(
+                role='核心',
+                fund_code=core_fund.fund_code,
+                fund_name=core_fund.fund_name,
+                weight=core_ratio,
+                reason='宽基指数，作为组合压舱石'
+            ))
             
         # 2. 选择卫星资产（股票型/混合型）
         # 选择得分最高的2只，最好风格不同（这里简化为直接选前2名）
-        active_funds = top_funds.get('股票型', []) + top_funds.get('混合型', [])
-        # 按分数排序
-        active_funds.sort(key=lambda x: x.get('total_score', 0), reverse=True)
+        active_funds = self._funds_frame(
+            top_funds.get('股票型', []) + top_funds.get('混合型', [])
+        )
         
-        if active_funds:
+        if not active_funds.empty:
             sat_count = 2
-            weight_per_sat = allocation['satellite_ratio'] / sat_count
+            weight_per_sat = satellite_ratio / sat_count
             
-            for i in range(min(sat_count, len(active_funds))):
-                fund = active_funds[i]
-                portfolio.append({
-                    'role': '卫星',
-                    'fund_code': fund.get('fund_code'),
-                    'fund_name': fund.get('fund_name'),
-                    'weight': round(weight_per_sat, 2),
-                    'reason': '优质主动基金，追求超额收益'
-                })
+            # 按分数取前 N 名（部分排序）
+            active_funds['total_score'] = active_funds['total_score'].astype(float)
+            for fund in active_funds.nlargest(sat_count, 'total_score').itertuples(index=False):
+                portfolio.append(PortfolioEntry(
+                    role='卫星',
+                    fund_code=fund.fund_code,
+                    fund_name=fund.fund_name,
+                    weight=round(weight_per_sat, 2),
+                    reason='优质主动基金，追求超额收益'
+                ))
                 
-        # 3. 选择债券资产（债券型）
-        bond_funds = top_funds.get('债券型', [])
-        if bond_funds and allocation['bond_ratio'] > 0.05:
-            bond_fund = bond_funds[0]
-            portfolio.append({
-                'role': '防守',
-                'fund_code': bond_fund.get('fund_code'),
-                'fund_name': bond_fund.get('fund_name'),
-                'weight': allocation['bond_ratio'],
-                'reason': '债券基金，降低组合波动'
-            })
+        # 3. 选择债券资产（债券型），债券仓位过低时不处理候选基金
+        if bond_ratio > 0.05:
+            bond_funds = top_funds.get('债券型', [])
+            if bond_funds:
+                bond_fund = next(self._funds_frame(bond_funds).itertuples(index=False))
+                portfolio.append(PortfolioEntry(
+                    role='防守',
+                    fund_code=bond_fund.fund_code,
+                    fund_name=bond_fund.fund_name,
+                    weight=bond_ratio,
+                    reason='债券基金，降低组合波动'
+                ))
             
         return portfolio
     
-    def _generate_strategy_description(self, market_status: Dict, allocation: Dict) -> str:
+    def _generate_strategy_description(
+        self,
+        market_status: MarketStatus,
+        allocation: Allocation
+    ) -> str:
         """生成策略说明"""
-        status = market_status['status']
-        equity_pct = allocation['equity_ratio'] * 100
+        status = market_status.status
+        equity_pct = allocation.equity_ratio * 100
+        bond_pct = allocation.bond_ratio * 100
         
-        desc = f"当前市场估值{status}（PE百分位 {market_status['pe_percentile']:.1f}%）。"
+        desc = f"当前市场估值{status}（PE百分位 {market_status.pe_percentile:.1f}%）。"
         desc += f"建议采用{'进攻' if equity_pct > 60 else '防御' if equity_pct < 40 else '平衡'}策略，"
-        desc += f"权益类资产配置 {equity_pct:.0f}%，固收类配置 {allocation['bond_ratio']*100:.0f}%。"
+        desc += f"权益类资产配置 {equity_pct:.0f}%，固收类配置 {bond_pct:.0f}%。"
         desc += "核心部分配置宽基指数以把握市场平均收益，卫星部分配置优质主动基金以追求超额收益。"
         
         return desc
@@ -1,3 +1,4 @@
 from .ai_advisor import AIAdvisor, ai_advisor
+from .llm_cache import LLMResponseCache
 
-__all__ = ["AIAdvisor", "ai_advisor"]
+__all__ = ["AIAdvisor", "ai_advisor", "LLMResponseCache"]
@@ -1,23 +1,119 @@
 """
 AI顾问模块 - 使用大模型进行分析和决策
 """
+import asyncio
 import json
 from datetime import datetime, date
 from typing import List, Optional, Dict, Any
 from loguru import logger
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
 except ImportError:
     OpenAI = None
+    AsyncOpenAI = None
 
 from config.settings import settings
+from .llm_cache import LLMResponseCache
 from ..models import (
     Portfolio, Position, TradeSuggestion, FundScore, 
     SignalType, ConfidenceLevel, MarketSummary, IndexValuation
 )
 
 
+# ==================== 系统提示词 ====================
+# 提示词固定不变，放在消息最前面作为稳定前缀，便于服务端前缀缓存命中；
+# 行情、基金代码等易变数据只放在用户消息中
+_SYS_MARKET = """你是一位专业的投资分析师，需要根据市场数据给出客观、谨慎的分析。
+你的分析将影响真实的投资决策，因此必须：
+1. 保持客观中立，不过度乐观或悲观
+2. 明确指出风险因素
+3. 给出具体的操作建议
+4. 使用JSON格式输出"""
+
+_SYS_FUND = """你是一位专业的基金分析师，需要对基金进行评分。
+评分标准：
+1. 质量评分(0-100)：基于长期业绩、基金经理、规模等
+2. 估值评分(0-100)：基于跟踪指数的估值水平
+3. 趋势评分(0-100)：基于近期表现和市场趋势
+4. 风险评分(0-100)：基于波动率、回撤等（分数越高风险越可控）
+
+请给出谨慎、客观的评分，避免过度乐观。"""
+
+_SYS_TRADE = """你是一位谨慎的投资顾问，需要根据分析结果给出买入/卖出/持有建议。
+原则：
+1. 宁可错过机会，不可冒险亏损
+2. 必须考虑仓位限制和风险控制
+3. 每个建议都要有充分理由
+4. 明确标注置信度(1-5星)
+
+置信度标准：
+5星：强烈建议，多个有利信号共振
+4星：建议执行，条件较好
+3星：可以考虑，但需谨慎
+2星：信号不强，建议观望
+1星：不建议操作"""
+
+
+def _loads_json(text: str) -> Any:
+    """
+    解析大模型返回的JSON
+    
+    JSON模式下返回内容即为JSON对象；不支持 response_format 的服务商
+    可能在前后附带说明文字，此时截取首尾大括号之间的部分再解析
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        json_start = text.find('{')
+        json_end = text.rfind('}') + 1
+        if json_start < 0 or json_end <= json_start:
+            raise
+        return json.loads(text[json_start:json_end])
+
+
+class _JsonObjectTracker:
+    """
+    跟踪流式输出中的JSON对象是否已经闭合
+    
+    按字符统计大括号深度（忽略字符串内的括号和转义字符），
+    顶层对象闭合后即可停止接收剩余输出
+    """
+    __slots__ = ('depth', 'started', 'in_string', 'escape')
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+    
+    def feed(self, text: str) -> int:
+        """
+        输入一段增量文本
+        
+        Returns:
+            顶层对象在该段文本中闭合时，返回闭合括号之后的位置；否则返回 -1
+        """
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.started
+            elif ch == '{':
+                self.depth += 1
+                self.started = True
+            elif ch == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return -1
+
+
 class AIAdvisor:
     """AI投资顾问"""
     
@@ -29,32 +125,200 @@ class AIAdvisor:
             )
             self.model = settings.OPENAI_MODEL
             self.enabled = True
+            self.prompt_cache_control = "anthropic" in settings.OPENAI_BASE_URL.lower()
         else:
             self.client = None
             self.enabled = False
+            self.prompt_cache_control = False
             logger.warning("OpenAI API未配置，AI分析功能将受限")
+        
+        # 当日响应缓存，重复运行分析时不再重复请求
+        self.response_cache = (
+            LLMResponseCache(settings.CACHE_DIR) if settings.LLM_RESPONSE_CACHE else None
+        )
+    
+    def _cache_get(self, system_prompt: str, user_prompt: str):
+        """查询响应缓存，返回 (缓存键, 缓存内容)"""
+        if self.response_cache is None:
+            return None, None
+        key = LLMResponseCache.make_key(self.model, system_prompt, user_prompt)
+        return key, self.response_cache.get(key)
     
-    def _call_llm(self, system_prompt: str, user_prompt: str) -> Optional[str]:
-        """调用大模型"""
+    def _cache_set(self, key: Optional[str], content: Optional[str], json_mode: bool = False):
+        """
+        写入响应缓存
+        
+        调用失败或返回为空时不缓存；JSON模式下只缓存能完整解析的内容，
+        避免被 max_tokens 截断的输出在当日反复命中
+        """
+        if not (key and content):
+            return
+        if json_mode:
+            try:
+                _loads_json(content)
+            except ValueError:
+                logger.warning("AI返回的JSON不完整，不写入缓存")
+                return
+        self.response_cache.set(key, content)
+    
+    def _llm_request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        json_mode: bool = False,
+        max_tokens: int = 2000
+    ) -> Dict[str, Any]:
+        """构造大模型请求参数（同步/异步调用共用，均为流式输出）"""
+        if self.prompt_cache_control:
+            # Anthropic 兼容接口需显式标记可缓存的系统提示词
+            system_message = {"role": "system", "content": [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }]}
+        else:
+            # OpenAI 对稳定前缀自动缓存
+            system_message = {"role": "system", "content": system_prompt}
+        
+        request = dict(
+            model=self.model,
+            messages=[
+                system_message,
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.3,  # 使用较低温度确保稳定性
+            max_tokens=max_tokens,
+            stream=True
+        )
+        if json_mode:
+            # 直接输出JSON对象，没有额外的说明文字
+            request["response_format"] = {"type": "json_object"}
+        return request
+    
+    @staticmethod
+    def _collect_delta(chunk, parts: List[str], tracker: Optional[_JsonObjectTracker]) -> bool:
+        """
+        累积一个流式分片的内容
+        
+        Returns:
+            JSON对象已经完整（可以提前结束接收）时返回 True
+        """
+        if not chunk.choices:
+            return False
+        text = chunk.choices[0].delta.content
+        if not text:
+            return False
+        
+        if tracker is not None:
+            end = tracker.feed(text)
+            if end >= 0:
+                parts.append(text[:end])
+                return True
+        parts.append(text)
+        return False
+    
+    def _call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        json_mode: bool = False,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """
+        调用大模型
+        
+        Args:
+            system_prompt: 系统提示词
+            user_prompt: 用户提示词
+            json_mode: 是否要求模型直接返回JSON对象，对象闭合后立即结束接收
+            max_tokens: 最大输出长度
+        """
         if not self.enabled:
             logger.warning("AI功能未启用")
             return None
         
+        key, cached = self._cache_get(system_prompt, user_prompt)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,  # 使用较低温度确保稳定性
-                max_tokens=2000
+            stream = self.client.chat.completions.create(
+                **self._llm_request(system_prompt, user_prompt, json_mode, max_tokens)
             )
-            return response.choices[0].message.content
+            parts = []
+            tracker = _JsonObjectTracker() if json_mode else None
+            try:
+                for chunk in stream:
+                    if self._collect_delta(chunk, parts, tracker):
+                        break
+            finally:
+                stream.close()
+            
+            content = ''.join(parts)
+            self._cache_set(key, content, json_mode)
+            return content
         except Exception as e:
             logger.error(f"调用AI失败: {e}")
             return None
     
+    async def _acall_llm(
+        self,
+        aclient,
+        semaphore: asyncio.Semaphore,
+        system_prompt: str,
+        user_prompt: str,
+        json_mode: bool = False,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """异步调用大模型（参数同 _call_llm），由信号量限制同时在途的请求数"""
+        key, cached = self._cache_get(system_prompt, user_prompt)
+        if cached is not None:
+            return cached
+        
+        try:
+            parts = []
+            tracker = _JsonObjectTracker() if json_mode else None
+            async with semaphore:
+                stream = await aclient.chat.completions.create(
+                    **self._llm_request(system_prompt, user_prompt, json_mode, max_tokens)
+                )
+                try:
+                    async for chunk in stream:
+                        if self._collect_delta(chunk, parts, tracker):
+                            break
+                finally:
+                    await stream.close()
+            
+            content = ''.join(parts)
+            self._cache_set(key, content, json_mode)
+            return content
+        except Exception as e:
+            logger.error(f"调用AI失败: {e}")
+            return None
+    
+    def _run_batch(self, make_coros) -> list:
+        """
+        并发执行一批异步大模型调用
+        
+        Args:
+            make_coros: 接收 (aclient, semaphore)，返回协程列表的函数
+            
+        Returns:
+            与协程顺序一致的结果列表，单个任务异常时对应位置为异常对象
+        """
+        async def runner():
+            # 异步客户端的连接池绑定在当前事件循环上，每批创建一次并在结束时关闭
+            async with AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL
+            ) as aclient:
+                semaphore = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+                return await asyncio.gather(
+                    *make_coros(aclient, semaphore), return_exceptions=True
+                )
+        
+        return asyncio.run(runner())
+    
     def analyze_market_condition(
         self,
         market_summary: MarketSummary,
@@ -63,13 +327,6 @@ class AIAdvisor:
     ) -> Dict[str, Any]:
         """分析市场状况"""
         
-        system_prompt = """你是一位专业的投资分析师，需要根据市场数据给出客观、谨慎的分析。
-你的分析将影响真实的投资决策，因此必须：
-1. 保持客观中立，不过度乐观或悲观
-2. 明确指出风险因素
-3. 给出具体的操作建议
-4. 使用JSON格式输出"""
-
         valuation_info = "\n".join([
             f"- {v.index_name}: PE={v.pe:.2f}(历史{v.pe_percentile:.1f}%分位), PB={v.pb:.2f}(历史{v.pb_percentile:.1f}%分位)"
             for v in valuations
@@ -103,40 +360,26 @@ class AIAdvisor:
     "risk_warnings": ["风险1", "风险2"]
 }}"""
 
-        result = self._call_llm(system_prompt, user_prompt)
+        result = self._call_llm(_SYS_MARKET, user_prompt, json_mode=True, max_tokens=600)
         
         if result:
             try:
-                # 提取JSON部分
-                json_start = result.find('{')
-                json_end = result.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    return json.loads(result[json_start:json_end])
+                return _loads_json(result)
             except json.JSONDecodeError as e:
                 logger.error(f"解析AI返回结果失败: {e}")
         
         # 返回默认分析
         return self._default_market_analysis(market_summary, valuations)
     
-    def analyze_fund(
+    def _build_fund_prompt(
         self,
         fund_code: str,
         fund_name: str,
         performance: Dict[str, float],
         fund_detail: Dict = None,
         related_valuation: IndexValuation = None
-    ) -> FundScore:
-        """分析单只基金并评分"""
-        
-        system_prompt = """你是一位专业的基金分析师，需要对基金进行评分。
-评分标准：
-1. 质量评分(0-100)：基于长期业绩、基金经理、规模等
-2. 估值评分(0-100)：基于跟踪指数的估值水平
-3. 趋势评分(0-100)：基于近期表现和市场趋势
-4. 风险评分(0-100)：基于波动率、回撤等（分数越高风险越可控）
-
-请给出谨慎、客观的评分，避免过度乐观。"""
-
+    ) -> str:
+        """构造基金评分的用户提示词"""
         perf_info = "\n".join([
             f"- {k}: {v*100:.2f}%" if v else f"- {k}: 无数据"
             for k, v in performance.items()
@@ -180,8 +423,16 @@ class AIAdvisor:
     "summary": "总体评价"
 }}"""
 
-        result = self._call_llm(system_prompt, user_prompt)
-        
+        return user_prompt
+    
+    def _parse_fund_score(
+        self,
+        result: Optional[str],
+        fund_code: str,
+        fund_name: str,
+        performance: Dict[str, float]
+    ) -> FundScore:
+        """解析大模型返回的基金评分，失败时使用默认评分"""
         score = FundScore(
             fund_code=fund_code,
             fund_name=fund_name
@@ -189,24 +440,36 @@ class AIAdvisor:
         
         if result:
             try:
-                json_start = result.find('{')
-                json_end = result.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    data = json.loads(result[json_start:json_end])
-                    score.quality_score = data.get("quality_score", 50)
-                    score.valuation_score = data.get("valuation_score", 50)
-                    score.trend_score = data.get("trend_score", 50)
-                    score.risk_score = data.get("risk_score", 50)
-                    score.score_details = data.get("score_details", {})
-                    score.calculate_total()
-                    return score
+                data = _loads_json(result)
+                score.quality_score = data.get("quality_score", 50)
+                score.valuation_score = data.get("valuation_score", 50)
+                score.trend_score = data.get("trend_score", 50)
+                score.risk_score = data.get("risk_score", 50)
+                score.score_details = data.get("score_details", {})
+                score.calculate_total()
+                return score
             except Exception as e:
                 logger.error(f"解析基金评分失败: {e}")
         
         # 使用默认评分逻辑
         return self._default_fund_score(fund_code, fund_name, performance)
     
-    def generate_trade_suggestion(
+    def analyze_fund(
+        self,
+        fund_code: str,
+        fund_name: str,
+        performance: Dict[str, float],
+        fund_detail: Dict = None,
+        related_valuation: IndexValuation = None
+    ) -> FundScore:
+        """分析单只基金并评分"""
+        user_prompt = self._build_fund_prompt(
+            fund_code, fund_name, performance, fund_detail, related_valuation
+        )
+        result = self._call_llm(_SYS_FUND, user_prompt, json_mode=True, max_tokens=800)
+        return self._parse_fund_score(result, fund_code, fund_name, performance)
+    
+    def _build_trade_prompt(
         self,
         portfolio: Portfolio,
         fund_code: str,
@@ -214,23 +477,9 @@ class AIAdvisor:
         fund_score: FundScore,
         current_price: float,
         market_analysis: Dict[str, Any]
-    ) -> TradeSuggestion:
-        """生成交易建议"""
+    ) -> str:
+        """构造交易建议的用户提示词"""
         
-        system_prompt = """你是一位谨慎的投资顾问，需要根据分析结果给出买入/卖出/持有建议。
-原则：
-1. 宁可错过机会，不可冒险亏损
-2. 必须考虑仓位限制和风险控制
-3. 每个建议都要有充分理由
-4. 明确标注置信度(1-5星)
-
-置信度标准：
-5星：强烈建议，多个有利信号共振
-4星：建议执行，条件较好
-3星：可以考虑，但需谨慎
-2星：信号不强，建议观望
-1星：不建议操作"""
-
         # 获取当前持仓
         position = portfolio.get_position(fund_code)
         position_info = ""
@@ -284,38 +533,173 @@ class AIAdvisor:
     "execution_priority": "立即/择机/观望"
 }}"""
 
-        result = self._call_llm(system_prompt, user_prompt)
-        
+        return user_prompt
+    
+    def _parse_trade_suggestion(
+        self,
+        result: Optional[str],
+        portfolio: Portfolio,
+        fund_code: str,
+        fund_name: str,
+        fund_score: FundScore
+    ) -> TradeSuggestion:
+        """解析大模型返回的交易建议，失败时使用默认建议"""
         if result:
             try:
-                json_start = result.find('{')
-                json_end = result.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    data = json.loads(result[json_start:json_end])
-                    
-                    signal_map = {
-                        "买入": SignalType.BUY,
-                        "卖出": SignalType.SELL,
-                        "持有": SignalType.HOLD,
-                        "观望": SignalType.WATCH
-                    }
-                    
-                    return TradeSuggestion(
-                        fund_code=fund_code,
-                        fund_name=fund_name,
-                        signal=signal_map.get(data.get("signal", "观望"), SignalType.WATCH),
-                        confidence=ConfidenceLevel(min(5, max(1, data.get("confidence", 3)))),
-                        suggested_amount=data.get("suggested_amount"),
-                        reasons=data.get("reasons", []),
-                        risk_warnings=data.get("risk_warnings", []),
-                        score=fund_score
-                    )
+                data = _loads_json(result)
+                
+                signal_map = {
+                    "买入": SignalType.BUY,
+                    "卖出": SignalType.SELL,
+                    "持有": SignalType.HOLD,
+                    "观望": SignalType.WATCH
+                }
+                
+                return TradeSuggestion(
+                    fund_code=fund_code,
+                    fund_name=fund_name,
+                    signal=signal_map.get(data.get("signal", "观望"), SignalType.WATCH),
+                    confidence=ConfidenceLevel(min(5, max(1, data.get("confidence", 3)))),
+                    suggested_amount=data.get("suggested_amount"),
+                    reasons=data.get("reasons", []),
+                    risk_warnings=data.get("risk_warnings", []),
+                    score=fund_score
+                )
             except Exception as e:
                 logger.error(f"解析交易建议失败: {e}")
         
         # 返回默认建议
+        position = portfolio.get_position(fund_code)
         return self._default_suggestion(fund_code, fund_name, fund_score, position)
     
+    def generate_trade_suggestion(
+        self,
+        portfolio: Portfolio,
+        fund_code: str,
+        fund_name: str,
+        fund_score: FundScore,
+        current_price: float,
+        market_analysis: Dict[str, Any]
+    ) -> TradeSuggestion:
+        """生成交易建议"""
+        user_prompt = self._build_trade_prompt(
+            portfolio, fund_code, fund_name, fund_score, current_price, market_analysis
+        )
+        result = self._call_llm(_SYS_TRADE, user_prompt, json_mode=True, max_tokens=500)
+        return self._parse_trade_suggestion(result, portfolio, fund_code, fund_name, fund_score)
+    
+    async def _analyze_fund_async(
+        self,
+        aclient,
+        semaphore: asyncio.Semaphore,
+        fund_code: str,
+        fund_name: str,
+        performance: Dict[str, float],
+        fund_detail: Dict = None,
+        related_valuation: IndexValuation = None
+    ) -> FundScore:
+        """异步分析单只基金并评分（与 analyze_fund 逻辑一致）"""
+        user_prompt = self._build_fund_prompt(
+            fund_code, fund_name, performance, fund_detail, related_valuation
+        )
+        result = await self._acall_llm(
+            aclient, semaphore, _SYS_FUND, user_prompt, json_mode=True, max_tokens=800
+        )
+        return self._parse_fund_score(result, fund_code, fund_name, performance)
+    
+    def analyze_funds_batch(self, items: List[Dict[str, Any]]) -> List[FundScore]:
+        """
+        批量分析基金，并发请求大模型
+        
+        Args:
+            items: 每项为 analyze_fund 的关键字参数，
+                   如 {"fund_code", "fund_name", "performance", "fund_detail"}
+            
+        Returns:
+            与 items 顺序一致的评分列表，单只失败时使用默认评分
+        """
+        if not items:
+            return []
+        if not self.enabled or AsyncOpenAI is None:
+            return [self.analyze_fund(**item) for item in items]
+        
+        results = self._run_batch(lambda aclient, semaphore: [
+            self._analyze_fund_async(aclient, semaphore, **item) for item in items
+        ])
+        
+        scores = []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                logger.error(f"分析基金 {item.get('fund_code')} 失败: {result}")
+                result = self._default_fund_score(
+                    item["fund_code"], item["fund_name"], item.get("performance") or {}
+                )
+            scores.append(result)
+        return scores
+    
+    async def _generate_trade_suggestion_async(
+        self,
+        aclient,
+        semaphore: asyncio.Semaphore,
+        portfolio: Portfolio,
+        fund_code: str,
+        fund_name: str,
+        fund_score: FundScore,
+        current_price: float,
+        market_analysis: Dict[str, Any]
+    ) -> TradeSuggestion:
+        """异步生成交易建议（与 generate_trade_suggestion 逻辑一致）"""
+        user_prompt = self._build_trade_prompt(
+            portfolio, fund_code, fund_name, fund_score, current_price, market_analysis
+        )
+        result = await self._acall_llm(
+            aclient, semaphore, _SYS_TRADE, user_prompt, json_mode=True, max_tokens=500
+        )
+        return self._parse_trade_suggestion(result, portfolio, fund_code, fund_name, fund_score)
+    
+    def generate_trade_suggestions_batch(
+        self,
+        portfolio: Portfolio,
+        items: List[Dict[str, Any]],
+        market_analysis: Dict[str, Any]
+    ) -> List[TradeSuggestion]:
+        """
+        批量生成交易建议，并发请求大模型
+        
+        Args:
+            portfolio: 当前投资组合
+            items: 每项包含 fund_code, fund_name, fund_score, current_price
+            market_analysis: 市场分析结果
+            
+        Returns:
+            与 items 顺序一致的交易建议列表，单只失败时使用默认建议
+        """
+        if not items:
+            return []
+        if not self.enabled or AsyncOpenAI is None:
+            return [
+                self.generate_trade_suggestion(portfolio, market_analysis=market_analysis, **item)
+                for item in items
+            ]
+        
+        results = self._run_batch(lambda aclient, semaphore: [
+            self._generate_trade_suggestion_async(
+                aclient, semaphore, portfolio, market_analysis=market_analysis, **item
+            )
+            for item in items
+        ])
+        
+        suggestions = []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                logger.error(f"生成 {item.get('fund_code')} 交易建议失败: {result}")
+                result = self._default_suggestion(
+                    item["fund_code"], item["fund_name"], item["fund_score"],
+                    portfolio.get_position(item["fund_code"])
+                )
+            suggestions.append(result)
+        return suggestions
+    
     def _default_market_analysis(
         self, 
         market_summary: MarketSummary, 
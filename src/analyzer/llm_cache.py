@@ -0,0 +1,79 @@
+"""
+大模型响应缓存模块
+
+按日期分桶、按提示词精确匹配缓存大模型的返回结果，
+同一天内重复分析同一只基金/同一份行情时直接复用，不再请求接口
+"""
+import glob
+import hashlib
+import os
+import threading
+from datetime import date
+from typing import Dict, Optional
+from loguru import logger
+
+from config.settings import json_load, json_dump
+
+
+class LLMResponseCache:
+    """
+    大模型响应缓存
+
+    - 键为 (模型, 系统提示词, 用户提示词) 的哈希，提示词中任何数据变化都不会误命中
+    - 每天一个缓存文件，跨天自动失效并清理旧文件，避免行情相关的回答过期
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._day: Optional[date] = None
+        self._entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str) -> str:
+        """生成缓存键"""
+        text = f"{model}\0{system_prompt}\0{user_prompt}"
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.cache_dir, f"llm_{day.isoformat()}.json")
+
+    def _ensure_today(self):
+        """切换到当天的缓存桶（调用方需持有锁）"""
+        today = date.today()
+        if self._day == today:
+            return
+
+        path = self._path(today)
+        try:
+            self._entries = json_load(path) if os.path.exists(path) else {}
+        except Exception as e:
+            logger.warning("加载大模型缓存失败: {}", e)
+            self._entries = {}
+        self._day = today
+
+        # 清理过期的缓存文件
+        for stale in glob.glob(os.path.join(self.cache_dir, "llm_*.json")):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def get(self, key: str) -> Optional[str]:
+        """读取当天缓存，未命中返回 None"""
+        with self._lock:
+            self._ensure_today()
+            return self._entries.get(key)
+
+    def set(self, key: str, content: str):
+        """写入当天缓存并落盘"""
+        with self._lock:
+            self._ensure_today()
+            self._entries[key] = content
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                json_dump(self._path(self._day), self._entries)
+            except Exception as e:
+                logger.warning("保存大模型缓存失败: {}", e)
+
@@ -3,14 +3,21 @@ AKShare 基金数据采集器
 
 使用 AKShare 库获取基金数据，作为主要数据源
 """
+import asyncio
+import os
 import time
 import threading
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
 from typing import Dict, List, Optional
 
 import pandas as pd
 from loguru import logger
 
+from config.settings import settings
+from .rate_limiter import TokenBucket
+
 try:
     import akshare as ak
 except ImportError:
@@ -18,32 +25,164 @@ except ImportError:
     logger.warning("akshare 未安装，部分功能不可用。请运行: pip install akshare")
 
 
+@lru_cache(maxsize=1)
+def _default_year_quarter(today: date) -> tuple:
+    """最近一个已结束的季度 (年份, 季度)，以当天日期为参数，跨天自动重新计算"""
+    quarter = (today.month - 1) // 3
+    if quarter == 0:
+        return str(today.year - 1), '4'
+    return str(today.year), str(quarter)
+
+
+def _is_throttled(error: Exception) -> bool:
+    """判断异常是否由数据源限流（HTTP 429）引起"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return '429' in str(error)
+
+
 class AKShareCollector:
     """
     AKShare 基金数据采集器
     """
     
-    def __init__(self, request_interval: float = 0.5):
+    # 各类数据的磁盘缓存有效期（小时）
+    # 净值历史按最新净值日期判断是否需要更新，不在此列
+    CACHE_MAX_AGE_HOURS = {
+        'scale': 24,         # 规模变动（季度更新）
+        'holdings': 24 * 7,  # 季度持仓（报告期内基本不变）
+        'rating': 24,        # 基金评级
+        'index_funds': 4,    # 指数基金列表（含当日净值）
+    }
+    
+    # 被限流时的重试次数和退避基数（秒）
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 1.0
+    
+    def __init__(
+        self,
+        request_interval: float = 0.5,
+        cache_dir: Optional[str] = None,
+        use_cache: bool = True,
+        max_concurrency: Optional[int] = None
+    ):
         """
         初始化采集器
         
         Args:
-            request_interval: 请求间隔（秒），避免被限流
+            request_interval: 平均请求间隔（秒），避免被限流
+            cache_dir: 磁盘缓存目录，默认 data/cache/akshare
+            use_cache: 是否使用磁盘缓存
+            max_concurrency: 同时在途的请求数上限，默认取 settings.MAX_COLLECTOR_CONCURRENCY
         """
         if ak is None:
             raise ImportError("akshare 未安装，请运行: pip install akshare")
         
         self.request_interval = request_interval
-        self._last_request_time = 0
-        self._lock = threading.Lock()
+        self.burst = max_concurrency or settings.MAX_COLLECTOR_CONCURRENCY
+        self._limiter = TokenBucket(
+            1 / request_interval if request_interval > 0 else 0, self.burst
+        )
+        # 同时在途的请求数上限
+        self._in_flight = threading.BoundedSemaphore(self.burst)
+        
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir or os.path.join(settings.CACHE_DIR, 'akshare'))
+    
+    # ============ 磁盘缓存 ============
+    
+    def _cache_path(self, kind: str, key: str) -> Path:
+        return self.cache_dir / kind / f'{key}.pkl'
+    
+    def _read_cache(
+        self,
+        kind: str,
+        key: str,
+        max_age_hours: Optional[float] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        读取磁盘缓存
+        
+        Args:
+            kind: 数据类别（子目录）
+            key: 缓存键
+            max_age_hours: 最大缓存时间，None 表示不检查
+            
+        Returns:
+            缓存的 DataFrame，不存在或已过期时返回 None
+        """
+        if not self.use_cache:
+            return None
+        
+        filepath = self._cache_path(kind, key)
+        try:
+            if max_age_hours is not None:
+                age = time.time() - filepath.stat().st_mtime
+                if age > max_age_hours * 3600:
+                    return None
+            return pd.read_pickle(filepath)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取缓存失败 {filepath}: {e}")
+            return None
+    
+    def _write_cache(self, kind: str, key: str, df: pd.DataFrame):
+        """写入磁盘缓存（先写临时文件再替换，并发读取不会读到半个文件）"""
+        if not self.use_cache or df is None or df.empty:
+            return
+        
+        filepath = self._cache_path(kind, key)
+        tmp_path = filepath.with_name(f'{filepath.name}.{threading.get_ident()}.tmp')
+        try:
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, filepath)
+        except Exception as e:
+            logger.warning(f"写入缓存失败 {filepath}: {e}")
+    
+    def _is_nav_fresh(self, fund_code: str, nav: pd.DataFrame) -> bool:
+        """
+        判断缓存的净值是否最新
+        
+        已包含上一个交易日的净值，或今天已经从接口更新过（节假日无新净值）时视为最新
+        """
+        last_trade_day = (pd.Timestamp(date.today()) - pd.offsets.BDay(1)).normalize()
+        if nav['净值日期'].max() >= last_trade_day:
+            return True
+        
+        mtime = self._cache_path('nav', fund_code).stat().st_mtime
+        return datetime.fromtimestamp(mtime).date() == date.today()
     
     def _rate_limit(self):
-        """请求限流（线程安全）"""
-        with self._lock:
-            elapsed = time.time() - self._last_request_time
-            if elapsed < self.request_interval:
-                time.sleep(self.request_interval - elapsed)
-            self._last_request_time = time.time()
+        """
+        请求限流（线程安全，令牌桶）
+        
+        平均每 request_interval 秒放行一个请求，空闲一段时间后
+        最多允许 burst 个请求同时放行
+        """
+        self._limiter.acquire()
+    
+    def _request(self, func, *args, **kwargs):
+        """
+        调用 AKShare 接口
+        
+        先经过令牌桶限流，再占用一个在途请求名额；被数据源限流（HTTP 429）时
+        按指数退避重试，其他异常直接抛出由调用方处理
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._rate_limit()
+            with self._in_flight:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == self.MAX_RETRIES or not _is_throttled(e):
+                        raise
+            
+            delay = self.RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"{func.__name__} 被限流，{delay:.1f} 秒后重试")
+            time.sleep(delay)
     
     def get_all_funds(self) -> pd.DataFrame:
         """
@@ -56,9 +195,8 @@ class AKShareCollector:
             - 基金类型
             - 拼音简称
         """
-        self._rate_limit()
         try:
-            df = ak.fund_name_em()
+            df = self._request(ak.fund_name_em)
             logger.info(f"获取基金列表成功，共 {len(df)} 只基金")
             return df
         except Exception as e:
@@ -83,17 +221,12 @@ class AKShareCollector:
             - 托管费率
             - 业绩比较基准
         """
-        self._rate_limit()
         try:
             # 使用雪球接口获取详细信息
-            df = ak.fund_individual_basic_info_xq(symbol=fund_code)
+            df = self._request(ak.fund_individual_basic_info_xq, symbol=fund_code)
             
             # 转换为字典
-            info = {}
-            for _, row in df.iterrows():
-                info[row['item']] = row['value']
-            
-            return info
+            return dict(zip(df['item'].to_numpy(), df['value'].to_numpy()))
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 基本信息失败: {e}")
             return {}
@@ -107,6 +240,9 @@ class AKShareCollector:
         """
         获取基金历史净值
         
+        优先读取磁盘缓存，缓存缺少上一个交易日的净值时才请求接口，
+        并只把新增日期的数据追加到缓存中
+        
         Args:
             fund_code: 基金代码
             start_date: 起始日期 (YYYY-MM-DD)
@@ -119,26 +255,82 @@ class AKShareCollector:
             - 累计净值
             - 日增长率
         """
-        self._rate_limit()
-        try:
-            df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势")
-            
-            if df.empty:
-                return df
-            
-            # 转换日期格式
-            df['净值日期'] = pd.to_datetime(df['净值日期'])
-            
-            # 日期过滤
-            if start_date:
-                df = df[df['净值日期'] >= start_date]
-            if end_date:
-                df = df[df['净值日期'] <= end_date]
+        cached = self._read_cache('nav', fund_code)
+        if cached is not None and not cached.empty and self._is_nav_fresh(fund_code, cached):
+            df = cached
+        else:
+            try:
+                df = self._request(ak.fund_open_fund_info_em, symbol=fund_code, indicator="单位净值走势")
+            except Exception as e:
+                logger.error(f"获取基金 {fund_code} 净值历史失败: {e}")
+                if cached is None:
+                    return pd.DataFrame()
+                # 接口失败时退回已缓存的净值
+                df = cached
+            else:
+                if df.empty:
+                    return df
+                
+                # 转换日期格式
+                df['净值日期'] = pd.to_datetime(df['净值日期'])
+                
+                # 只追加缓存中最新净值日期之后的数据
+                if cached is not None and not cached.empty:
+                    latest = cached['净值日期'].max()
+                    df = pd.concat([cached, df[df['净值日期'] > latest]], ignore_index=True)
+                self._write_cache('nav', fund_code, df)
+        
+        # 日期过滤
+        if start_date:
+            df = df[df['净值日期'] >= start_date]
+        if end_date:
+            df = df[df['净值日期'] <= end_date]
+        
+        return df.sort_values('净值日期')
+    
+    async def get_fund_nav_history_async(
+        self,
+        fund_code: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        异步获取基金历史净值
+        
+        AKShare 接口本身是同步阻塞的，这里放到线程中执行，
+        便于在事件循环中与其他任务并发
+        """
+        return await asyncio.to_thread(
+            self.get_fund_nav_history, fund_code, start_date, end_date
+        )
+    
+    async def get_fund_nav_batch_async(
+        self,
+        fund_codes: List[str],
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        异步批量获取基金历史净值
+        
+        Args:
+            fund_codes: 基金代码列表
+            max_concurrency: 同时在途的请求数上限，默认取 settings.MAX_COLLECTOR_CONCURRENCY
             
-            return df.sort_values('净值日期')
-        except Exception as e:
-            logger.error(f"获取基金 {fund_code} 净值历史失败: {e}")
-            return pd.DataFrame()
+        Returns:
+            Dict[fund_code, 净值 DataFrame]（获取失败的基金不包含在内）
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.MAX_COLLECTOR_CONCURRENCY)
+        
+        async def fetch(code: str) -> pd.DataFrame:
+            async with semaphore:
+                return await self.get_fund_nav_history_async(code)
+        
+        nav_list = await asyncio.gather(*(fetch(code) for code in fund_codes))
+        return {
+            code: df
+            for code, df in zip(fund_codes, nav_list)
+            if df is not None and not df.empty
+        }
     
     def get_fund_holdings(self, fund_code: str, year: str = None, quarter: str = None) -> pd.DataFrame:
         """
@@ -158,22 +350,22 @@ class AKShareCollector:
             - 持股数(万股)
             - 持仓市值(万元)
         """
-        self._rate_limit()
-        
         # 计算默认年份和季度
         if year is None or quarter is None:
-            now = datetime.now()
-            year = str(now.year)
-            quarter = str((now.month - 1) // 3)
-            if quarter == '0':
-                year = str(now.year - 1)
-                quarter = '4'
+            year, quarter = _default_year_quarter(date.today())
+        
+        cache_key = f'{fund_code}_{year}Q{quarter}'
+        cached = self._read_cache('holdings', cache_key, self.CACHE_MAX_AGE_HOURS['holdings'])
+        if cached is not None:
+            return cached
         
         try:
-            df = ak.fund_portfolio_hold_em(
+            df = self._request(
+                ak.fund_portfolio_hold_em,
                 symbol=fund_code, 
                 date=f"{year}年{quarter}季度"
             )
+            self._write_cache('holdings', cache_key, df)
             return df
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 持仓数据失败: {e}")
@@ -192,10 +384,14 @@ class AKShareCollector:
             - 累计净值
             - 近1周、近1月、近3月、近6月、近1年涨跌幅
         """
-        self._rate_limit()
+        cached = self._read_cache('index_funds', 'all', self.CACHE_MAX_AGE_HOURS['index_funds'])
+        if cached is not None:
+            return cached
+        
         try:
-            df = ak.fund_info_index_em()
+            df = self._request(ak.fund_info_index_em)
             logger.info(f"获取指数基金列表成功，共 {len(df)} 只")
+            self._write_cache('index_funds', 'all', df)
             return df
         except Exception as e:
             logger.error(f"获取指数基金列表失败: {e}")
@@ -211,9 +407,13 @@ class AKShareCollector:
         Returns:
             DataFrame with scale history
         """
-        self._rate_limit()
+        cached = self._read_cache('scale', fund_code, self.CACHE_MAX_AGE_HOURS['scale'])
+        if cached is not None:
+            return cached
+        
         try:
-            df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="规模变动")
+            df = self._request(ak.fund_open_fund_info_em, symbol=fund_code, indicator="规模变动")
+            self._write_cache('scale', fund_code, df)
             return df
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 规模历史失败: {e}")
@@ -229,9 +429,8 @@ class AKShareCollector:
         Returns:
             DataFrame with manager info
         """
-        self._rate_limit()
         try:
-            df = ak.fund_manager_em(symbol=fund_code)
+            df = self._request(ak.fund_manager_em, symbol=fund_code)
             return df
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 经理信息失败: {e}")
@@ -247,18 +446,17 @@ class AKShareCollector:
         Returns:
             Dict with rating info from various agencies
         """
-        self._rate_limit()
+        df = self._read_cache('rating', fund_code, self.CACHE_MAX_AGE_HOURS['rating'])
         try:
-            df = ak.fund_rating_em(symbol=fund_code)
+            if df is None:
+                df = self._request(ak.fund_rating_em, symbol=fund_code)
+                self._write_cache('rating', fund_code, df)
             if df.empty:
                 return {}
             
-            # 转换为字典
-            rating = {}
-            for _, row in df.iterrows():
-                rating[row.get('评级机构', '')] = row.get('评级', '')
-            
-            return rating
+            # 转换为字典（缺少的列按空字符串处理）
+            df = df.reindex(columns=['评级机构', '评级'], fill_value='')
+            return dict(zip(df['评级机构'].to_numpy(), df['评级'].to_numpy()))
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 评级失败: {e}")
             return {}
@@ -273,9 +471,8 @@ class AKShareCollector:
         Returns:
             DataFrame with fund ranking
         """
-        self._rate_limit()
         try:
-            df = ak.fund_open_fund_rank_em(symbol=fund_type)
+            df = self._request(ak.fund_open_fund_rank_em, symbol=fund_type)
             logger.info(f"获取 {fund_type} 基金排行成功，共 {len(df)} 只")
             return df
         except Exception as e:
@@ -294,9 +491,8 @@ class AKShareCollector:
         Returns:
             DataFrame with columns: date, open, close, high, low, volume
         """
-        self._rate_limit()
         try:
-            df = ak.stock_zh_index_daily(symbol=symbol)
+            df = self._request(ak.stock_zh_index_daily, symbol=symbol)
             
             # 标准化列名
             if not df.empty:
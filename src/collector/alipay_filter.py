@@ -3,12 +3,43 @@
 
 过滤出支付宝（蚂蚁财富）平台上可购买的基金
 """
+import re
+from functools import lru_cache
 from typing import Dict, List, Set
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 
+# 基金类型关键词，按判断优先级排列（名称同时命中多个类型时取最靠前的）
+_FUND_TYPE_KEYWORDS = (
+    ('money', ('货币', '现金')),
+    ('index', ('指数', 'etf', '联接')),
+    ('qdii', ('qdii', '海外')),
+    ('fof', ('fof',)),
+    ('bond', ('债',)),  # "债券"也包含"债"
+    ('stock', ('股票',)),
+    ('mixed', ('混合', '灵活', '配置')),
+)
+_FUND_TYPE_PRIORITY = {
+    keyword: (priority, fund_type)
+    for priority, (fund_type, keywords) in enumerate(_FUND_TYPE_KEYWORDS)
+    for keyword in keywords
+}
+# 所有关键词合并为一个正则，一次扫描找出全部命中
+_FUND_TYPE_RE = re.compile('|'.join(map(re.escape, _FUND_TYPE_PRIORITY)))
+
+
+@lru_cache(maxsize=65536)
+def _classify_fund_type(combined: str) -> str:
+    """根据小写的"名称 类型"字符串判断基金类型（同名基金在一次评分中会反复出现）"""
+    hits = _FUND_TYPE_RE.findall(combined)
+    if not hits:
+        return 'other'
+    return min(_FUND_TYPE_PRIORITY[hit] for hit in hits)[1]
+
+
 class AlipayFundFilter:
     """
     支付宝可购基金过滤器
@@ -46,6 +77,23 @@ class AlipayFundFilter:
         '股票型-', '混合型-', '债券型-',
     ]
     
+    # 预编译的匹配规则：多个关键词合并为一个正则，名称列只需扫描一遍
+    _EXCLUDE_RE = re.compile('|'.join(map(re.escape, EXCLUDE_KEYWORDS)))
+    _EXCLUDE_PREFIX_TUPLE = tuple(EXCLUDE_PREFIXES)
+    _ALLOWED_TYPE_RE = re.compile('|'.join(map(re.escape, ALLOWED_TYPES)))
+    
+    # 分类规则：(类别, 类型匹配正则)，同一基金可同时属于多个类别
+    # （如"指数型-股票"既属于股票型也属于指数型）
+    _CATEGORY_PATTERNS = [
+        ('股票型', re.compile('股票')),
+        ('混合型', re.compile('混合')),
+        ('债券型', re.compile('债券')),
+        ('指数型', re.compile('指数|联接')),
+        ('货币型', re.compile('货币')),
+        ('QDII', re.compile('QDII')),
+        ('FOF', re.compile('FOF')),
+    ]
+    
     def __init__(self):
         self._purchasable_funds: Set[str] = set()
         self._last_update = None
@@ -63,40 +111,32 @@ class AlipayFundFilter:
         if fund_list.empty:
             return fund_list
         
-        # 标准化列名
-        df = fund_list.copy()
+        # 标准化列名（rename 已返回新对象，无需先复制）
         column_mapping = {
             '基金代码': 'code',
             '基金简称': 'name',
             '基金类型': 'type'
         }
-        df = df.rename(columns=column_mapping)
+        df = fund_list.rename(columns=column_mapping)
         
         # 确保必要的列存在
         if 'code' not in df.columns or 'name' not in df.columns:
             logger.warning("基金列表缺少必要的列")
             return fund_list
         
-        mask = pd.Series([True] * len(df), index=df.index)
-        
         # 1. 排除特定关键词
-        for keyword in self.EXCLUDE_KEYWORDS:
-            mask &= ~df['name'].str.contains(keyword, na=False)
+        mask = ~df['name'].str.contains(self._EXCLUDE_RE, na=False)
         
         # 2. 排除特定前缀
-        for prefix in self.EXCLUDE_PREFIXES:
-            mask &= ~df['code'].astype(str).str.startswith(prefix)
+        mask &= ~df['code'].astype(str).str.startswith(self._EXCLUDE_PREFIX_TUPLE)
         
-        # 3. 只保留主要基金类型（如果有 type 列）
+        # 3. 只保留主要基金类型（如果有 type 列），类型未知的暂时保留
         if 'type' in df.columns:
-            def check_type(t):
-                if pd.isna(t):
-                    return True  # 类型未知的暂时保留
-                return any(at in str(t) for at in self.ALLOWED_TYPES)
-            
-            mask &= df['type'].apply(check_type)
+            types = df['type']
+            mask &= types.isna() | types.astype(str).str.contains(self._ALLOWED_TYPE_RE)
         
-        result = fund_list[mask].copy()
+        # 布尔索引本身就返回新的 DataFrame
+        result = fund_list[mask]
         logger.info(f"过滤后可购基金数量: {len(result)} / {len(fund_list)}")
         
         return result
@@ -111,27 +151,27 @@ class AlipayFundFilter:
         Returns:
             Dict[category, DataFrame]
         """
-        # 标准化列名
-        df = fund_list.copy()
+        # 标准化列名（rename 已返回新对象，无需先复制）
         column_mapping = {
             '基金代码': 'code',
             '基金简称': 'name',
             '基金类型': 'type'
         }
-        df = df.rename(columns=column_mapping)
+        df = fund_list.rename(columns=column_mapping)
         
         if 'type' not in df.columns:
             return {'all': df}
         
-        categories = {
-            '股票型': df[df['type'].str.contains('股票', na=False)],
-            '混合型': df[df['type'].str.contains('混合', na=False)],
-            '债券型': df[df['type'].str.contains('债券', na=False)],
-            '指数型': df[df['type'].str.contains('指数|联接', na=False)],
-            '货币型': df[df['type'].str.contains('货币', na=False)],
-            'QDII': df[df['type'].str.contains('QDII', na=False)],
-            'FOF': df[df['type'].str.contains('FOF', na=False)],
-        }
+        # 基金类型的取值只有几十种：先对类型列编码一次，
+        # 各类别的正则只在去重后的类型上匹配，再按编码映射回每只基金
+        codes, uniques = pd.factorize(df['type'])
+        unique_types = pd.Series(uniques, dtype=object)
+        
+        categories = {}
+        for category, pattern in self._CATEGORY_PATTERNS:
+            matched = unique_types.str.contains(pattern, na=False).to_numpy(dtype=bool)
+            # 类型缺失的编码为 -1，对应末尾追加的 False
+            categories[category] = df[np.append(matched, False)[codes]]
         
         return categories
     
@@ -149,24 +189,7 @@ class AlipayFundFilter:
         name = fund_name.lower() if fund_name else ''
         type_str = str(fund_type).lower() if fund_type else ''
         
-        combined = name + ' ' + type_str
-        
-        if '货币' in combined or '现金' in combined:
-            return 'money'
-        elif '指数' in combined or 'etf' in combined or '联接' in combined:
-            return 'index'
-        elif 'qdii' in combined or '海外' in combined:
-            return 'qdii'
-        elif 'fof' in combined:
-            return 'fof'
-        elif '债券' in combined or '债' in combined:
-            return 'bond'
-        elif '股票' in combined:
-            return 'stock'
-        elif '混合' in combined or '灵活' in combined or '配置' in combined:
-            return 'mixed'
-        else:
-            return 'other'
+        return _classify_fund_type(name + ' ' + type_str)
 
 
 # 创建全局实例
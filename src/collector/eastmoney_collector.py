@@ -3,16 +3,62 @@
 
 提供天天基金实时数据和业绩排名等功能
 """
-import json
+import asyncio
+import hashlib
+import os
+import pickle
 import re
-import time
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
-import requests
 from loguru import logger
 
+from config.settings import settings, json_loads
+from .http_client import create_session
+from .js_vars import extract_js_vars
+from .rate_limiter import TokenBucket
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# 页面/接口返回内容的解析正则（模块加载时编译一次）
+# 列表/排名/实时估值直接在响应字节上匹配，省去整段文本的 UTF-8 解码
+_RE_FUND_LIST = re.compile(rb'var r = (\[.*?\]);', re.S)
+_RE_JSONPGZ = re.compile(rb'jsonpgz\((.*)\)')
+_RE_MANAGER_LOOSE = re.compile(r'Data_currentFundManager\s*=\s*(\[.*?\]);', re.S)
+_RE_DATAS = re.compile(rb'datas:\[(.*?)\],', re.S)
+
+# 基金列表每项的字段（按数组顺序）
+_FUND_LIST_KEYS = ('code', 'abbr', 'name', 'type', 'pinyin')
+
+# 基金详情页中的简单变量
+_DETAIL_SIMPLE_VARS = (
+    'fS_name',          # 基金名称
+    'fS_code',          # 基金代码
+    'fund_sourceRate',  # 原申购费率
+    'fund_Rate',        # 现申购费率
+    'fund_minsg',       # 最小申购金额
+    'syl_1n',           # 近1年收益率
+    'syl_6y',           # 近6月收益率
+    'syl_3y',           # 近3月收益率
+    'syl_1y',           # 近1月收益率
+)
+
+# 基金详情页中的 JSON 变量 -> 结果字段
+_DETAIL_JSON_VARS = (
+    ('Data_netWorthTrend', 'nav_history'),      # 历史净值数据
+    ('stockCodesNew', 'holdings'),              # 持仓数据
+    ('Data_currentFundManager', 'managers'),    # 基金经理信息
+)
+
 
 class EastMoneyCollector:
     """
@@ -24,28 +70,140 @@ class EastMoneyCollector:
         'Referer': 'http://fund.eastmoney.com/',
         'Accept': '*/*',
         'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Connection': 'keep-alive',
     }
     
-    def __init__(self, request_interval: float = 0.3):
+    # 实时估值接口
+    REALTIME_API = "http://fundgz.1234567.com.cn/js/{fund_code}.js"
+    
+    # 批量请求时同一主机的最大并发连接数（即同时在途的请求数上限）
+    MAX_CONNECTIONS_PER_HOST = 16
+    
+    # 基金排名数据项中各列对应的字段序号
+    _RANK_TEXT_FIELDS = (('fund_code', 0), ('fund_name', 1), ('nav_date', 3))
+    _RANK_NUMERIC_FIELDS = (
+        ('nav', 4), ('acc_nav', 5),
+        ('return_1d', 6), ('return_1w', 7), ('return_1m', 8), ('return_3m', 9),
+        ('return_6m', 10), ('return_1y', 11), ('return_2y', 12), ('return_3y', 13),
+        ('return_ytd', 14),
+    )
+    
+    # 被限流（HTTP 429）时的重试次数和退避基数（秒）
+    MAX_RETRIES = 4
+    RETRY_BACKOFF = 0.5
+    
+    # 大体量页面的磁盘缓存有效期（小时），过期后带 ETag/Last-Modified 条件请求
+    CACHE_MAX_AGE_HOURS = {
+        'fund_list': 1,      # 全部基金列表（数 MB）
+        'rank': 10 / 60,     # 业绩排名
+    }
+    
+    def __init__(
+        self,
+        request_interval: float = 0.1,
+        burst: int = 10,
+        cache_dir: Optional[str] = None,
+        use_cache: bool = True
+    ):
         """
         初始化采集器
         
         Args:
-            request_interval: 请求间隔（秒），避免被限流
+            request_interval: 平均请求间隔（秒），避免被限流
+            burst: 空闲后允许连续发出的请求数
+            cache_dir: 磁盘缓存目录，默认 data/cache/eastmoney
+            use_cache: 是否使用磁盘缓存
         """
         self.request_interval = request_interval
-        self._last_request_time = 0
-        self._lock = threading.Lock()  # 添加线程锁
-        self.session = requests.Session()
-        self.session.headers.update(self.BASE_HEADERS)
+        # 同步请求与异步批量请求共用同一个令牌桶
+        self._limiter = TokenBucket(
+            1 / request_interval if request_interval > 0 else 0, burst
+        )
+        # 长连接复用的 HTTP 会话（安装 httpx 时 HTTPS 请求走 HTTP/2）
+        self.session = create_session(self.BASE_HEADERS)
+        
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir or os.path.join(settings.CACHE_DIR, 'eastmoney'))
     
     def _rate_limit(self):
-        """请求限流（线程安全）"""
-        with self._lock:
-            elapsed = time.time() - self._last_request_time
-            if elapsed < self.request_interval:
-                time.sleep(self.request_interval - elapsed)
-            self._last_request_time = time.time()
+        """请求限流（线程安全，令牌桶）"""
+        self._limiter.acquire()
+    
+    # ============ 磁盘缓存 ============
+    
+    def _cache_path(self, kind: str, url: str, params: Optional[Dict]) -> Path:
+        query = '&'.join(f'{k}={v}' for k, v in sorted((params or {}).items()))
+        key = hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+        return self.cache_dir / kind / f'{key}.pkl'
+    
+    def _cached_get(
+        self,
+        kind: str,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: float = 10
+    ) -> bytes:
+        """
+        带磁盘缓存的 GET 请求，返回响应内容（未解码的字节）
+        
+        缓存未过期时直接返回；过期后带上次的 ETag/Last-Modified 发起条件请求，
+        服务端返回 304 时沿用缓存内容并刷新有效期
+        
+        Args:
+            kind: 数据类别（子目录，同时决定有效期）
+            url: 请求地址
+            params: 查询参数
+            timeout: 超时时间（秒）
+        """
+        filepath = self._cache_path(kind, url, params)
+        entry = None
+        if self.use_cache:
+            try:
+                age = time.time() - filepath.stat().st_mtime
+                with open(filepath, 'rb') as f:
+                    entry = pickle.load(f)
+                if age <= self.CACHE_MAX_AGE_HOURS[kind] * 3600:
+                    return entry['content']
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"读取缓存失败 {filepath}: {e}")
+                entry = None
+        
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        self._rate_limit()
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        
+        if response.status_code == 304 and entry:
+            try:
+                os.utime(filepath)
+            except OSError:
+                pass
+            return entry['content']
+        
+        content = response.content
+        if self.use_cache and response.status_code == 200 and content:
+            entry = {
+                'content': content,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            # 先写临时文件再替换，并发读取不会读到半个文件
+            tmp_path = filepath.with_name(f'{filepath.name}.{threading.get_ident()}.tmp')
+            try:
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, filepath)
+            except Exception as e:
+                logger.warning(f"写入缓存失败 {filepath}: {e}")
+        return content
     
     def get_fund_list(self) -> List[Dict]:
         """
@@ -59,29 +217,17 @@ class EastMoneyCollector:
             - type: 基金类型
             - pinyin: 全拼
         """
-        self._rate_limit()
         url = "http://fund.eastmoney.com/js/fundcode_search.js"
         
         try:
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            
             # 解析 JavaScript 变量
             # 格式: var r = [["000001","HXCZHH","华夏成长混合","混合型-灵活","HUAXIACHENGZHANGHUNHE"],...]
-            content = response.text
-            match = re.search(r'var r = (\[.*?\]);', content, re.S)
+            content = self._cached_get('fund_list', url, timeout=10)
+            match = _RE_FUND_LIST.search(content)
             
             if match:
-                data = json.loads(match.group(1))
-                funds = []
-                for item in data:
-                    funds.append({
-                        'code': item[0],
-                        'abbr': item[1],
-                        'name': item[2],
-                        'type': item[3],
-                        'pinyin': item[4]
-                    })
+                data = json_loads(match.group(1))
+                funds = [dict(zip(_FUND_LIST_KEYS, item)) for item in data]
                 logger.info(f"获取基金列表成功，共 {len(funds)} 只")
                 return funds
             
@@ -108,26 +254,51 @@ class EastMoneyCollector:
             - gztime: 估算时间
         """
         self._rate_limit()
-        url = f"http://fundgz.1234567.com.cn/js/{fund_code}.js"
+        url = self.REALTIME_API.format(fund_code=fund_code)
         
         try:
             response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            
-            # 解析 JSONP
-            # 格式: jsonpgz({"fundcode":"000001","name":"华夏成长混合",...});
-            content = response.text
-            match = re.search(r'jsonpgz\((.*)\)', content)
-            
-            if match:
-                data = json.loads(match.group(1))
-                return data
-            
-            return None
+            return self._parse_realtime(response.content)
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 实时数据失败: {e}")
             return None
     
+    @staticmethod
+    def _parse_realtime(content: bytes) -> Optional[Dict]:
+        """
+        解析实时估值 JSONP
+        
+        格式: jsonpgz({"fundcode":"000001","name":"华夏成长混合",...});
+        """
+        # 返回格式固定，直接切掉首尾包装；格式不符时再用正则兜底
+        content = content.strip()
+        if content.startswith(b'jsonpgz(') and content.endswith(b');'):
+            return json_loads(content[8:-2])
+        
+        match = _RE_JSONPGZ.search(content)
+        if match:
+            return json_loads(match.group(1))
+        return None
+    
+    async def _fetch_realtime_async(self, session, fund_code: str) -> Optional[Dict]:
+        """异步获取单只基金实时估值（供批量查询使用），被限流时指数退避重试"""
+        url = self.REALTIME_API.format(fund_code=fund_code)
+        
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self._limiter.acquire_async()
+            try:
+                async with session.get(url) as response:
+                    if response.status != 429 or attempt == self.MAX_RETRIES:
+                        content = await response.read()
+                        return self._parse_realtime(content)
+            except Exception as e:
+                logger.error(f"获取基金 {fund_code} 实时数据失败: {e}")
+                return None
+            
+            delay = self.RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"基金 {fund_code} 实时数据请求被限流，{delay:.1f} 秒后重试")
+            await asyncio.sleep(delay)
+    
     def get_fund_detail(self, fund_code: str) -> Dict:
         """
         获取基金详细数据（包括历史净值、持仓等）
@@ -148,62 +319,34 @@ class EastMoneyCollector:
             
             data = {}
             
-            # 解析各个变量
-            patterns = {
-                'fS_name': r'var fS_name = "(.+?)";',  # 基金名称
-                'fS_code': r'var fS_code = "(.+?)";',  # 基金代码
-                'fund_sourceRate': r'var fund_sourceRate="(.+?)";',  # 原申购费率
-                'fund_Rate': r'var fund_Rate="(.+?)";',  # 现申购费率
-                'fund_minsg': r'var fund_minsg="(.+?)";',  # 最小申购金额
-                'syl_1n': r'var syl_1n="(.+?)";',  # 近1年收益率
-                'syl_6y': r'var syl_6y="(.+?)";',  # 近6月收益率
-                'syl_3y': r'var syl_3y="(.+?)";',  # 近3月收益率
-                'syl_1y': r'var syl_1y="(.+?)";',  # 近1月收益率
-            }
+            # 单次扫描提取所有需要的变量
+            js_vars = extract_js_vars(
+                content, _DETAIL_SIMPLE_VARS + tuple(name for name, _ in _DETAIL_JSON_VARS)
+            )
             
-            for key, pattern in patterns.items():
-                match = re.search(pattern, content)
-                if match:
-                    value = match.group(1)
+            for key in _DETAIL_SIMPLE_VARS:
+                value = js_vars.get(key)
+                if value:
                     try:
-                        data[key] = json.loads(value) if value.startswith('[') else value
+                        data[key] = json_loads(value) if value.startswith('[') else value
                     except:
                         data[key] = value
             
             # 解析复杂数据结构
-            # 历史净值数据
-            nav_pattern = r'var Data_netWorthTrend = (\[.*?\]);'
-            match = re.search(nav_pattern, content, re.S)
-            if match:
-                try:
-                    data['nav_history'] = json.loads(match.group(1))
-                except:
-                    pass
-            
-            # 持仓数据
-            holdings_pattern = r'var stockCodesNew=(\[.*?\]);'
-            match = re.search(holdings_pattern, content, re.S)
-            if match:
-                try:
-                    data['holdings'] = json.loads(match.group(1))
-                except:
-                    pass
+            for name, key in _DETAIL_JSON_VARS:
+                value = js_vars.get(name)
+                if value and value.startswith('['):
+                    try:
+                        data[key] = json_loads(value)
+                    except:
+                        pass
             
-            # 基金经理信息
-            manager_pattern = r'var Data_currentFundManager\s*=\s*(\[.*?\]);'
-            match = re.search(manager_pattern, content, re.S)
-            if match:
-                try:
-                    data['managers'] = json.loads(match.group(1))
-                except:
-                    pass
-            else:
+            if 'Data_currentFundManager' not in js_vars:
                 # 尝试更宽松的匹配
-                manager_pattern = r'Data_currentFundManager\s*=\s*(\[.*?\]);'
-                match = re.search(manager_pattern, content, re.S)
+                match = _RE_MANAGER_LOOSE.search(content)
                 if match:
                     try:
-                        data['managers'] = json.loads(match.group(1))
+                        data['managers'] = json_loads(match.group(1))
                     except:
                         pass
                 else:
@@ -225,8 +368,6 @@ class EastMoneyCollector:
         Returns:
             DataFrame with fund performance data
         """
-        self._rate_limit()
-        
         type_map = {
             'all': '',
             'stock': 'gp',
@@ -257,50 +398,35 @@ class EastMoneyCollector:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=15)
-            response.encoding = 'utf-8'
-            
             # 解析返回数据
-            content = response.text
+            content = self._cached_get('rank', url, params=params, timeout=15)
             
             # 尝试提取 datas 数组（直接提取字符串数组）
             # 格式: var rankData = {datas:["000001,华夏成长,...",...],allRecords:...}
-            match = re.search(r'datas:\[(.*?)\],', content, re.S)
+            match = _RE_DATAS.search(content)
             
             if not match:
                 logger.warning("无法解析基金排名数据格式")
                 return pd.DataFrame()
             
-            datas_str = match.group(1)
+            datas_str = match.group(1).strip().decode('utf-8')
             
-            # 提取每个基金数据项
-            items = re.findall(r'"([^"]*)"', datas_str)
+            # 提取每个基金数据项（各项为 "a,b,c" 形式的字符串，以 "," 分隔）
+            items = datas_str.strip('"').split('","') if datas_str else []
             
             if not items:
                 return pd.DataFrame()
             
-            funds_data = []
-            for item in items:
-                parts = item.split(',')
-                if len(parts) >= 15:
-                    funds_data.append({
-                        'fund_code': parts[0],
-                        'fund_name': parts[1],
-                        'nav_date': parts[3] if len(parts) > 3 else '',
-                        'nav': self._safe_float(parts[4]) if len(parts) > 4 else None,
-                        'acc_nav': self._safe_float(parts[5]) if len(parts) > 5 else None,
-                        'return_1d': self._safe_float(parts[6]) if len(parts) > 6 else None,
-                        'return_1w': self._safe_float(parts[7]) if len(parts) > 7 else None,
-                        'return_1m': self._safe_float(parts[8]) if len(parts) > 8 else None,
-                        'return_3m': self._safe_float(parts[9]) if len(parts) > 9 else None,
-                        'return_6m': self._safe_float(parts[10]) if len(parts) > 10 else None,
-                        'return_1y': self._safe_float(parts[11]) if len(parts) > 11 else None,
-                        'return_2y': self._safe_float(parts[12]) if len(parts) > 12 else None,
-                        'return_3y': self._safe_float(parts[13]) if len(parts) > 13 else None,
-                        'return_ytd': self._safe_float(parts[14]) if len(parts) > 14 else None,
-                    })
+            # 只用到前 15 个字段，限制切分次数避免切开后面的字段
+            rows = [parts for parts in (item.split(',', 15) for item in items) if len(parts) >= 15]
+            
+            # 按列构建数据，数值列整列转换（无法解析的值记为 NaN）
+            matrix = np.array([row[:15] for row in rows], dtype=object).reshape(-1, 15)
+            columns = {name: matrix[:, i] for name, i in self._RANK_TEXT_FIELDS}
+            for name, i in self._RANK_NUMERIC_FIELDS:
+                columns[name] = pd.to_numeric(matrix[:, i], errors='coerce').astype(np.float64, copy=False)
             
-            df = pd.DataFrame(funds_data)
+            df = pd.DataFrame(columns)
             logger.info(f"获取 {fund_type} 基金排名成功，共 {len(df)} 只")
             return df
             
@@ -308,12 +434,32 @@ class EastMoneyCollector:
             logger.error(f"获取基金排名失败: {e}")
             return pd.DataFrame()
     
-    def _safe_float(self, value: str) -> Optional[float]:
-        """安全转换为浮点数"""
-        try:
-            return float(value) if value else None
-        except (ValueError, TypeError):
-            return None
+    async def batch_get_realtime_async(self, fund_codes: List[str]) -> Dict[str, Dict]:
+        """
+        异步批量获取基金实时数据
+        
+        所有请求在同一个事件循环中并发发出，总耗时接近单次往返时间
+        
+        Args:
+            fund_codes: 基金代码列表
+            
+        Returns:
+            Dict[fund_code, realtime_data]
+        """
+        if not fund_codes:
+            return {}
+        
+        connector = aiohttp.TCPConnector(limit_per_host=self.MAX_CONNECTIONS_PER_HOST)
+        async with aiohttp.ClientSession(
+            headers=self.BASE_HEADERS,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as session:
+            data_list = await asyncio.gather(
+                *(self._fetch_realtime_async(session, code) for code in fund_codes)
+            )
+        
+        return {code: data for code, data in zip(fund_codes, data_list) if data}
     
     def batch_get_realtime(self, fund_codes: List[str]) -> Dict[str, Dict]:
         """
@@ -325,12 +471,18 @@ class EastMoneyCollector:
         Returns:
             Dict[fund_code, realtime_data]
         """
-        results = {}
-        for code in fund_codes:
-            data = self.get_fund_realtime(code)
-            if data:
-                results[code] = data
-        return results
+        if not fund_codes:
+            return {}
+        
+        if aiohttp is not None:
+            return asyncio.run(self.batch_get_realtime_async(fund_codes))
+        
+        # 未安装 aiohttp 时用线程池并发请求
+        max_workers = min(self.MAX_CONNECTIONS_PER_HOST, len(fund_codes))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            data_list = list(executor.map(self.get_fund_realtime, fund_codes))
+        
+        return {code: data for code, data in zip(fund_codes, data_list) if data}
 
 
 # 创建全局实例
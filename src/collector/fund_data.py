@@ -2,14 +2,48 @@
 基金数据采集模块
 """
 import re
-import json
-import requests
+import threading
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
-from typing import Optional, List, Dict
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple
 from loguru import logger
 
+from config.settings import json_loads
+from .http_client import create_session
+from .js_vars import extract_js_vars
 from ..models import FundNav, FundInfo, FundType
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# 接口返回内容的解析正则（模块加载时编译一次）
+_RE_JSONPGZ = re.compile(rb'jsonpgz\((.*?)\);')
+
+# 各时间段收益率变量 (类似: var syl_1n = "15.23";)
+_PERFORMANCE_VARS = (
+    ('day', 'syl_1d'),
+    ('week', 'syl_1z'),
+    ('month_1', 'syl_1y'),
+    ('month_3', 'syl_3y'),
+    ('month_6', 'syl_6y'),
+    ('year_1', 'syl_1n'),
+    ('year_2', 'syl_2n'),
+    ('year_3', 'syl_3n'),
+    ('since_establish', 'syl_lnz'),
+)
+
+# 详情页中 get_fund_detail / get_fund_performance 用到的全部变量，一次扫描全部提取
+_DETAIL_PAGE_VARS = (
+    'Data_currentFundManager', 'Data_netWorthTrend',
+    'Data_rateInSimilarType', 'stockCodesNew',
+) + tuple(name for _, name in _PERFORMANCE_VARS)
+
 
 class FundDataCollector:
     """基金数据采集器"""
@@ -19,48 +53,136 @@ class FundDataCollector:
     FUND_DETAIL_API = "http://fund.eastmoney.com/pingzhongdata/{fund_code}.js"
     FUND_NET_VALUE_API = "http://api.fund.eastmoney.com/f10/lsjz"
     FUND_INFO_API = "http://fund.eastmoney.com/{fund_code}.html"
+    # 天天基金移动端批量估值接口（一次请求返回多只基金）
+    FUND_BULK_ESTIMATE_API = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo"
+    BULK_ESTIMATE_PAGE_SIZE = 200
     
     # 请求头
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Referer": "http://fund.eastmoney.com/"
+        "Referer": "http://fund.eastmoney.com/",
+        "Connection": "keep-alive"
     }
     
+    # 实时估值缓存有效期（秒），同一次命令内重复查询同一基金时直接复用
+    ESTIMATE_CACHE_TTL = 60
+    
+    # 详情页（pingzhongdata）缓存有效期（秒）和最多缓存的基金数，
+    # 业绩和详情解析自同一页面，只需下载、扫描一次
+    DETAIL_PAGE_CACHE_TTL = 300
+    DETAIL_PAGE_CACHE_SIZE = 256
+    
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(self.HEADERS)
+        # 长连接复用的 HTTP 会话（安装 httpx 时 HTTPS 请求走 HTTP/2）
+        self.session = create_session(self.HEADERS)
+        
+        # 实时估值缓存 {fund_code: (获取时间, FundNav)}
+        self._estimate_cache: Dict[str, Tuple[float, FundNav]] = {}
+        # 详情页变量缓存 {fund_code: (获取时间, {变量名: 原始值})}，按写入顺序淘汰
+        self._detail_vars_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._detail_vars_lock = threading.Lock()
+    
+    def clear_estimate_cache(self):
+        """清空实时估值缓存"""
+        self._estimate_cache.clear()
     
     def get_fund_estimate(self, fund_code: str) -> Optional[FundNav]:
         """获取基金实时估值
         
         注意：货币基金没有估值数据
         """
+        cached = self._estimate_cache.get(fund_code)
+        if cached and time.monotonic() - cached[0] < self.ESTIMATE_CACHE_TTL:
+            return cached[1]
+        
         try:
             url = self.FUND_NAV_API.format(fund_code=fund_code)
             response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            
-            # 解析JSONP格式: jsonpgz({...});
-            text = response.text
-            match = re.search(r'jsonpgz\((.*?)\);', text)
+            return self._parse_estimate(fund_code, response.content)
+        except Exception as e:
+            logger.error(f"获取基金 {fund_code} 估值失败: {e}")
+            return None
+    
+    def _parse_estimate(self, fund_code: str, content: bytes) -> Optional[FundNav]:
+        """解析估值 JSONP 并写入缓存，格式: jsonpgz({...});（直接在响应字节上解析）"""
+        # 返回格式固定，直接切掉首尾包装；格式不符时再用正则兜底
+        content = content.strip()
+        if content.startswith(b'jsonpgz(') and content.endswith(b');'):
+            payload = content[8:-2]
+        else:
+            match = _RE_JSONPGZ.search(content)
             if not match:
                 logger.warning(f"基金 {fund_code} 估值数据解析失败")
                 return None
-            
-            data = json.loads(match.group(1))
-            
-            return FundNav(
-                code=data.get('fundcode', fund_code),
-                name=data.get('name', ''),
-                nav=float(data.get('dwjz', 0)),  # 单位净值
-                estimate_nav=float(data.get('gsz', 0)),  # 估算净值
-                estimate_return=float(data.get('gszzl', 0)) / 100,  # 估算涨跌幅
-                nav_date=date.today()
-            )
+            payload = match.group(1)
+        
+        data = json_loads(payload)
+        
+        nav = FundNav(
+            code=data.get('fundcode', fund_code),
+            name=data.get('name', ''),
+            nav=float(data.get('dwjz', 0)),  # 单位净值
+            estimate_nav=float(data.get('gsz', 0)),  # 估算净值
+            estimate_return=float(data.get('gszzl', 0)) / 100,  # 估算涨跌幅
+            nav_date=date.today()
+        )
+        self._estimate_cache[fund_code] = (time.monotonic(), nav)
+        return nav
+    
+    async def _fetch_estimate_async(self, session, fund_code: str) -> Optional[FundNav]:
+        """异步获取基金实时估值（与 get_fund_estimate 共用缓存）"""
+        cached = self._estimate_cache.get(fund_code)
+        if cached and time.monotonic() - cached[0] < self.ESTIMATE_CACHE_TTL:
+            return cached[1]
+        
+        try:
+            url = self.FUND_NAV_API.format(fund_code=fund_code)
+            async with session.get(url) as response:
+                content = await response.read()
+            return self._parse_estimate(fund_code, content)
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 估值失败: {e}")
             return None
     
+    def _get_detail_vars(self, fund_code: str) -> Dict[str, str]:
+        """
+        获取基金详情页中的变量（有效期内复用，供 get_fund_detail / get_fund_performance 共用）
+        
+        只缓存提取出的变量而不是整页文本，缓存数量超过上限时淘汰最早写入的基金
+        """
+        cached = self._detail_vars_cache.get(fund_code)
+        if cached and time.monotonic() - cached[0] < self.DETAIL_PAGE_CACHE_TTL:
+            return cached[1]
+        
+        url = self.FUND_DETAIL_API.format(fund_code=fund_code)
+        response = self.session.get(url, timeout=10)
+        response.encoding = 'utf-8'
+        js_vars = extract_js_vars(response.text, _DETAIL_PAGE_VARS)
+        
+        if response.status_code == 200:
+            with self._detail_vars_lock:
+                self._detail_vars_cache.pop(fund_code, None)
+                self._detail_vars_cache[fund_code] = (time.monotonic(), js_vars)
+                while len(self._detail_vars_cache) > self.DETAIL_PAGE_CACHE_SIZE:
+                    del self._detail_vars_cache[next(iter(self._detail_vars_cache))]
+        return js_vars
+    
+    @staticmethod
+    def _map_concurrent(func, fund_codes: List[str], max_workers: int) -> Dict:
+        """在线程池中对每只基金并发执行 func，按完成顺序收集非空结果"""
+        codes = list(dict.fromkeys(fund_codes))
+        if not codes:
+            return {}
+        
+        result = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(codes))) as executor:
+            futures = {executor.submit(func, code): code for code in codes}
+            for future in as_completed(futures):
+                value = future.result()
+                if value:
+                    result[futures[future]] = value
+        return result
+    
     def get_fund_nav_history(
         self, 
         fund_code: str, 
@@ -90,7 +212,7 @@ class FundDataCollector:
                 params=params,
                 timeout=10
             )
-            data = response.json()
+            data = json_loads(response.content)
             
             if data.get("ErrCode") == 0:
                 nav_list = data.get("Data", {}).get("LSJZList", [])
@@ -114,17 +236,14 @@ class FundDataCollector:
         包含基金经理、业绩走势、持仓等
         """
         try:
-            url = self.FUND_DETAIL_API.format(fund_code=fund_code)
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            text = response.text
+            js_vars = self._get_detail_vars(fund_code)
             
             result = {}
             
             # 解析基金经理信息
-            manager_match = re.search(r'var Data_currentFundManager\s*=\s*(\[.*?\]);', text, re.DOTALL)
-            if manager_match:
-                managers = json.loads(manager_match.group(1).rstrip(';'))
+            managers = js_vars.get('Data_currentFundManager')
+            if managers and managers.startswith('['):
+                managers = json_loads(managers)
                 result['managers'] = [
                     {
                         'name': m.get('name'),
@@ -135,10 +254,10 @@ class FundDataCollector:
                 ]
             
             # 解析业绩走势数据
-            trend_match = re.search(r'var Data_netWorthTrend\s*=\s*(\[.*?\]);', text, re.DOTALL)
-            if trend_match:
+            trends = js_vars.get('Data_netWorthTrend')
+            if trends and trends.startswith('['):
                 # 只取最近的数据点
-                trends = json.loads(trend_match.group(1).rstrip(';'))
+                trends = json_loads(trends)
                 if trends:
                     result['recent_nav'] = {
                         'date': datetime.fromtimestamp(trends[-1]['x'] / 1000).strftime('%Y-%m-%d'),
@@ -146,15 +265,14 @@ class FundDataCollector:
                     }
             
             # 解析同类排名
-            rank_match = re.search(r'var Data_rateInSimilarType\s*=\s*(\[.*?\]);', text, re.DOTALL)
-            if rank_match:
-                ranks = json.loads(rank_match.group(1).rstrip(';'))
-                result['rank_in_similar'] = ranks
+            ranks = js_vars.get('Data_rateInSimilarType')
+            if ranks and ranks.startswith('['):
+                result['rank_in_similar'] = json_loads(ranks)
             
-            # 解析持仓股票
-            stocks_match = re.search(r'var stockCodesNew\s*=\s*"(.*?)";', text)
-            if stocks_match:
-                result['top_stocks'] = stocks_match.group(1).split(',') if stocks_match.group(1) else []
+            # 解析持仓股票（逗号分隔的字符串）
+            stocks = js_vars.get('stockCodesNew')
+            if stocks is not None and not stocks.startswith('['):
+                result['top_stocks'] = stocks.split(',') if stocks else []
             
             return result
             
@@ -162,37 +280,30 @@ class FundDataCollector:
             logger.error(f"获取基金 {fund_code} 详情失败: {e}")
             return None
     
+    def batch_get_fund_details(self, fund_codes: List[str], max_workers: int = 16) -> Dict[str, dict]:
+        """批量获取基金详细信息
+        
+        各基金详情页在线程池中并发下载（网络等待期间释放 GIL），
+        页面变量会被缓存，随后的 get_fund_detail / get_fund_performance 不再重复请求
+        """
+        return self._map_concurrent(self.get_fund_detail, fund_codes, max_workers)
+    
     def get_fund_performance(self, fund_code: str) -> Optional[dict]:
         """获取基金业绩表现
         
         返回各时间段收益率
         """
         try:
-            url = self.FUND_DETAIL_API.format(fund_code=fund_code)
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            text = response.text
+            js_vars = self._get_detail_vars(fund_code)
             
-            # 解析业绩数据 (类似: var syl_1n = "15.23";)
+            # 解析业绩数据
             performance = {}
             
-            patterns = {
-                'day': r'var syl_1d\s*=\s*"(.*?)";',
-                'week': r'var syl_1z\s*=\s*"(.*?)";',
-                'month_1': r'var syl_1y\s*=\s*"(.*?)";',
-                'month_3': r'var syl_3y\s*=\s*"(.*?)";',
-                'month_6': r'var syl_6y\s*=\s*"(.*?)";',
-                'year_1': r'var syl_1n\s*=\s*"(.*?)";',
-                'year_2': r'var syl_2n\s*=\s*"(.*?)";',
-                'year_3': r'var syl_3n\s*=\s*"(.*?)";',
-                'since_establish': r'var syl_lnz\s*=\s*"(.*?)";',
-            }
-            
-            for key, pattern in patterns.items():
-                match = re.search(pattern, text)
-                if match and match.group(1):
+            for key, name in _PERFORMANCE_VARS:
+                value = js_vars.get(name)
+                if value:
                     try:
-                        performance[key] = float(match.group(1)) / 100
+                        performance[key] = float(value) / 100
                     except ValueError:
                         performance[key] = None
                 else:
@@ -204,39 +315,145 @@ class FundDataCollector:
             logger.error(f"获取基金 {fund_code} 业绩失败: {e}")
             return None
     
-    def batch_get_nav(self, fund_codes: List[str]) -> Dict[str, FundNav]:
-        """批量获取基金净值"""
+    async def batch_get_nav_async(
+        self,
+        fund_codes: List[str],
+        max_connections: int = 16
+    ) -> Dict[str, FundNav]:
+        """异步批量获取基金净值，所有请求在同一个事件循环中并发发出"""
+        if not fund_codes:
+            return {}
+        
+        connector = aiohttp.TCPConnector(limit_per_host=max_connections)
+        async with aiohttp.ClientSession(
+            headers=self.HEADERS,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as session:
+            navs = await asyncio.gather(
+                *(self._fetch_estimate_async(session, code) for code in fund_codes)
+            )
+        
+        return {code: nav for code, nav in zip(fund_codes, navs) if nav}
+    
+    def batch_get_nav(self, fund_codes: List[str], max_workers: int = 16) -> Dict[str, FundNav]:
+        """批量获取基金净值
+        
+        各基金请求相互独立，并发发出，总耗时约为单次往返时间；
+        安装了 aiohttp 时在事件循环中并发，否则使用线程池
+        """
+        if not fund_codes:
+            return {}
+        
+        if aiohttp is not None:
+            return asyncio.run(self.batch_get_nav_async(fund_codes, max_workers))
+        
+        return self._map_concurrent(self.get_fund_estimate, fund_codes, max_workers)
+    
+    def get_fund_estimates_bulk(self, fund_codes: List[str]) -> Dict[str, FundNav]:
+        """批量获取基金实时估值
+        
+        每 BULK_ESTIMATE_PAGE_SIZE 只基金合并为一次请求；
+        批量接口未返回的基金再逐只查询补齐
+        """
         result = {}
-        for code in fund_codes:
-            nav = self.get_fund_estimate(code)
-            if nav:
-                result[code] = nav
+        pending = list(dict.fromkeys(fund_codes))
+        
+        for start in range(0, len(pending), self.BULK_ESTIMATE_PAGE_SIZE):
+            page = pending[start:start + self.BULK_ESTIMATE_PAGE_SIZE]
+            try:
+                response = self.session.get(
+                    self.FUND_BULK_ESTIMATE_API,
+                    params={
+                        "pageIndex": 1,
+                        "pageSize": len(page),
+                        "plat": "Android",
+                        "appType": "ttjj",
+                        "product": "EFund",
+                        "Version": "1",
+                        "deviceid": "fund-advisor",
+                        "Fcodes": ",".join(page),
+                    },
+                    timeout=10
+                )
+                data = json_loads(response.content)
+            except Exception as e:
+                logger.warning(f"批量获取估值失败，改为逐只查询: {e}")
+                continue
+            
+            for item in data.get("Datas") or []:
+                nav = self._parse_bulk_estimate(item)
+                if nav:
+                    result[nav.code] = nav
+                    self._estimate_cache[nav.code] = (time.monotonic(), nav)
+        
+        missing = [code for code in pending if code not in result]
+        if missing:
+            result.update(self.batch_get_nav(missing))
+        
         return result
     
+    @staticmethod
+    def _parse_bulk_estimate(item: dict) -> Optional[FundNav]:
+        """解析批量估值接口的单条记录"""
+        def to_float(value) -> Optional[float]:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None  # 货币基金等无估值时为 "--"
+        
+        nav = to_float(item.get("NAV"))
+        if not item.get("FCODE") or nav is None:
+            return None
+        
+        estimate_return = to_float(item.get("GSZZL"))
+        return FundNav(
+            code=item["FCODE"],
+            name=item.get("SHORTNAME", ""),
+            nav=nav,  # 单位净值
+            acc_nav=to_float(item.get("ACCNAV")),
+            estimate_nav=to_float(item.get("GSZ")),  # 估算净值
+            estimate_return=estimate_return / 100 if estimate_return is not None else None,
+            nav_date=date.today()
+        )
+    
     def detect_fund_type(self, fund_code: str, fund_name: str = "") -> FundType:
         """检测基金类型
         
         基于基金名称和代码简单判断
         """
-        name = fund_name.lower()
-        
-        if '货币' in name or '现金' in name:
-            return FundType.MONEY
-        elif '债' in name or '利率' in name or '信用' in name:
-            return FundType.BOND
-        elif '指数' in name or 'ETF' in name.upper() or '联接' in name:
-            return FundType.INDEX
-        elif 'QDII' in name.upper() or '海外' in name or '美国' in name or '港股' in name:
-            return FundType.QDII
-        elif '股票' in name or '成长' in name or '价值' in name:
-            return FundType.STOCK
-        elif '混合' in name or '平衡' in name or '配置' in name or '灵活' in name:
-            return FundType.HYBRID
-        else:
-            # 默认根据代码判断
-            if fund_code.startswith('5') or fund_code.startswith('1'):
-                return FundType.INDEX  # ETF
-            return FundType.HYBRID  # 默认混合
+        return _detect_fund_type(fund_code, fund_name)
+
+
+# 基金类型关键词（按判断优先级）
+_FUND_TYPE_KEYWORDS = (
+    (FundType.MONEY, ('货币', '现金')),
+    (FundType.BOND, ('债', '利率', '信用')),
+    (FundType.INDEX, ('指数', '联接', 'etf')),
+    (FundType.QDII, ('qdii', '海外', '美国', '港股')),
+    (FundType.STOCK, ('股票', '成长', '价值')),
+    (FundType.HYBRID, ('混合', '平衡', '配置', '灵活')),
+)
+_FUND_TYPE_PRIORITY = {
+    keyword: (priority, fund_type)
+    for priority, (fund_type, keywords) in enumerate(_FUND_TYPE_KEYWORDS)
+    for keyword in keywords
+}
+# 所有关键词合并为一个正则，一次扫描找出全部命中
+_FUND_TYPE_RE = re.compile('|'.join(map(re.escape, _FUND_TYPE_PRIORITY)))
+
+
+@lru_cache(maxsize=4096)
+def _detect_fund_type(fund_code: str, fund_name: str) -> FundType:
+    """按名称关键词和代码判断基金类型（同一基金结果固定，缓存复用）"""
+    hits = _FUND_TYPE_RE.findall(fund_name.lower())
+    if hits:
+        return min(_FUND_TYPE_PRIORITY[hit] for hit in hits)[1]
+    
+    # 默认根据代码判断
+    if fund_code.startswith('5') or fund_code.startswith('1'):
+        return FundType.INDEX  # ETF
+    return FundType.HYBRID  # 默认混合
 
 
 # 创建全局实例
@@ -0,0 +1,113 @@
+"""
+HTTP 会话模块
+
+各采集器共用的同步 HTTP 会话构造，保证连接复用和失败重试的配置一致
+"""
+import time
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# 每个主机保持的空闲长连接数 / 最大连接数
+MAX_KEEPALIVE_CONNECTIONS = 32
+MAX_CONNECTIONS = 64
+
+# 限流/服务端错误的重试配置，httpx 与 requests 两条路径保持一致
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+
+if httpx is not None:
+    class _RetryTransport(httpx.BaseTransport):
+        """
+        按状态码重试的 httpx 传输层
+
+        httpx.HTTPTransport 的 retries 只覆盖连接失败，这里补上与 urllib3 Retry
+        相同的 429/5xx 指数退避重试，优先遵循响应中的 Retry-After
+        """
+
+        def __init__(self, transport):
+            self._transport = transport
+
+        def handle_request(self, request):
+            for attempt in range(RETRY_TOTAL + 1):
+                response = self._transport.handle_request(request)
+                if response.status_code not in RETRY_STATUS_FORCELIST or attempt == RETRY_TOTAL:
+                    return response
+
+                retry_after = response.headers.get('Retry-After', '')
+                response.close()
+                if retry_after.isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = RETRY_BACKOFF_FACTOR * (2 ** attempt)
+                time.sleep(delay)
+
+        def close(self):
+            self._transport.close()
+
+
+def create_session(headers: Dict[str, str]):
+    """
+    创建 HTTP 会话
+
+    安装 httpx（含 h2）时返回 httpx.Client：HTTPS 请求走 HTTP/2，
+    多个并发请求复用同一条 TLS 连接；否则返回带连接池和自动重试的 requests.Session。
+    两者的 get(url, params=..., timeout=...) 及响应的 text/content/encoding 用法一致，
+    且都会对连接失败和 429/5xx 做退避重试
+
+    注意：HTTP/2 只在 HTTPS 上协商。天天基金的 fundgz/pingzhongdata/rankhandler 等
+    接口仍是 http://，对这些主机 httpx 依旧走 HTTP/1.1 长连接，收益仅限 HTTPS 主机
+    （如批量估值接口 fundmobapi）
+
+    Args:
+        headers: 默认请求头
+    """
+    if httpx is not None:
+        try:
+            transport = httpx.HTTPTransport(
+                http2=True,
+                retries=RETRY_TOTAL,
+                limits=httpx.Limits(
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    max_connections=MAX_CONNECTIONS
+                )
+            )
+        except ImportError:
+            # 未安装 h2 时 httpx 不支持 HTTP/2，继续使用 requests
+            transport = None
+
+        if transport is not None:
+            # HTTP/2 禁止携带 Connection 等逐跳头部，长连接由连接池管理
+            return httpx.Client(
+                headers={k: v for k, v in headers.items() if k.lower() != 'connection'},
+                transport=_RetryTransport(transport),
+                timeout=10.0,
+                follow_redirects=True
+            )
+
+    session = requests.Session()
+    session.headers.update(headers)
+
+    # 连接池复用 TCP 连接，避免每次请求重复握手；对限流/服务端错误自动重试
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=MAX_KEEPALIVE_CONNECTIONS,
+        max_retries=Retry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=list(RETRY_STATUS_FORCELIST)
+        )
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
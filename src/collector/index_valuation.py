@@ -1,14 +1,43 @@
 """
 指数估值数据采集模块
 """
+import threading
 import requests
 from datetime import date
-from typing import Optional, List, Dict
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple
 from loguru import logger
 
+from config.settings import json_loads
 from ..models import IndexValuation
 
 
+# 默认估值（API 失败时使用的保守值）: (代码, 名称, PE, PE分位, PB, PB分位, 股息率)
+_DEFAULT_VALUATIONS = (
+    ("000300", "沪深300", 12.5, 50, 1.4, 50, 2.5),
+    ("000905", "中证500", 22.0, 50, 1.8, 50, 1.5),
+    ("399006", "创业板指", 35.0, 50, 4.5, 50, 0.5),
+)
+
+
+@lru_cache(maxsize=1)
+def _default_valuations(today: date) -> tuple:
+    """构造默认估值（以当天日期为参数，跨天自动重新构造，同一天内不重复做模型校验）"""
+    return tuple(
+        IndexValuation(
+            index_code=code,
+            index_name=name,
+            pe=pe,
+            pe_percentile=pe_pct,
+            pb=pb,
+            pb_percentile=pb_pct,
+            dividend_yield=div,
+            update_date=today
+        )
+        for code, name, pe, pe_pct, pb, pb_pct, div in _DEFAULT_VALUATIONS
+    )
+
+
 class IndexValuationCollector:
     """指数估值数据采集器"""
     
@@ -49,60 +78,81 @@ class IndexValuationCollector:
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update(self.HEADERS)
-        # 缓存估值数据
-        self._valuation_cache: Dict[str, IndexValuation] = {}
-        self._cache_date: Optional[date] = None
+        # 当天的估值数据: (日期, {index_code: IndexValuation})，整体替换保证读到的是完整的一份
+        self._valuation_cache: Optional[Tuple[date, Dict[str, IndexValuation]]] = None
+        self._fetch_lock = threading.Lock()
     
-    def get_all_valuations(self) -> List[IndexValuation]:
-        """获取所有主要指数的估值数据"""
-        # 如果今日已缓存，直接返回
-        if self._cache_date == date.today() and self._valuation_cache:
-            return list(self._valuation_cache.values())
+    def _get_valuation_map(self) -> Dict[str, IndexValuation]:
+        """
+        获取当天的估值数据（每天只请求一次，线程安全）
+        
+        并发调用时只有一个线程请求接口，其余线程等待后直接复用结果；
+        请求失败时不缓存，下次调用重新请求
+        """
+        today = date.today()
+        cached = self._valuation_cache
+        if cached and cached[0] == today:
+            return cached[1]
         
+        with self._fetch_lock:
+            cached = self._valuation_cache
+            if cached and cached[0] == today:
+                return cached[1]
+            
+            valuations = self._fetch_valuations()
+            if valuations is None:
+                return {}
+            
+            valuation_map = {v.index_code: v for v in valuations}
+            self._valuation_cache = (today, valuation_map)
+            return valuation_map
+    
+    def _fetch_valuations(self) -> Optional[List[IndexValuation]]:
+        """从接口获取所有指数估值，失败时返回 None"""
         try:
             response = self.session.get(self.DANJUAN_API, timeout=10)
-            data = response.json()
+            data = json_loads(response.content)
             
-            if data.get("result_code") == 0:
-                items = data.get("data", {}).get("items", [])
-                valuations = []
-                
-                for item in items:
-                    try:
-                        valuation = IndexValuation(
-                            index_code=item.get("index_code", ""),
-                            index_name=item.get("name", ""),
-                            pe=float(item.get("pe", 0)),
-                            pe_percentile=float(item.get("pe_percentile", 50)),
-                            pb=float(item.get("pb", 0)),
-                            pb_percentile=float(item.get("pb_percentile", 50)),
-                            dividend_yield=float(item.get("yeild", 0)) if item.get("yeild") else None,
-                            update_date=date.today()
-                        )
-                        valuations.append(valuation)
-                        self._valuation_cache[valuation.index_code] = valuation
-                    except Exception as e:
-                        logger.warning(f"解析指数估值数据失败: {e}")
-                        continue
-                
-                self._cache_date = date.today()
-                logger.info(f"成功获取 {len(valuations)} 个指数估值数据")
-                return valuations
-            else:
+            if data.get("result_code") != 0:
                 logger.warning("获取指数估值数据失败，使用默认估值")
-                return self._get_default_valuations()
-                
+                return None
+            
+            items = data.get("data", {}).get("items", [])
+            valuations = []
+            today = date.today()
+            
+            for item in items:
+                try:
+                    valuations.append(IndexValuation(
+                        index_code=item.get("index_code", ""),
+                        index_name=item.get("name", ""),
+                        pe=float(item.get("pe", 0)),
+                        pe_percentile=float(item.get("pe_percentile", 50)),
+                        pb=float(item.get("pb", 0)),
+                        pb_percentile=float(item.get("pb_percentile", 50)),
+                        dividend_yield=float(item.get("yeild", 0)) if item.get("yeild") else None,
+                        update_date=today
+                    ))
+                except Exception as e:
+                    logger.warning(f"解析指数估值数据失败: {e}")
+                    continue
+            
+            logger.info(f"成功获取 {len(valuations)} 个指数估值数据")
+            return valuations
         except Exception as e:
             logger.error(f"获取指数估值失败: {e}")
+            return None
+    
+    def get_all_valuations(self) -> List[IndexValuation]:
+        """获取所有主要指数的估值数据（当天已获取过时直接返回缓存）"""
+        valuation_map = self._get_valuation_map()
+        if not valuation_map:
             return self._get_default_valuations()
+        return list(valuation_map.values())
     
     def get_valuation(self, index_code: str) -> Optional[IndexValuation]:
         """获取单个指数的估值"""
-        # 确保缓存已更新
-        if self._cache_date != date.today():
-            self.get_all_valuations()
-        
-        return self._valuation_cache.get(index_code)
+        return self._get_valuation_map().get(index_code)
     
     def get_hs300_valuation(self) -> Optional[IndexValuation]:
         """获取沪深300估值（常用）"""
@@ -113,10 +163,10 @@ class IndexValuationCollector:
         
         基于沪深300、中证500的综合判断
         """
-        self.get_all_valuations()
+        valuation_map = self._get_valuation_map()
         
-        hs300 = self._valuation_cache.get("000300")
-        zz500 = self._valuation_cache.get("000905")
+        hs300 = valuation_map.get("000300")
+        zz500 = valuation_map.get("000905")
         
         if not hs300 and not zz500:
             return {
@@ -162,31 +212,11 @@ class IndexValuationCollector:
     
     def _get_default_valuations(self) -> List[IndexValuation]:
         """返回默认估值数据（当API失败时）"""
-        # 提供一些保守的默认值
-        defaults = [
-            ("000300", "沪深300", 12.5, 50, 1.4, 50, 2.5),
-            ("000905", "中证500", 22.0, 50, 1.8, 50, 1.5),
-            ("399006", "创业板指", 35.0, 50, 4.5, 50, 0.5),
-        ]
-        
-        valuations = []
-        for code, name, pe, pe_pct, pb, pb_pct, div in defaults:
-            valuations.append(IndexValuation(
-                index_code=code,
-                index_name=name,
-                pe=pe,
-                pe_percentile=pe_pct,
-                pb=pb,
-                pb_percentile=pb_pct,
-                dividend_yield=div,
-                update_date=date.today()
-            ))
-        
-        return valuations
+        return list(_default_valuations(date.today()))
     
     def get_sector_valuations(self) -> Dict[str, IndexValuation]:
         """获取行业指数估值"""
-        self.get_all_valuations()
+        valuation_map = self._get_valuation_map()
         
         sector_codes = [
             "000991",  # 医药
@@ -198,9 +228,9 @@ class IndexValuationCollector:
         ]
         
         return {
-            code: self._valuation_cache[code]
+            code: valuation_map[code]
             for code in sector_codes
-            if code in self._valuation_cache
+            if code in valuation_map
         }
 
 
@@ -0,0 +1,93 @@
+"""
+JS 变量解析模块
+
+天天基金的 pingzhongdata/{code}.js 等接口以一串 `var name = value;` 语句返回数据，
+这里单次扫描提取需要的变量，避免对整段文本逐个变量跑正则
+"""
+import re
+from typing import Dict, Iterable, Optional, Pattern
+
+# 变量声明的开头: var name =
+_RE_VAR_DECL = re.compile(r'var\s+(\w+)\s*=\s*')
+
+# 分块读取大文件时的块大小，以及定位到变量后最多缓冲的长度
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_MAX_VALUE_SIZE = 200_000
+
+
+def extract_js_vars(content: str, names: Iterable[str]) -> Dict[str, str]:
+    """
+    提取指定变量的原始值文本
+
+    - 字符串值返回引号内的内容
+    - 数组/对象值返回包含括号的原文（截到第一个 `];` / `};`），由调用方按 JSON 解析
+    - 其他值（数字、布尔等）截到分号
+    同名变量只取第一次出现的值
+
+    Args:
+        content: JS 文本
+        names: 需要的变量名
+
+    Returns:
+        {变量名: 原始值文本}，未找到的变量不在结果中
+    """
+    wanted = set(names)
+    result = {}
+
+    for match in _RE_VAR_DECL.finditer(content):
+        name = match.group(1)
+        if name not in wanted or name in result:
+            continue
+
+        start = match.end()
+        first = content[start:start + 1]
+        if first == '"':
+            end = content.find('";', start + 1)
+            value = content[start + 1:end]
+        elif first in ('[', '{'):
+            end = content.find('];' if first == '[' else '};', start)
+            value = content[start:end + 1]
+        else:
+            end = content.find(';', start)
+            value = content[start:end].strip()
+
+        if end < 0:
+            continue
+        result[name] = value
+        if len(result) == len(wanted):
+            break
+
+    return result
+
+
+def stream_match(path: str, marker: bytes, pattern: Pattern) -> Optional[re.Match]:
+    """
+    分块读取文件，定位到变量后只在局部缓冲区内做正则匹配，峰值内存与文件大小无关
+
+    Args:
+        path: 文件路径
+        marker: 变量声明的开头，如 b'var Data_currentFundManager'
+        pattern: 从 marker 处开始匹配的 bytes 正则
+
+    Returns:
+        匹配结果，未找到或变量值超过 STREAM_MAX_VALUE_SIZE 时返回 None
+    """
+    buf = b''
+    found = False
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            buf += chunk
+            if not found:
+                idx = buf.find(marker)
+                if idx < 0:
+                    # 只保留末尾可能被截断的标记前缀
+                    buf = buf[-(len(marker) - 1):]
+                    continue
+                buf = buf[idx:]
+                found = True
+            match = pattern.match(buf)
+            if match:
+                return match
+            if len(buf) > STREAM_MAX_VALUE_SIZE:
+                return None
+    return None
@@ -0,0 +1,53 @@
+"""
+请求限流模块
+
+各采集器共用的令牌桶限流器，同步和异步请求共享同一个配额
+"""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶限流器（线程安全）
+
+    平均每秒放行 rate 个请求，空闲一段时间后最多允许 burst 个请求连续放行。
+    令牌不足时先预支令牌、在锁外等待，等待期间不阻塞其他线程/协程申请
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: 每秒放行的请求数，<= 0 表示不限流
+            burst: 突发请求上限（桶容量）
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预支一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._last_refill) * self.rate
+            self._tokens = min(self.burst, self._tokens + refill) - 1
+            self._last_refill = now
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """同步获取令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """异步获取令牌，等待期间让出事件循环"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
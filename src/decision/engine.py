@@ -73,37 +73,78 @@ class DecisionEngine:
         )
         result["market_analysis"] = market_analysis
         
-        # 4. 分析现有持仓
-        logger.info("分析现有持仓...")
-        for position in self.portfolio.positions:
-            suggestion = self._analyze_position(position, market_analysis, market_summary)
+        # 持仓和关注列表的估值、详情页一次批量获取，后续逐只分析时命中缓存
+        codes = [p.fund_code for p in self.portfolio.positions]
+        codes += [
+            f.get("code") if isinstance(f, dict) else f
+            for f in (watch_list or [])
+        ]
+        fund_collector.get_fund_estimates_bulk(codes)
+        fund_collector.batch_get_fund_details(codes)
+        
+        # 4. 准备持仓和关注列表（潜在买入）的数据
+        logger.info("分析现有持仓和关注列表...")
+        positions = list(self.portfolio.positions)
+        score_items = [self._prepare_position(position) for position in positions]
+        
+        candidate_prices = []
+        for fund_info in watch_list or []:
+            code = fund_info.get("code") or fund_info
+            name = fund_info.get("name", code) if isinstance(fund_info, dict) else code
             
-            # 分类建议
-            if suggestion.signal == SignalType.SELL:
-                result["suggestions"]["sell"].append(suggestion.model_dump())
-            elif suggestion.signal == SignalType.HOLD:
-                result["suggestions"]["hold"].append(suggestion.model_dump())
-        
-        # 5. 分析关注列表（潜在买入）
-        if watch_list:
-            logger.info("分析关注列表...")
-            for fund_info in watch_list:
-                code = fund_info.get("code") or fund_info
-                name = fund_info.get("name", code) if isinstance(fund_info, dict) else code
-                
-                # 跳过已持有的
-                if self.portfolio.get_position(code):
-                    continue
-                
-                suggestion = self._analyze_fund_for_buy(
-                    code, name, market_analysis, market_summary
+            # 跳过已持有的
+            if self.portfolio.get_position(code):
+                continue
+            
+            candidate = self._prepare_buy_candidate(code, name)
+            if candidate:
+                score_items.append(candidate[0])
+                candidate_prices.append(candidate[1])
+        
+        # 5. AI评分和交易建议各合并为一批并发请求
+        scores = ai_advisor.analyze_funds_batch(score_items)
+        
+        suggestions = []  # 与 score_items 顺序一致，None 表示等待AI生成
+        trade_items = []
+        for i, (item, fund_score) in enumerate(zip(score_items, scores)):
+            if i < len(positions):
+                position = positions[i]
+                suggestion = self._check_exit_conditions(position, fund_score)
+                current_price = position.current_price
+            else:
+                suggestion = self._check_buy_threshold(
+                    item["fund_code"], item["fund_name"], fund_score
+                )
+                current_price = candidate_prices[i - len(positions)]
+            
+            if suggestion is None:
+                trade_items.append({
+                    "fund_code": item["fund_code"],
+                    "fund_name": item["fund_name"],
+                    "fund_score": fund_score,
+                    "current_price": current_price
+                })
+            suggestions.append(suggestion)
+        
+        generated = iter(ai_advisor.generate_trade_suggestions_batch(
+            self.portfolio, trade_items, market_analysis
+        ))
+        suggestions = [s if s is not None else next(generated) for s in suggestions]
+        
+        # 分类建议
+        for i, suggestion in enumerate(suggestions):
+            if i < len(positions):
+                if suggestion.signal == SignalType.SELL:
+                    result["suggestions"]["sell"].append(suggestion.model_dump())
+                elif suggestion.signal == SignalType.HOLD:
+                    result["suggestions"]["hold"].append(suggestion.model_dump())
+            elif suggestion.signal == SignalType.BUY:
+                suggestion.suggested_amount = self._suggested_buy_amount(
+                    suggestion.fund_code, scores[i]
                 )
-                
-                if suggestion:
-                    if suggestion.signal == SignalType.BUY:
-                        result["suggestions"]["buy"].append(suggestion.model_dump())
-                    else:
-                        result["suggestions"]["watch"].append(suggestion.model_dump())
+                result["suggestions"]["buy"].append(suggestion.model_dump())
+            else:
+                result["suggestions"]["watch"].append(suggestion.model_dump())
         
         # 6. 组合健康检查
         health = self.risk_controller.check_portfolio_health()
@@ -118,31 +159,25 @@ class DecisionEngine:
         logger.info("每日分析完成")
         return result
     
-    def _analyze_position(
-        self,
-        position,
-        market_analysis: Dict,
-        market_summary: MarketSummary
-    ) -> TradeSuggestion:
-        """分析单个持仓"""
-        
-        # 获取最新净值
+    def _prepare_position(self, position) -> Dict:
+        """更新持仓的最新净值，返回AI评分所需的参数"""
         nav_data = fund_collector.get_fund_estimate(position.fund_code)
         if nav_data:
             position.update_price(nav_data.nav)
         
-        # 获取业绩数据
-        performance = fund_collector.get_fund_performance(position.fund_code)
-        
-        # AI评分
-        fund_score = ai_advisor.analyze_fund(
-            position.fund_code,
-            position.fund_name,
-            performance or {},
-            fund_collector.get_fund_detail(position.fund_code)
-        )
-        
-        # 检查止盈止损条件
+        return {
+            "fund_code": position.fund_code,
+            "fund_name": position.fund_name,
+            "performance": fund_collector.get_fund_performance(position.fund_code) or {},
+            "fund_detail": fund_collector.get_fund_detail(position.fund_code)
+        }
+    
+    def _check_exit_conditions(
+        self,
+        position,
+        fund_score: FundScore
+    ) -> Optional[TradeSuggestion]:
+        """检查止盈止损条件，触发时直接返回卖出建议"""
         take_profit_threshold = settings.RiskControl.TAKE_PROFIT_THRESHOLDS.get(
             position.fund_type.value, 0.20
         )
@@ -179,6 +214,24 @@ class DecisionEngine:
                 score=fund_score
             )
         
+        return None
+    
+    def _analyze_position(
+        self,
+        position,
+        market_analysis: Dict,
+        market_summary: MarketSummary
+    ) -> TradeSuggestion:
+        """分析单个持仓"""
+        
+        # AI评分
+        fund_score = ai_advisor.analyze_fund(**self._prepare_position(position))
+        
+        # 检查止盈止损条件
+        suggestion = self._check_exit_conditions(position, fund_score)
+        if suggestion:
+            return suggestion
+        
         # 生成AI建议
         suggestion = ai_advisor.generate_trade_suggestion(
             self.portfolio,
@@ -191,16 +244,17 @@ class DecisionEngine:
         
         return suggestion
     
-    def _analyze_fund_for_buy(
+    def _prepare_buy_candidate(
         self,
         fund_code: str,
-        fund_name: str,
-        market_analysis: Dict,
-        market_summary: MarketSummary
-    ) -> Optional[TradeSuggestion]:
-        """分析是否应该买入某基金"""
+        fund_name: str
+    ) -> Optional[Tuple[Dict, float]]:
+        """
+        获取潜在买入基金的数据
         
-        # 获取基金数据
+        Returns:
+            (AI评分所需的参数, 最新净值)，数据不全时返回 None
+        """
         nav_data = fund_collector.get_fund_estimate(fund_code)
         if not nav_data:
             logger.warning(f"无法获取基金 {fund_code} 的净值数据")
@@ -211,29 +265,35 @@ class DecisionEngine:
             logger.warning(f"无法获取基金 {fund_code} 的业绩数据")
             return None
         
-        fund_detail = fund_collector.get_fund_detail(fund_code)
-        
-        # AI评分
-        fund_score = ai_advisor.analyze_fund(
-            fund_code,
-            nav_data.name or fund_name,
-            performance,
-            fund_detail
-        )
-        
-        # 检查评分是否达到买入标准
+        item = {
+            "fund_code": fund_code,
+            "fund_name": nav_data.name or fund_name,
+            "performance": performance,
+            "fund_detail": fund_collector.get_fund_detail(fund_code)
+        }
+        return item, nav_data.nav
+    
+    def _check_buy_threshold(
+        self,
+        fund_code: str,
+        fund_name: str,
+        fund_score: FundScore
+    ) -> Optional[TradeSuggestion]:
+        """评分未达到买入标准时返回观望建议"""
         if fund_score.total_score < self.scoring_config.BUY_THRESHOLD:
             return TradeSuggestion(
                 fund_code=fund_code,
-                fund_name=nav_data.name or fund_name,
+                fund_name=fund_name,
                 signal=SignalType.WATCH,
                 confidence=ConfidenceLevel.LOW,
                 reasons=[f"综合评分{fund_score.total_score:.1f}分，未达到{self.scoring_config.BUY_THRESHOLD}分买入标准"],
                 risk_warnings=[],
                 score=fund_score
             )
-        
-        # 计算建议买入金额
+        return None
+    
+    def _suggested_buy_amount(self, fund_code: str, fund_score: FundScore) -> float:
+        """根据评分和市场估值计算建议买入金额"""
         market_pe = 50  # 默认
         hs300 = valuation_collector.get_hs300_valuation()
         if hs300:
@@ -246,21 +306,44 @@ class DecisionEngine:
         market_ratio = 1.0 - (market_pe / 100)  # PE越低买越多
         
         suggested_amount = max_amount * score_ratio * market_ratio * 0.5  # 保守起见再减半
-        suggested_amount = max(1000, min(suggested_amount, max_amount))  # 至少1000，不超过上限
+        return max(1000, min(suggested_amount, max_amount))  # 至少1000，不超过上限
+    
+    def _analyze_fund_for_buy(
+        self,
+        fund_code: str,
+        fund_name: str,
+        market_analysis: Dict,
+        market_summary: MarketSummary
+    ) -> Optional[TradeSuggestion]:
+        """分析是否应该买入某基金"""
+        
+        # 获取基金数据
+        candidate = self._prepare_buy_candidate(fund_code, fund_name)
+        if candidate is None:
+            return None
+        item, nav = candidate
+        
+        # AI评分
+        fund_score = ai_advisor.analyze_fund(**item)
+        
+        # 检查评分是否达到买入标准
+        suggestion = self._check_buy_threshold(fund_code, item["fund_name"], fund_score)
+        if suggestion:
+            return suggestion
         
         # 生成AI建议
         suggestion = ai_advisor.generate_trade_suggestion(
             self.portfolio,
             fund_code,
-            nav_data.name or fund_name,
+            item["fund_name"],
             fund_score,
-            nav_data.nav,
+            nav,
             market_analysis
         )
         
         # 更新建议金额
         if suggestion.signal == SignalType.BUY:
-            suggestion.suggested_amount = suggested_amount
+            suggestion.suggested_amount = self._suggested_buy_amount(fund_code, fund_score)
         
         return suggestion
     
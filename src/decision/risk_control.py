@@ -5,7 +5,7 @@ from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from loguru import logger
 
-from config.settings import settings
+from config.settings import settings, position_cap
 from ..models import Portfolio, TradeSuggestion, SignalType, ConfidenceLevel, MarketSummary
 
 
@@ -236,10 +236,7 @@ class RiskController:
     
     def _get_max_position_by_valuation(self, pe_percentile: float) -> float:
         """根据估值百分位获取最大仓位"""
-        for threshold, max_pos in sorted(self.config.VALUATION_POSITION_MAP.items()):
-            if pe_percentile < threshold:
-                return max_pos
-        return 0.20  # 默认最保守
+        return position_cap(pe_percentile)
     
     def _trigger_circuit_breaker(self, reason: str, hours: int = 24):
         """触发熔断"""
@@ -3,12 +3,12 @@
 
 包含因子计算、评分模型、预筛选规则等
 """
-from .factors import FactorCalculator, factor_calculator
+from .factors import FactorCalculator, KeyFactors, factor_calculator
 from .scoring_model import ScoringModel, scoring_model
 from .prefilter import PreFilter, pre_filter
 
 __all__ = [
-    'FactorCalculator', 'factor_calculator',
+    'FactorCalculator', 'KeyFactors', 'factor_calculator',
     'ScoringModel', 'scoring_model',
     'PreFilter', 'pre_filter',
 ]
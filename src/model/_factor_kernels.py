@@ -0,0 +1,72 @@
+"""
+因子计算内核
+
+滚动窗口等循环密集的计算，安装 numba 时使用 JIT 编译版本，
+否则退回 NumPy 向量化实现
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _rolling_beta_numpy(fund_returns: np.ndarray, bench_returns: np.ndarray, window: int) -> np.ndarray:
+    """滚动 Beta（NumPy 实现）"""
+    count = len(fund_returns) - window
+    if count <= 0:
+        return np.empty(0)
+
+    f_win = sliding_window_view(fund_returns, window)[:count]
+    b_win = sliding_window_view(bench_returns, window)[:count]
+
+    f_dev = f_win - f_win.mean(axis=1, keepdims=True)
+    b_dev = b_win - b_win.mean(axis=1, keepdims=True)
+
+    # 协方差取样本口径(ddof=1)，方差取总体口径(ddof=0)，与 np.cov / np.var 一致
+    cov = (f_dev * b_dev).sum(axis=1) / (window - 1)
+    var = (b_dev * b_dev).mean(axis=1)
+
+    valid = var > 0
+    return cov[valid] / var[valid]
+
+
+def _rolling_beta_loop(fund_returns: np.ndarray, bench_returns: np.ndarray, window: int) -> np.ndarray:
+    """滚动 Beta（逐窗口循环，供 numba 编译）"""
+    count = len(fund_returns) - window
+    if count <= 0:
+        return np.empty(0)
+
+    betas = np.empty(count)
+    n_valid = 0
+    for start in range(count):
+        f_mean = 0.0
+        b_mean = 0.0
+        for i in range(start, start + window):
+            f_mean += fund_returns[i]
+            b_mean += bench_returns[i]
+        f_mean /= window
+        b_mean /= window
+
+        cov = 0.0
+        var = 0.0
+        for i in range(start, start + window):
+            b_dev = bench_returns[i] - b_mean
+            cov += (fund_returns[i] - f_mean) * b_dev
+            var += b_dev * b_dev
+        cov /= window - 1
+        var /= window
+
+        if var > 0:
+            betas[n_valid] = cov / var
+            n_valid += 1
+
+    return betas[:n_valid]
+
+
+if njit is not None:
+    rolling_beta = njit(cache=True)(_rolling_beta_loop)
+else:
+    rolling_beta = _rolling_beta_numpy
@@ -10,6 +10,7 @@
 - 基金经理因子
 - 风格稳定性因子
 """
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
@@ -18,6 +19,28 @@ import pandas as pd
 from loguru import logger
 
 from ..processor.fund_processor import FundDataProcessor
+from ._factor_kernels import rolling_beta
+
+
+@dataclass(frozen=True, slots=True)
+class KeyFactors:
+    """
+    核心因子的只读视图
+    
+    因子字典的键随可用数据变化，评分按因子名查字典；
+    展示和建议生成反复读取的固定几项在这里一次性取出，缺失按 0 处理
+    """
+    return_1y: float = 0.0
+    max_drawdown: float = 0.0
+    sharpe_ratio: float = 0.0
+    volatility: float = 0.0
+    manager_tenure: float = 0.0
+    scale: float = 0.0
+    
+    @classmethod
+    def from_factors(cls, factors: Dict[str, float]) -> 'KeyFactors':
+        """从因子字典构建"""
+        return cls(*(factors.get(f.name, 0) for f in fields(cls)))
 
 
 class FactorCalculator:
@@ -103,12 +126,14 @@ class FactorCalculator:
         
         # 计算下行风险
         if not processed_nav.empty and len(processed_nav) >= 30:
-            df = processed_nav.copy().sort_values('date')
-            df['daily_return'] = df['nav'].pct_change()
+            nav = processed_nav['nav'].to_numpy(dtype=np.float64)
+            daily_returns = np.diff(nav) / nav[:-1]
             
-            negative_returns = df['daily_return'][df['daily_return'] < 0].dropna()
+            negative_returns = daily_returns[daily_returns < 0]
             if len(negative_returns) > 0:
-                downside_volatility = negative_returns.std() * np.sqrt(250)
+                downside_volatility = (
+                    negative_returns.std(ddof=1) if len(negative_returns) > 1 else np.nan
+                ) * np.sqrt(250)
                 factors['downside_volatility'] = downside_volatility * 100
             else:
                 factors['downside_volatility'] = 0
@@ -266,13 +291,13 @@ class FactorCalculator:
         if processed_nav.empty:
             return {}
         
-        df = processed_nav.copy().sort_values('date')
+        nav = processed_nav.sort_values('date')['nav'].to_numpy(dtype=np.float64)
         factors = {}
         
         for period in lookback_periods:
-            if len(df) >= period:
-                start_nav = df['nav'].iloc[-period]
-                end_nav = df['nav'].iloc[-1]
+            if len(nav) >= period:
+                start_nav = nav[-period]
+                end_nav = nav[-1]
                 
                 if start_nav > 0:
                     momentum = (end_nav / start_nav - 1) * 100
@@ -458,17 +483,11 @@ class FactorCalculator:
         bench_returns = merged['nav_bench'].pct_change().dropna()
         
         # 计算滚动 Beta
-        betas = []
-        for i in range(window, len(fund_returns)):
-            f_ret = fund_returns.iloc[i-window:i]
-            b_ret = bench_returns.iloc[i-window:i]
-            
-            cov = np.cov(f_ret, b_ret)[0][1]
-            var = np.var(b_ret)
-            
-            if var > 0:
-                beta = cov / var
-                betas.append(beta)
+        betas = rolling_beta(
+            fund_returns.to_numpy(dtype=np.float64),
+            bench_returns.to_numpy(dtype=np.float64),
+            window
+        )
         
         if len(betas) < 2:
             return 100
@@ -550,7 +569,7 @@ class FactorCalculator:
                 top10_concentration = ratios.nlargest(10).sum()
                 factors['concentration'] = top10_concentration
         except Exception as e:
-            logger.debug(f"计算持仓集中度失败: {e}")
+            logger.debug("计算持仓集中度失败: {}", e)
             
         return factors
 
@@ -626,6 +645,68 @@ class FactorCalculator:
         
         return all_factors
 
+    def calculate_all_factors_batch(
+        self,
+        nav_dict: Dict[str, pd.DataFrame],
+        benchmark_data: pd.DataFrame = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        批量计算多只基金的净值类因子
+        
+        风险及风险调整收益因子按列向量化计算，其余因子逐只计算
+        
+        Args:
+            nav_dict: {fund_code: 净值数据}
+            benchmark_data: 基准数据
+            
+        Returns:
+            {fund_code: 因子字典}
+        """
+        processed = {
+            code: self.processor.process_nav_data(nav_data)
+            for code, nav_data in nav_dict.items()
+            if nav_data is not None and not nav_data.empty
+        }
+        risk_df = self.processor.calculate_risk_metrics_batch(processed)
+        
+        results = {}
+        for code, processed_nav in processed.items():
+            metrics = risk_df.loc[code].to_dict() if code in risk_df.index else {}
+            
+            factors = {
+                f'return_{period}': ret
+                for period, ret in self.processor.calculate_returns(processed_nav).items()
+            }
+            
+            # 风险因子
+            factors['volatility'] = metrics.get('volatility', 0)
+            factors['max_drawdown'] = metrics.get('max_drawdown', 0)
+            if 'downside_volatility' in metrics:
+                factors['downside_volatility'] = metrics['downside_volatility']
+            
+            # 风险调整收益因子
+            factors['sharpe_ratio'] = metrics.get('sharpe_ratio', 0)
+            factors['sortino_ratio'] = metrics.get('sortino_ratio', 0)
+            factors['calmar_ratio'] = metrics.get('calmar_ratio', 0)
+            
+            if benchmark_data is not None and not benchmark_data.empty:
+                factors['information_ratio'] = self._calculate_information_ratio(
+                    processed_nav, benchmark_data
+                )
+                alpha, beta = self.processor.calculate_alpha_beta(processed_nav, benchmark_data)
+                factors['alpha'] = alpha
+                factors['beta'] = beta
+            
+            # 动量因子
+            factors.update(self.calculate_momentum_factors(processed_nav))
+            
+            # 风格稳定性因子
+            factors.update(self.calculate_style_stability(None, processed_nav, benchmark_data))
+            
+            results[code] = factors
+        
+        return results
+
 
 # 创建全局实例
 factor_calculator = FactorCalculator()
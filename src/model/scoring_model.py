@@ -3,6 +3,7 @@
 
 基于多因子加权计算基金综合得分
 """
+from bisect import bisect_right
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
@@ -10,6 +11,21 @@ import numpy as np
 import pandas as pd
 from loguru import logger
 
+from .factors import KeyFactors
+
+# 评分等级表：得分 >= 阈值 即达到对应等级（升序）
+_GRADE_THRESHOLDS = (50, 60, 70, 80)
+_GRADES = ('E', 'D', 'C', 'B', 'A')
+
+# 各等级对应的操作建议及理由
+_GRADE_ACTIONS = {
+    'A': ('强烈推荐', '综合评分优秀，各项指标表现出色'),
+    'B': ('推荐', '综合评分良好，适合配置'),
+    'C': ('可考虑', '综合评分中等，可作为补充配置'),
+    'D': ('谨慎', '综合评分偏低，需谨慎考虑'),
+    'E': ('不推荐', '综合评分较差，不建议投资'),
+}
+
 
 @dataclass
 class FactorWeight:
@@ -115,6 +131,17 @@ class ScoringModel:
             config: 评分配置
         """
         self.config = config or ScoringConfig()
+        
+        # 权重在模型生命周期内固定，预先展开成元组，评分时不再逐次读取配置
+        self._categories = (
+            ('return', self.config.return_weight, tuple(self.config.return_factors)),
+            ('risk', self.config.risk_weight, tuple(self.config.risk_factors)),
+            ('risk_adjusted', self.config.risk_adjusted_weight, tuple(self.config.risk_adjusted_factors)),
+            ('scale', self.config.scale_weight, tuple(self.config.scale_factors)),
+            ('manager', self.config.manager_weight, tuple(self.config.manager_factors)),
+            ('style', self.config.style_weight, tuple(self.config.style_factors)),
+        )
+        self._total_weight = sum(cat_weight for _, cat_weight, _ in self._categories)
     
     def calculate_category_score(
         self, 
@@ -170,28 +197,17 @@ class ScoringModel:
         }
         
         # 计算各类别得分
-        categories = [
-            ('return', self.config.return_weight, self.config.return_factors),
-            ('risk', self.config.risk_weight, self.config.risk_factors),
-            ('risk_adjusted', self.config.risk_adjusted_weight, self.config.risk_adjusted_factors),
-            ('scale', self.config.scale_weight, self.config.scale_factors),
-            ('manager', self.config.manager_weight, self.config.manager_factors),
-            ('style', self.config.style_weight, self.config.style_factors),
-        ]
-        
-        total_weight = 0
         weighted_sum = 0
         
-        for cat_name, cat_weight, factor_weights in categories:
+        for cat_name, cat_weight, factor_weights in self._categories:
             cat_score, cat_details = self.calculate_category_score(factors, factor_weights)
             result['category_scores'][cat_name] = cat_score
             result['factor_details'][cat_name] = cat_details
             
             weighted_sum += cat_score * cat_weight
-            total_weight += cat_weight
         
-        if total_weight > 0:
-            result['total_score'] = weighted_sum / total_weight
+        if self._total_weight > 0:
+            result['total_score'] = weighted_sum / self._total_weight
         
         return result
     
@@ -208,28 +224,79 @@ class ScoringModel:
         Returns:
             评分结果 DataFrame
         """
-        results = []
+        if not funds_factors:
+            return pd.DataFrame()
+        
+        # 按因子列向量化：每个因子一次性归一化所有基金，类别内/类别间按权重加权
+        factors_list = list(funds_factors.values())
+        df = pd.DataFrame({'fund_code': list(funds_factors)})
+        
+        weighted_total = 0
+        for cat_name, cat_weight, factor_weights in self._categories:
+            cat_score = self._batch_category_score(factors_list, factor_weights)
+            df[f'{cat_name}_score'] = cat_score
+            weighted_total = weighted_total + cat_score * cat_weight
+        
+        df.insert(
+            1, 'total_score',
+            weighted_total / self._total_weight if self._total_weight > 0 else 0
+        )
+        
+        df = df.sort_values('total_score', ascending=False).reset_index(drop=True)
+        df['rank'] = range(1, len(df) + 1)
+        
+        return df
+    
+    @staticmethod
+    def _batch_category_score(
+        factors_list: List[Dict[str, float]],
+        factor_weights: Tuple[FactorWeight, ...]
+    ) -> np.ndarray:
+        """
+        批量计算单个类别的得分（口径与 calculate_category_score 一致）
         
-        for fund_code, factors in funds_factors.items():
-            score_result = self.calculate_total_score(factors)
+        Args:
+            factors_list: 各基金的因子字典
+            factor_weights: 因子权重列表
             
-            row = {
-                'fund_code': fund_code,
-                'total_score': score_result['total_score'],
-            }
+        Returns:
+            各基金的类别得分数组
+        """
+        n = len(factors_list)
+        weighted_sum = np.zeros(n)
+        total_weight = np.zeros(n)
+        
+        for fw in factor_weights:
+            present = np.fromiter((fw.name in f for f in factors_list), dtype=bool, count=n)
+            if not present.any():
+                continue
+            # None / pd.NA / 非数值统一转为 NaN，与 normalize 一样按缺失值给中性分
+            values = pd.to_numeric(
+                pd.Series([f.get(fw.name) for f in factors_list], dtype=object), errors='coerce'
+            ).to_numpy(np.float64)
             
-            # 添加类别得分
-            for cat_name, cat_score in score_result['category_scores'].items():
-                row[f'{cat_name}_score'] = cat_score
+            if fw.min_value is not None and fw.max_value is not None:
+                if fw.max_value == fw.min_value:
+                    normalized = np.full(n, 50.0)
+                else:
+                    normalized = (values - fw.min_value) / (fw.max_value - fw.min_value) * 100
+                    normalized = np.clip(normalized, 0, 100)
+                    if not fw.higher_is_better:
+                        normalized = 100 - normalized
+            elif fw.higher_is_better:
+                normalized = np.clip(values, 0, 100)
+            else:
+                normalized = np.clip(100 - values, 0, 100)
             
-            results.append(row)
-        
-        df = pd.DataFrame(results)
-        if not df.empty:
-            df = df.sort_values('total_score', ascending=False).reset_index(drop=True)
-            df['rank'] = range(1, len(df) + 1)
+            normalized = np.where(np.isnan(values), 50, normalized)  # 缺失值给中性分
+            
+            weighted_sum += np.where(present, normalized * fw.weight, 0.0)
+            total_weight += np.where(present, fw.weight, 0.0)
         
-        return df
+        has_weight = total_weight > 0
+        return np.where(
+            has_weight, weighted_sum / np.where(has_weight, total_weight, 1), 50
+        )
     
     def get_score_grade(self, score: float) -> str:
         """
@@ -241,16 +308,9 @@ class ScoringModel:
         Returns:
             评分等级 (A/B/C/D/E)
         """
-        if score >= 80:
-            return 'A'
-        elif score >= 70:
-            return 'B'
-        elif score >= 60:
-            return 'C'
-        elif score >= 50:
-            return 'D'
-        else:
-            return 'E'
+        if not score >= _GRADE_THRESHOLDS[0]:  # 含 NaN
+            return _GRADES[0]
+        return _GRADES[bisect_right(_GRADE_THRESHOLDS, score)]
     
     def get_recommendation(self, score: float, factors: Dict[str, float]) -> Dict:
         """
@@ -274,55 +334,44 @@ class ScoringModel:
         }
         
         # 根据等级给出建议
-        if grade == 'A':
-            recommendation['action'] = '强烈推荐'
-            recommendation['reasons'].append('综合评分优秀，各项指标表现出色')
-        elif grade == 'B':
-            recommendation['action'] = '推荐'
-            recommendation['reasons'].append('综合评分良好，适合配置')
-        elif grade == 'C':
-            recommendation['action'] = '可考虑'
-            recommendation['reasons'].append('综合评分中等，可作为补充配置')
-        elif grade == 'D':
-            recommendation['action'] = '谨慎'
-            recommendation['reasons'].append('综合评分偏低，需谨慎考虑')
-        else:
-            recommendation['action'] = '不推荐'
-            recommendation['reasons'].append('综合评分较差，不建议投资')
+        action, reason = _GRADE_ACTIONS[grade]
+        recommendation['action'] = action
+        recommendation['reasons'].append(reason)
         
         # 分析具体因子，添加详细建议
         # 收益分析
-        return_1y = factors.get('return_1y', 0)
+        key = KeyFactors.from_factors(factors)
+        return_1y = key.return_1y
         if return_1y > 30:
             recommendation['reasons'].append(f'近一年收益优秀 ({return_1y:.1f}%)')
         elif return_1y < 0:
             recommendation['risks'].append(f'近一年收益为负 ({return_1y:.1f}%)')
         
         # 风险分析
-        max_dd = factors.get('max_drawdown', 0)
+        max_dd = key.max_drawdown
         if max_dd < -30:
             recommendation['risks'].append(f'最大回撤较大 ({max_dd:.1f}%)')
         
-        volatility = factors.get('volatility', 0)
+        volatility = key.volatility
         if volatility > 30:
             recommendation['risks'].append(f'波动率较高 ({volatility:.1f}%)')
         
         # 夏普比率分析
-        sharpe = factors.get('sharpe_ratio', 0)
+        sharpe = key.sharpe_ratio
         if sharpe > 1.5:
             recommendation['reasons'].append(f'风险调整收益出色 (夏普比率: {sharpe:.2f})')
         elif sharpe < 0.5:
             recommendation['risks'].append(f'风险调整收益偏低 (夏普比率: {sharpe:.2f})')
         
         # 基金经理分析
-        manager_tenure = factors.get('manager_tenure', 0)
+        manager_tenure = key.manager_tenure
         if manager_tenure >= 5:
             recommendation['reasons'].append(f'基金经理经验丰富 ({manager_tenure:.1f}年)')
         elif manager_tenure < 2:
             recommendation['risks'].append(f'基金经理任期较短 ({manager_tenure:.1f}年)')
         
         # 规模分析
-        scale = factors.get('scale', 0)
+        scale = key.scale
         if scale < 2:
             recommendation['risks'].append(f'基金规模偏小 ({scale:.1f}亿)')
         elif scale > 200:
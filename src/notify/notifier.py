@@ -3,6 +3,7 @@
 """
 import smtplib
 import requests
+from datetime import date
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
@@ -179,7 +180,7 @@ class Notifier:
         # 邮件
         if self.email_config.EMAIL_RECEIVER:
             results["email"] = self.send_email(
-                subject=f"【理财日报】{__import__('datetime').date.today().strftime('%Y-%m-%d')}",
+                subject=f"【理财日报】{date.today().isoformat()}",
                 content=report_text
             )
         
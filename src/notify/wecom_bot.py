@@ -304,6 +304,68 @@ class WeComBot:
         
         return self.send_markdown(content)
     
+    def send_batched_trade_alerts(
+        self,
+        suggestions: List[Dict],
+        trade_type: str = "sell"
+    ) -> bool:
+        """将多条交易建议合并为一条提醒发送
+        
+        超过 Markdown 消息长度上限时按条目拆分为多条消息，不截断单条建议
+        
+        Args:
+            suggestions: 交易建议列表（fund_name/fund_code/reasons/suggested_amount/confidence）
+            trade_type: 交易类型 (buy/sell/stop_loss/take_profit)
+        """
+        if not suggestions:
+            return True
+        
+        type_config = {
+            "buy": ("💰", "买入建议", "info"),
+            "sell": ("📤", "卖出建议", "comment"),
+            "stop_loss": ("🛑", "止损提醒", "warning"),
+            "take_profit": ("🎯", "止盈提醒", "info"),
+        }
+        
+        emoji, title, color = type_config.get(trade_type, ("📌", "交易提醒", "comment"))
+        header = f"# {emoji} {title}（{len(suggestions)}条）\n"
+        footer = f"\n*{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"
+        
+        blocks = []
+        for suggestion in suggestions:
+            confidence = suggestion.get("confidence", 3)
+            amount = suggestion.get("suggested_amount")
+            block = (
+                f"\n**{suggestion.get('fund_name', '')}** (`{suggestion.get('fund_code', '')}`)\n"
+                f"- 置信度: {'★' * confidence + '☆' * (5 - confidence)}\n"
+                f"- 原因: {', '.join(suggestion.get('reasons', []))}\n"
+            )
+            if amount:
+                if trade_type in ["buy"]:
+                    block += f'- 建议金额: <font color="{color}">¥{amount:,.2f}</font>\n'
+                else:
+                    block += f'- 建议份额: <font color="{color}">{amount:,.2f}份</font>\n'
+            blocks.append(block)
+        
+        # 按字节数分批，每批不超过 4000 字节（为上限 4096 留余量）
+        max_bytes = 4000
+        fixed_bytes = len(header.encode('utf-8')) + len(footer.encode('utf-8'))
+        messages = []
+        current, current_bytes = [], fixed_bytes
+        for block in blocks:
+            block_bytes = len(block.encode('utf-8'))
+            if current and current_bytes + block_bytes > max_bytes:
+                messages.append(current)
+                current, current_bytes = [], fixed_bytes
+            current.append(block)
+            current_bytes += block_bytes
+        messages.append(current)
+        
+        success = True
+        for message_blocks in messages:
+            success &= self.send_markdown(header + "".join(message_blocks) + footer)
+        return success
+    
     def send_position_update(
         self,
         fund_name: str,
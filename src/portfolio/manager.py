@@ -1,7 +1,6 @@
 """
 持仓管理模块
 """
-import json
 import os
 import uuid
 from datetime import datetime, date
@@ -12,7 +11,7 @@ from ..models import (
     Portfolio, Position, TradeRecord, FundType, 
     SignalType, ConfidenceLevel
 )
-from config.settings import settings
+from config.settings import settings, json_load, json_dump
 
 
 class PortfolioManager:
@@ -31,37 +30,38 @@ class PortfolioManager:
         """加载持仓数据"""
         if os.path.exists(self.portfolio_file):
             try:
-                with open(self.portfolio_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return Portfolio(**data)
+                data = json_load(self.portfolio_file)
+                return Portfolio(**data)
             except Exception as e:
-                logger.error(f"加载持仓数据失败: {e}")
+                logger.error("加载持仓数据失败: {}", e)
         return Portfolio(cash=0, positions=[], total_value=0)
     
     def _load_trade_history(self) -> List[TradeRecord]:
         """加载交易历史"""
         if os.path.exists(self.trade_history_file):
             try:
-                with open(self.trade_history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return [TradeRecord(**record) for record in data]
+                data = json_load(self.trade_history_file)
+                return [TradeRecord(**record) for record in data]
             except Exception as e:
-                logger.error(f"加载交易历史失败: {e}")
+                logger.error("加载交易历史失败: {}", e)
         return []
     
+    def reload(self):
+        """从文件重新加载持仓和交易历史（长期运行的进程读取外部修改）"""
+        self.portfolio = self._load_portfolio()
+        self.trade_history = self._load_trade_history()
+    
     def save_portfolio(self):
         """保存持仓数据"""
         os.makedirs(os.path.dirname(self.portfolio_file), exist_ok=True)
-        with open(self.portfolio_file, 'w', encoding='utf-8') as f:
-            json.dump(self.portfolio.model_dump(mode='json'), f, ensure_ascii=False, indent=2, default=str)
+        json_dump(self.portfolio_file, self.portfolio.model_dump(mode='json'))
         logger.info("持仓数据已保存")
     
     def save_trade_history(self):
         """保存交易历史"""
         os.makedirs(os.path.dirname(self.trade_history_file), exist_ok=True)
-        with open(self.trade_history_file, 'w', encoding='utf-8') as f:
-            records = [r.model_dump(mode='json') for r in self.trade_history]
-            json.dump(records, f, ensure_ascii=False, indent=2, default=str)
+        records = [r.model_dump(mode='json') for r in self.trade_history]
+        json_dump(self.trade_history_file, records)
         logger.info("交易历史已保存")
     
     def initialize_portfolio(self, initial_cash: float):
@@ -73,7 +73,7 @@ class PortfolioManager:
             last_update=datetime.now()
         )
         self.save_portfolio()
-        logger.info(f"投资组合已初始化，初始资金: ¥{initial_cash:,.2f}")
+        logger.info("投资组合已初始化，初始资金: ¥{:,.2f}", initial_cash)
     
     def add_position(
         self,
@@ -90,7 +90,7 @@ class PortfolioManager:
         
         # 检查现金是否足够
         if amount > self.portfolio.cash:
-            logger.warning(f"现金不足，无法买入 {fund_name}")
+            logger.warning("现金不足，无法买入 {}", fund_name)
             return False
         
         # 检查是否已有该基金持仓
@@ -146,7 +146,7 @@ class PortfolioManager:
         self.save_portfolio()
         self.save_trade_history()
         
-        logger.info(f"买入成功: {fund_name}({fund_code}), 份额: {shares}, 金额: ¥{amount:,.2f}")
+        logger.info("买入成功: {}({}), 份额: {}, 金额: ¥{:,.2f}", fund_name, fund_code, shares, amount)
         return True
     
     def reduce_position(
@@ -161,7 +161,7 @@ class PortfolioManager:
         position = self.portfolio.get_position(fund_code)
         
         if not position:
-            logger.warning(f"未找到基金 {fund_code} 的持仓")
+            logger.warning("未找到基金 {} 的持仓", fund_code)
             return False
         
         if shares > position.shares:
@@ -201,7 +201,7 @@ class PortfolioManager:
         self.save_portfolio()
         self.save_trade_history()
         
-        logger.info(f"卖出成功: {position.fund_name}({fund_code}), 份额: {shares}, 金额: ¥{amount:,.2f}")
+        logger.info("卖出成功: {}({}), 份额: {}, 金额: ¥{:,.2f}", position.fund_name, fund_code, shares, amount)
         return True
     
     def update_prices(self, price_dict: dict):
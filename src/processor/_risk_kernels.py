@@ -0,0 +1,40 @@
+"""
+风险指标内核
+
+逐点递推的指标计算，安装 numba 时使用 JIT 编译版本，
+否则退回 NumPy 向量化实现
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _max_drawdown_numpy(daily_returns: np.ndarray) -> float:
+    """最大回撤（NumPy 实现）"""
+    cumulative = np.cumprod(1 + daily_returns)
+    running_max = np.maximum.accumulate(cumulative)
+    return ((cumulative - running_max) / running_max).min()
+
+
+def _max_drawdown_loop(daily_returns: np.ndarray) -> float:
+    """最大回撤（单次遍历记录峰值，供 numba 编译）"""
+    cumulative = 1.0
+    peak = -np.inf
+    max_drawdown = 0.0
+    for r in daily_returns:
+        cumulative *= 1 + r
+        if cumulative > peak:
+            peak = cumulative
+        drawdown = (cumulative - peak) / peak
+        if drawdown < max_drawdown:
+            max_drawdown = drawdown
+    return max_drawdown
+
+
+if njit is not None:
+    max_drawdown = njit(cache=True)(_max_drawdown_loop)
+else:
+    max_drawdown = _max_drawdown_numpy
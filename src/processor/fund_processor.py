@@ -10,6 +10,8 @@ import numpy as np
 import pandas as pd
 from loguru import logger
 
+from ._risk_kernels import max_drawdown as calc_max_drawdown
+
 
 class FundDataProcessor:
     """
@@ -174,12 +176,14 @@ class FundDataProcessor:
         if nav_data.empty or len(nav_data) < 30:
             return {}
         
-        df = nav_data.copy().sort_values('date')
+        # 取出净值数组，后续指标均在 NumPy 数组上计算
+        nav = np.ascontiguousarray(
+            nav_data.sort_values('date')['nav'].to_numpy(dtype=np.float64)
+        )
         
         # 计算日收益率
-        df['daily_return'] = df['nav'].pct_change()
-        
-        daily_returns = df['daily_return'].dropna()
+        daily_returns = np.diff(nav) / nav[:-1]
+        daily_returns = daily_returns[~np.isnan(daily_returns)]
         
         if len(daily_returns) < 20:
             return {}
@@ -187,19 +191,16 @@ class FundDataProcessor:
         metrics = {}
         
         # 年化波动率
-        daily_volatility = daily_returns.std()
+        daily_volatility = daily_returns.std(ddof=1)
         annual_volatility = daily_volatility * np.sqrt(self.TRADING_DAYS_PER_YEAR)
         metrics['volatility'] = annual_volatility * 100
         
         # 最大回撤
-        cumulative = (1 + daily_returns).cumprod()
-        running_max = cumulative.expanding().max()
-        drawdown = (cumulative - running_max) / running_max
-        max_drawdown = drawdown.min()
+        max_drawdown = calc_max_drawdown(daily_returns)
         metrics['max_drawdown'] = max_drawdown * 100
         
         # 年化收益率（用于夏普比率）
-        total_return = df['nav'].iloc[-1] / df['nav'].iloc[0] - 1
+        total_return = nav[-1] / nav[0] - 1
         years = len(daily_returns) / self.TRADING_DAYS_PER_YEAR
         annual_return = (1 + total_return) ** (1 / years) - 1 if years > 0 else 0
         
@@ -213,7 +214,9 @@ class FundDataProcessor:
         # 索提诺比率（只考虑下行波动）
         negative_returns = daily_returns[daily_returns < 0]
         if len(negative_returns) > 0:
-            downside_volatility = negative_returns.std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
+            downside_volatility = (
+                negative_returns.std(ddof=1) if len(negative_returns) > 1 else np.nan
+            ) * np.sqrt(self.TRADING_DAYS_PER_YEAR)
             if downside_volatility > 0:
                 sortino = (annual_return - self.risk_free_rate) / downside_volatility
                 metrics['sortino_ratio'] = sortino
@@ -231,6 +234,75 @@ class FundDataProcessor:
         
         return metrics
     
+    def calculate_risk_metrics_batch(self, nav_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        批量计算风险指标（按列向量化）
+        
+        口径与 calculate_risk_metrics 一致，额外包含 downside_volatility
+        
+        Args:
+            nav_dict: {fund_code: 标准化的净值数据}
+            
+        Returns:
+            DataFrame，索引为基金代码，列为各风险指标；数据不足的基金不包含在内
+        """
+        navs = {
+            code: df.sort_values('date').set_index('date')['nav']
+            for code, df in nav_dict.items()
+            if not df.empty and len(df) >= 30
+        }
+        if not navs:
+            return pd.DataFrame()
+        
+        # 各基金按自身交易日计算日收益率，再拼成宽表统一计算
+        daily_returns = pd.concat(
+            {code: nav.pct_change() for code, nav in navs.items()}, axis=1
+        )
+        counts = daily_returns.count()
+        daily_returns = daily_returns.loc[:, counts >= 20]
+        if daily_returns.empty:
+            return pd.DataFrame()
+        counts = counts[daily_returns.columns]
+        
+        # 年化波动率
+        annual_volatility = daily_returns.std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
+        
+        # 最大回撤
+        cumulative = (1 + daily_returns).cumprod()
+        drawdown = (cumulative - cumulative.cummax()) / cumulative.cummax()
+        max_drawdown = drawdown.min()
+        
+        # 年化收益率
+        first_nav = pd.Series({code: navs[code].iloc[0] for code in daily_returns.columns})
+        last_nav = pd.Series({code: navs[code].iloc[-1] for code in daily_returns.columns})
+        years = counts / self.TRADING_DAYS_PER_YEAR
+        annual_return = (last_nav / first_nav) ** (1 / years) - 1
+        excess_return = annual_return - self.risk_free_rate
+        
+        # 下行波动率
+        negative_returns = daily_returns.where(daily_returns < 0)
+        negative_count = negative_returns.count()
+        downside_volatility = negative_returns.std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
+        
+        metrics = pd.DataFrame({
+            'volatility': annual_volatility * 100,
+            'max_drawdown': max_drawdown * 100,
+            'sharpe_ratio': np.where(
+                annual_volatility > 0, excess_return / annual_volatility, 0
+            ),
+            'sortino_ratio': np.select(
+                [negative_count == 0, downside_volatility > 0],
+                [float('inf'), excess_return / downside_volatility],
+                default=0
+            ),
+            'calmar_ratio': np.where(
+                max_drawdown != 0, annual_return / max_drawdown.abs(), float('inf')
+            ),
+            'downside_volatility': downside_volatility.fillna(0) * 100,
+        })
+        
+        return metrics
+    
     def calculate_alpha_beta(
         self, 
         nav_data: pd.DataFrame, 
@@ -5,13 +5,25 @@
 """
 import json
 import os
+import time
 from datetime import datetime, timedelta
+from io import StringIO
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
 import pandas as pd
 from loguru import logger
 
+from config.settings import settings, json_dump, json_iter_items, json_load, json_loads
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# 净值数据在 Redis 中的有效期（秒）
+NAV_REDIS_TTL = 86400
+
 
 class FundStorage:
     """
@@ -37,6 +49,7 @@ class FundStorage:
         
         self.base_path = Path(base_path)
         self._init_directories()
+        self._redis = self._init_redis()
     
     def _init_directories(self):
         """初始化存储目录结构"""
@@ -53,6 +66,57 @@ class FundStorage:
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
     
+    def _init_redis(self):
+        """初始化 Redis 连接池（未启用或不可用时返回 None）"""
+        if not settings.USE_REDIS_CACHE:
+            return None
+        if redis is None:
+            logger.warning("redis 未安装，净值数据仅使用本地文件缓存。请运行: pip install redis")
+            return None
+        
+        pool = redis.ConnectionPool.from_url(settings.REDIS_URL, max_connections=50)
+        return redis.Redis(connection_pool=pool)
+    
+    def _nav_redis_key(self, fund_code: str) -> str:
+        """净值数据的 Redis 键（按自然日区分）"""
+        return f"nav:{fund_code}:{datetime.now().strftime('%Y%m%d')}"
+    
+    def _redis_get_nav(self, fund_code: str, max_age_hours: float) -> Optional[pd.DataFrame]:
+        """从 Redis 读取净值数据，写入时间超过 max_age_hours 视为未命中"""
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(self._nav_redis_key(fund_code))
+            if not raw:
+                return None
+            payload = json_loads(raw)
+            if time.time() - payload['saved_at'] > max_age_hours * 3600:
+                return None
+            df = pd.read_json(StringIO(payload['data']), orient='split', dtype=False, convert_dates=False)
+            if 'date' in df.columns:
+                df['date'] = pd.to_datetime(df['date'])
+            return df
+        except Exception as e:
+            logger.debug(f"Redis 读取净值失败 {fund_code}: {e}")
+            return None
+    
+    def _redis_set_nav(self, fund_code: str, nav_data: pd.DataFrame):
+        """写入净值数据到 Redis，附带写入时间供读取时校验有效期"""
+        if self._redis is None:
+            return
+        try:
+            payload = {
+                'saved_at': time.time(),
+                'data': nav_data.to_json(orient='split', index=False, date_format='iso'),
+            }
+            self._redis.set(
+                self._nav_redis_key(fund_code),
+                json.dumps(payload),
+                ex=NAV_REDIS_TTL,
+            )
+        except Exception as e:
+            logger.debug(f"Redis 写入净值失败 {fund_code}: {e}")
+    
     # ============ 基金列表存储 ============
     
     def save_fund_list(
@@ -81,8 +145,7 @@ class FundStorage:
             'funds': data
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
+        json_dump(filepath, save_data)
         
         logger.info(f"保存基金列表: {filename}, 共 {len(data)} 只基金")
     
@@ -108,8 +171,7 @@ class FundStorage:
             return None
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json_load(filepath)
             
             # 检查缓存是否过期
             update_time = datetime.fromisoformat(data['update_time'])
@@ -142,8 +204,7 @@ class FundStorage:
             **info
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
+        json_dump(filepath, save_data)
     
     def load_fund_info(
         self, 
@@ -166,8 +227,7 @@ class FundStorage:
             return None
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json_load(filepath)
             
             # 检查缓存是否过期
             update_time = datetime.fromisoformat(data['update_time'])
@@ -192,6 +252,7 @@ class FundStorage:
         """
         filepath = self.base_path / 'nav' / f'{fund_code}.csv'
         nav_data.to_csv(filepath, index=False, encoding='utf-8')
+        self._redis_set_nav(fund_code, nav_data)
     
     def load_nav_data(
         self, 
@@ -208,6 +269,11 @@ class FundStorage:
         Returns:
             净值数据 DataFrame 或 None
         """
+        # 优先读取 Redis 中当日的缓存（仅由 save_nav_data 写入）
+        df = self._redis_get_nav(fund_code, max_age_hours)
+        if df is not None:
+            return df
+        
         filepath = self.base_path / 'nav' / f'{fund_code}.csv'
         
         if not filepath.exists():
@@ -317,13 +383,11 @@ class FundStorage:
             'scores': data
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
+        json_dump(filepath, save_data)
         
         # 同时保存为最新版本
         latest_filepath = self.base_path / 'scores' / f'scores_{fund_type}_latest.json'
-        with open(latest_filepath, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
+        json_dump(latest_filepath, save_data)
         
         logger.info(f"保存评分结果: {filename}, 共 {len(data)} 只基金")
     
@@ -353,11 +417,11 @@ class FundStorage:
             return None
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 全市场评分文件较大，逐条读取 scores 数组
+            scores_df = pd.DataFrame(list(json_iter_items(filepath, 'scores.item')))
             
-            logger.info(f"加载评分结果: {filename}, 共 {data['count']} 只基金")
-            return pd.DataFrame(data['scores'])
+            logger.info(f"加载评分结果: {filename}, 共 {len(scores_df)} 只基金")
+            return scores_df
             
         except Exception as e:
             logger.error(f"加载评分结果失败: {e}")
@@ -391,6 +455,48 @@ class FundStorage:
         
         return sorted_df.head(top_n)
     
+    def get_top_funds_multi(
+        self,
+        fund_types: List[str],
+        top_n: int = 20,
+        min_score: float = 60
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        一次获取多个类型评分最高的基金
+        
+        各类型评分合并后统一筛选、排序，再按类型取前 N 名
+        
+        Args:
+            fund_types: 基金类型列表
+            top_n: 每个类型的返回数量
+            min_score: 最低评分
+            
+        Returns:
+            {基金类型: 排名前 N 的基金 DataFrame}，没有评分结果的类型不包含在内
+        """
+        frames = []
+        for fund_type in fund_types:
+            scores_df = self.load_scores(fund_type)
+            if scores_df is not None and not scores_df.empty:
+                frames.append(scores_df.assign(_score_type=fund_type))
+        
+        if not frames:
+            return {}
+        
+        all_scores = pd.concat(frames, ignore_index=True)
+        all_scores = all_scores[all_scores['total_score'] >= min_score]
+        top = (
+            all_scores
+            .sort_values('total_score', ascending=False, kind='stable')
+            .groupby('_score_type', sort=False)
+            .head(top_n)
+        )
+        
+        return {
+            fund_type: group.drop(columns='_score_type')
+            for fund_type, group in top.groupby('_score_type', sort=False)
+        }
+    
     # ============ 报告存储 ============
     
     def save_report(
@@ -413,8 +519,7 @@ class FundStorage:
         filename = f'{report_type}_{date}.json'
         filepath = self.base_path / 'reports' / filename
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        json_dump(filepath, report)
         
         logger.info(f"保存报告: {filename}")
     
@@ -441,8 +546,7 @@ class FundStorage:
         latest = max(reports, key=lambda p: p.stat().st_mtime)
         
         try:
-            with open(latest, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json_load(latest)
         except Exception as e:
             logger.error(f"加载报告失败: {e}")
             return None
@@ -3,8 +3,10 @@
 
 整合数据采集、处理、评分的完整流程
 """
+import multiprocessing
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
@@ -19,7 +21,66 @@ from ..model.factors import FactorCalculator
 from ..model.scoring_model import ScoringModel, get_scoring_config_for_type
 from ..model.prefilter import PreFilter, ModeratePreFilter
 from ..storage.fund_storage import FundStorage
-from ..advisor.portfolio_advisor import PortfolioAdvisor
+from ..advisor.portfolio_advisor import portfolio_advisor
+
+
+def compute_fund_factors(
+    factor_calc: FactorCalculator,
+    fund_code: str,
+    nav_data: pd.DataFrame,
+    fund_data: Dict,
+    benchmark_data: Optional[pd.DataFrame] = None,
+    current_holdings: Optional[pd.DataFrame] = None
+) -> Optional[Dict]:
+    """
+    计算单只基金的因子（纯计算，可在子进程中执行）
+    
+    Returns:
+        因子字典（已合并基金数据），计算失败返回 None
+    """
+    try:
+        factors = factor_calc.calculate_all_factors(
+            nav_data=nav_data,
+            fund_info=fund_data,
+            benchmark_data=benchmark_data,
+            current_holdings=current_holdings
+        )
+        
+        # 合并基金数据到因子
+        factors.update(fund_data)
+        
+        return factors
+    except Exception as e:
+        logger.warning(f"[{fund_code}] 计算因子失败: {e}")
+        return None
+
+
+# 子进程内共享的计算器和基准数据，由进程池 initializer 每个进程设置一次
+_worker_factor_calc: Optional[FactorCalculator] = None
+_worker_benchmark_data: Optional[pd.DataFrame] = None
+
+
+def _init_factor_worker(
+    factor_calc: FactorCalculator,
+    benchmark_data: Optional[pd.DataFrame]
+):
+    """进程池初始化：保存各任务共用的计算器和基准数据，避免随每个任务重复序列化"""
+    global _worker_factor_calc, _worker_benchmark_data
+    _worker_factor_calc = factor_calc
+    _worker_benchmark_data = benchmark_data
+
+
+def _compute_fund_factors_in_worker(
+    fund_code: str,
+    nav_data: pd.DataFrame,
+    fund_data: Dict,
+    current_holdings: Optional[pd.DataFrame] = None
+) -> Optional[Dict]:
+    """在子进程中计算单只基金的因子"""
+    return compute_fund_factors(
+        _worker_factor_calc, fund_code, nav_data, fund_data,
+        _worker_benchmark_data, current_holdings
+    )
 
 
 class FundAnalysisWorkflow:
@@ -45,14 +106,16 @@ class FundAnalysisWorkflow:
         scoring_model: ScoringModel = None,
         pre_filter: PreFilter = None,
         storage: FundStorage = None,
-        max_workers: int = 5
+        max_workers: int = 5,
+        cpu_workers: int = None
     ):
         """
         初始化工作流
         
         Args:
             各组件实例（可选，使用默认实例）
-            max_workers: 并发线程数
+            max_workers: 数据获取的并发线程数
+            cpu_workers: 因子计算的进程数，默认 CPU 核数；为 1 时在当前进程计算
         """
         self.akshare = akshare_collector or AKShareCollector()
         self.eastmoney = eastmoney_collector or EastMoneyCollector()
@@ -63,6 +126,7 @@ class FundAnalysisWorkflow:
         self.pre_filter = pre_filter or ModeratePreFilter()
         self.storage = storage or FundStorage()
         self.max_workers = max_workers
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
         self.benchmark_data = None  # 缓存基准数据
     
     def run_full_analysis(
@@ -239,7 +303,8 @@ class FundAnalysisWorkflow:
         max_analyze = min(limit, len(funds))
         funds_to_analyze = funds.head(max_analyze)
         
-        # 获取基金详情和计算因子
+        # 获取基金详情（网络 I/O，线程池）和计算因子（CPU，进程池）分两阶段进行
+        funds_inputs = {}
         funds_factors = {}
         funds_data = {}
         
@@ -257,7 +322,7 @@ class FundAnalysisWorkflow:
                 fund_code = str(row.get('基金代码', row.get('code', '')))
                 if fund_code:
                     future = executor.submit(
-                        self._get_fund_factors, fund_code, use_cache
+                        self._fetch_fund_inputs, fund_code, use_cache
                     )
                     futures[future] = fund_code
             
@@ -268,10 +333,9 @@ class FundAnalysisWorkflow:
                 completed_count += 1
                     
                 try:
-                    factors, data = future.result()
-                    if factors:
-                        funds_factors[fund_code] = factors
-                        funds_data[fund_code] = data
+                    inputs = future.result()
+                    if inputs:
+                        funds_inputs[fund_code] = inputs
                     else:
                         failed_count += 1
                 except Exception as e:
@@ -279,7 +343,16 @@ class FundAnalysisWorkflow:
                     logger.warning(f"[{fund_type}] 基金 {fund_code} 分析异常: {e}")
                 
                 if completed_count % 5 == 0 or completed_count == len(futures):
-                    logger.info(f"[{fund_type}] 进度: {completed_count}/{len(futures)} (成功: {len(funds_factors)}, 失败: {failed_count})")
+                    logger.info(f"[{fund_type}] 进度: {completed_count}/{len(futures)} (成功: {len(funds_inputs)}, 失败: {failed_count})")
+        
+        logger.info(f"[{fund_type}] 开始计算因子，共 {len(funds_inputs)} 只，进程数: {self.cpu_workers}")
+        codes = list(funds_inputs)
+        for fund_code, factors in zip(codes, self._compute_factors_batch(funds_inputs)):
+            if factors:
+                funds_factors[fund_code] = factors
+                funds_data[fund_code] = funds_inputs[fund_code][1]
+            else:
+                failed_count += 1
         
         result['statistics']['analyzed'] = len(funds_factors)
         logger.info(f"[{fund_type}] 数据获取完成，成功: {len(funds_factors)}, 失败: {failed_count}")
@@ -348,6 +421,71 @@ class FundAnalysisWorkflow:
         Returns:
             (因子字典, 基金数据字典)
         """
+        inputs = self._fetch_fund_inputs(fund_code, use_cache)
+        if inputs is None:
+            return None, None
+        
+        nav_data, fund_data, current_holdings = inputs
+        factors = compute_fund_factors(
+            self.factor_calc, fund_code, nav_data, fund_data,
+            self.benchmark_data, current_holdings
+        )
+        if factors is None:
+            return None, None
+        
+        return factors, fund_data
+    
+    def _compute_factors_batch(
+        self,
+        funds_inputs: Dict[str, Tuple[pd.DataFrame, Dict, Optional[pd.DataFrame]]]
+    ) -> List[Optional[Dict]]:
+        """
+        批量计算因子，按 funds_inputs 的顺序返回
+        
+        进程数大于 1 时分发到进程池，绕开 GIL 利用多核。
+        调度器在线程中运行任务，fork 带线程的进程可能继承被占用的锁（如日志锁）
+        而死锁，因此子进程用 spawn 方式启动
+        """
+        if not funds_inputs:
+            return []
+        
+        codes = list(funds_inputs)
+        navs = [funds_inputs[code][0] for code in codes]
+        datas = [funds_inputs[code][1] for code in codes]
+        holdings = [funds_inputs[code][2] for code in codes]
+        n = len(codes)
+        
+        if self.cpu_workers <= 1 or n == 1:
+            return list(map(
+                compute_fund_factors,
+                [self.factor_calc] * n, codes, navs, datas,
+                [self.benchmark_data] * n, holdings
+            ))
+        
+        workers = min(self.cpu_workers, n)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_factor_worker,
+            initargs=(self.factor_calc, self.benchmark_data)
+        ) as executor:
+            return list(executor.map(
+                _compute_fund_factors_in_worker,
+                codes, navs, datas, holdings,
+                chunksize=max(1, n // (workers * 4))
+            ))
+    
+    def _fetch_fund_inputs(
+        self,
+        fund_code: str,
+        use_cache: bool = True
+    ) -> Optional[Tuple[pd.DataFrame, Dict, Optional[pd.DataFrame]]]:
+        """
+        获取计算因子所需的数据（净值、基金信息、持仓）
+        
+        Returns:
+            (净值数据, 基金数据字典, 当前持仓)，净值数据为空时返回 None
+        """
         # 获取净值数据
         nav_data = None
         if use_cache:
@@ -363,7 +501,7 @@ class FundAnalysisWorkflow:
         
         if nav_data is None or nav_data.empty:
             logger.warning(f"[{fund_code}] 净值数据为空，跳过")
-            return None, None
+            return None
         
         # 获取基金基本信息
         fund_info = None
@@ -416,23 +554,7 @@ class FundAnalysisWorkflow:
             'manager_tenure': self._extract_manager_tenure(fund_info),
         }
         
-        # 计算因子
-        try:
-            factors = self.factor_calc.calculate_all_factors(
-                nav_data=nav_data,
-                fund_info=fund_data,
-                benchmark_data=self.benchmark_data,
-                current_holdings=current_holdings
-            )
-            
-            # 合并基金数据到因子
-            factors.update(fund_data)
-            
-            return factors, fund_data
-            
-        except Exception as e:
-            logger.warning(f"[{fund_code}] 计算因子失败: {e}")
-            return None, None
+        return nav_data, fund_data, current_holdings
     
     def _extract_scale(self, fund_info: Dict) -> float:
         """提取基金规模"""
@@ -626,7 +748,8 @@ class FundAnalysisWorkflow:
         Returns:
             组合建议字典
         """
-        advisor = PortfolioAdvisor()
+        # 共用全局顾问实例，估值缓存在多次调用间保留
+        advisor = portfolio_advisor
         
         # 获取各类型排名靠前的基金
         top_funds = {}